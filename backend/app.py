@@ -2,14 +2,25 @@ from flask import Flask
 from flask_cors import CORS
 import logging
 import os
+import sys
+import threading
+from sqlalchemy import text
 from config import Config
 from models import db, Job
 from mongo_models import mongo
 from routes import api
-from scraper.bot import scrape_jobs
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
-from apscheduler.triggers.interval import IntervalTrigger
+from health import probes
+from compression import init_compression
+import replicas
+from migrate import db_cli
+from read_model import read_model_cli
+import dedup
+from dedup import dedup_cli
+from archive import archive_cli, archive_old_jobs
+from descriptions import descriptions_cli
+from dimensions import dimensions_cli
+from scraper import adaptive, driver_pool
+from scraper.reparse import snapshots_cli
 import atexit
 
 # Set up logging
@@ -33,16 +44,26 @@ def create_app():
     
     # Initialize MySQL extension
     db.init_app(app)
-    CORS(app)
+    # Credentials allowed so the read-your-writes cookie of replicas.py reaches the API,
+    # which is why only the configured frontend origins are allowed
+    CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True)
+    replicas.init_app(app)
+    init_compression(app)
     
     # Register blueprints
     app.register_blueprint(api, url_prefix='/api')
+    app.register_blueprint(probes)
     
-    # Create MySQL database tables if they don't exist
-    with app.app_context():
-        db.create_all()
-        logger.info("MySQL database tables created")
+    # Register CLI commands
+    app.cli.add_command(db_cli)
+    app.cli.add_command(read_model_cli)
+    app.cli.add_command(dedup_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(descriptions_cli)
+    app.cli.add_command(dimensions_cli)
+    app.cli.add_command(snapshots_cli)
     
+    # Tables and indexes are created by `flask --app app db migrate`, not on every start
     # Initialize MongoDB with proper error handling
     try:
         # Print the MongoDB URI for debugging (with password masked if present)
@@ -55,30 +76,75 @@ def create_app():
             masked_uri = f"{protocol_part}://***:***@{server_part}"
         logger.info(f"Attempting to connect to MongoDB with URI: {masked_uri}")
         
+        # The client connects in the background, nothing here waits for the server
         mongo.init_app(app)
-        
-        with app.app_context():
-            # Test MongoDB connection
-            try:
-                mongo.db.command('ping')
-                logger.info("MongoDB connection successful!")
-                
-                # Create indexes only if connection is successful
-                mongo.db.user_jobs.create_index([("company", "text"), ("location", "text"), ("title", "text")])
-                logger.info("MongoDB indexes created successfully")
-            except Exception as e:
-                logger.error(f"MongoDB operation failed: {str(e)}")
-                logger.warning("Application will run with limited MongoDB functionality")
     except Exception as e:
         logger.error(f"Failed to initialize MongoDB: {str(e)}")
         logger.warning("Application will run without MongoDB functionality")
         logger.info("Check if MongoDB is running and update your MONGO_URI in config.py or .env file")
     
+    if app.config.get('STARTUP_CONNECTION_CHECK', True):
+        # Log whether the databases are reachable without holding up startup
+        threading.Thread(target=check_connections, args=(app,), daemon=True).start()
+    
     return app
 
+def check_connections(app):
+    """Ping MySQL and MongoDB once and log the outcome, runs in a background thread at startup"""
+    with app.app_context():
+        try:
+            db.session.execute(text('SELECT 1'))
+            logger.info("MySQL connection successful!")
+        except Exception as e:
+            logger.error(f"MySQL connection failed: {str(e)}")
+        finally:
+            db.session.remove()
+        try:
+            mongo.db.command('ping')
+            logger.info("MongoDB connection successful!")
+        except Exception as e:
+            logger.error(f"MongoDB operation failed: {str(e)}")
+            logger.warning("Application will run with limited MongoDB functionality")
+
+def run_scraper(app, adaptive_depth=True):
+    """Run the scraper (scheduled job), crawling as deep as the adaptive schedule expects"""
+    # Imported on first use so web-only processes do not load the scraper and scheduler
+    from apscheduler.triggers.interval import IntervalTrigger
+    from scraper.bot import scrape_jobs
+    with app.app_context():
+        schedule = adaptive.get_schedule(app.config)
+        use_adaptive = adaptive_depth and app.config.get('SCRAPER_ADAPTIVE_ENABLED', True)
+        result = scrape_jobs(schedule.depth if use_adaptive else None)
+        if result.get('skipped', False):
+            logger.warning(f"Scraper run skipped: {result.get('error')}")
+            return result
+        if result.get('success', False):
+            logger.info(f"Scraper run completed. Jobs saved: {result.get('jobs_saved', 0)}")
+        else:
+            logger.error(f"Scraper run failed: {result.get('error', 'Unknown error')}")
+        
+        # Learn from the pages that were crawled, even when the run failed partway
+        schedule.record_run(result.get('pages', []))
+        if use_adaptive and scheduler is not None and scheduler.get_job('scraper_adaptive'):
+            scheduler.reschedule_job('scraper_adaptive', trigger=IntervalTrigger(minutes=schedule.interval))
+        return result
+
+def run_archive(app):
+    """Move old scraped jobs into the archive (scheduled job)"""
+    with app.app_context():
+        try:
+            archived = archive_old_jobs()
+            logger.info(f"Archival run completed. Archived {archived} jobs")
+        except Exception as e:
+            logger.error(f"Archival run failed: {str(e)}")
+
 def configure_scheduler(app):
     """Configure the scheduler with jobs based on app config"""
     global scheduler
+    # APScheduler is only needed by the process that runs the scheduler
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.cron import CronTrigger
+    from apscheduler.triggers.interval import IntervalTrigger
     
     # Create scheduler if it doesn't exist
     if scheduler is None:
@@ -98,10 +164,11 @@ def configure_scheduler(app):
             if scheduler.get_job(job_id):
                 scheduler.remove_job(job_id)
                 
-            # Add the job
+            # Add the job (the daily runs always crawl to full depth)
             scheduler.add_job(
-                scrape_jobs,
+                run_scraper,
                 CronTrigger(hour=hour, minute=minute),
+                args=[app, False],
                 id=job_id,
                 name=f'Scraper run at {time_str} ({name})',
                 max_instances=1,
@@ -110,24 +177,56 @@ def configure_scheduler(app):
             )
             logger.info(f"Scheduling scraper to run at {time_str} ({name})")
         
-        # Schedule test interval runs
-        test_job_id = 'scraper_test'
+        # Schedule interval runs, adaptive runs reschedule themselves after every run
+        for interval_job_id in ('scraper_test', 'scraper_adaptive'):
+            if scheduler.get_job(interval_job_id):
+                scheduler.remove_job(interval_job_id)
         
-        # Remove test job if it exists
-        if scheduler.get_job(test_job_id):
-            scheduler.remove_job(test_job_id)
-            
-        # Add the test job
+        if app.config.get('SCRAPER_ADAPTIVE_ENABLED', True):
+            interval = adaptive.get_schedule(app.config).interval
+            scheduler.add_job(
+                run_scraper,
+                IntervalTrigger(minutes=interval),
+                args=[app],
+                id='scraper_adaptive',
+                name='Adaptive scraper run',
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=300
+            )
+            logger.info(f"Scheduling adaptive scraper runs, starting every {interval} minutes")
+        else:
+            # Add the test job
+            scheduler.add_job(
+                run_scraper,
+                IntervalTrigger(minutes=test_interval),
+                args=[app, False],
+                id='scraper_test',
+                name=f'Scraper run every {test_interval} minutes (test mode)',
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=300  # 5 minutes grace time for test runs
+            )
+            logger.info(f"Scheduling scraper to run every {test_interval} minutes (test mode)")
+        
+        # Schedule the daily archival of old scraped jobs
+        archive_job_id = 'archive_old_jobs'
+        if scheduler.get_job(archive_job_id):
+            scheduler.remove_job(archive_job_id)
+        
+        archive_time = app.config.get('ARCHIVE_SCHEDULE', '04:00')
+        hour, minute = map(int, archive_time.split(':'))
         scheduler.add_job(
-            scrape_jobs,
-            IntervalTrigger(minutes=test_interval),
-            id=test_job_id,
-            name=f'Scraper run every {test_interval} minutes (test mode)',
+            run_archive,
+            CronTrigger(hour=hour, minute=minute),
+            args=[app],
+            id=archive_job_id,
+            name=f'Archive old scraped jobs at {archive_time}',
             max_instances=1,
             coalesce=True,
-            misfire_grace_time=300  # 5 minutes grace time for test runs
+            misfire_grace_time=3600
         )
-        logger.info(f"Scheduling scraper to run every {test_interval} minutes (test mode)")
+        logger.info(f"Scheduling archival of old scraped jobs at {archive_time}")
         
         # Add a job to run immediately when the app starts
         immediate_job_id = 'scraper_immediate'
@@ -135,7 +234,8 @@ def configure_scheduler(app):
             scheduler.remove_job(immediate_job_id)
             
         scheduler.add_job(
-            scrape_jobs,
+            run_scraper,
+            args=[app],
             id=immediate_job_id,
             name='Initial scraper run at startup',
             next_run_time=None  # Will be replaced with current time when scheduler starts
@@ -159,16 +259,27 @@ def start_scheduler(app):
     return scheduler
 
 if __name__ == "__main__":
+    if '--startup-report' in sys.argv[1:]:
+        # Where startup time goes, measured in a fresh interpreter: `python app.py --startup-report`
+        from startup import print_startup_report
+        print_startup_report()
+        sys.exit(0)
+    
     app = create_app()
     port = int(os.environ.get("PORT", 5000))
     
     # Start the scheduler in the main Flask process only
     if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' or not app.debug:
+        # Build the near-duplicate index now rather than in the first scrape or POST
+        dedup.warm_up(app)
+        
         # Start the scheduler
         scheduler = start_scheduler(app)
         
         # Register shutdown function to ensure clean shutdown
         atexit.register(lambda: scheduler.shutdown() if scheduler and scheduler.running else None)
+        # Quit the warm Chrome drivers with the app
+        atexit.register(driver_pool.close_pool)
     
     logger.info(f"Starting Flask application on port {port}")
     app.run(host="0.0.0.0", port=port, debug=True)
\ No newline at end of file
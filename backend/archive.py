@@ -0,0 +1,277 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import click
+from datetime import datetime, date, timedelta
+from functools import lru_cache
+from flask import current_app
+from flask.cli import AppGroup
+from models import db, Job, JobListingRead
+from serializers import JOB_FIELDS, DATE_FORMAT, DATETIME_FORMAT, format_date, format_datetime
+import dedup
+import descriptions
+import dimensions
+import live
+import suggest
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+DATE_FIELDS = ('posting_date',)
+DATETIME_FIELDS = ('created_at', 'updated_at')
+FILTER_FIELDS = ('company', 'location', 'job_type')
+# Archive records keep the dimension ids, filters match them like the live listings do
+ARCHIVE_FIELDS = JOB_FIELDS + dimensions.ID_FIELDS
+
+# Per segment row count, posting date range and dimension ids, lets readers skip
+# segments without opening them
+MANIFEST_NAME = 'manifest.json'
+_manifest_lock = threading.Lock()
+
+def _archive_dir():
+    """Directory holding the compressed JSONL segment files"""
+    path = current_app.config.get('ARCHIVE_DIR', 'archive')
+    if not os.path.isabs(path):
+        path = os.path.join(current_app.root_path, path)
+    return path
+
+@lru_cache(maxsize=4096)
+def _parse_date(value):
+    return datetime.strptime(value, DATE_FORMAT).date()
+
+@lru_cache(maxsize=8192)
+def _parse_datetime(value):
+    return datetime.strptime(value, DATETIME_FORMAT)
+
+def _to_record(row):
+    """Turn a selected job row into a JSON serializable archive record"""
+    record = dict(zip(ARCHIVE_FIELDS, row))
+    for field in DATE_FIELDS:
+        if record.get(field):
+            record[field] = format_date(record[field])
+    for field in DATETIME_FIELDS:
+        if record.get(field):
+            record[field] = format_datetime(record[field])
+    return record
+
+def _from_record(record):
+    """Restore native dates on an archive record so it sorts and encodes like a live row"""
+    for field in DATE_FIELDS:
+        if record.get(field):
+            record[field] = _parse_date(record[field])
+    for field in DATETIME_FIELDS:
+        if record.get(field):
+            record[field] = _parse_datetime(record[field])
+    return record
+
+def _dimension_id(record, field):
+    """Dimension id of an archive record, records archived before they carried ids are looked up by name"""
+    dimension_id = record.get(f'{field}_id')
+    return dimension_id if dimension_id is not None else dimensions.lookup(field, record.get(field))
+
+def _segment_summary(records):
+    """Manifest entry of a segment, dates are compared as YYYY-MM-DD strings"""
+    dates = [record['posting_date'] for record in records if record.get('posting_date')]
+    return {
+        'rows': len(records),
+        'min_posting_date': min(dates) if dates else None,
+        'max_posting_date': max(dates) if dates else None,
+        'ids': {
+            field: sorted({_dimension_id(record, field) for record in records} - {None}) for field in FILTER_FIELDS
+        }
+    }
+
+def _read_segment(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as segment:
+        for line in segment:
+            yield json.loads(line)
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, separators=(',', ':'))
+    os.replace(path + '.tmp', path)
+
+def load_manifest(directory=None):
+    """Segment name -> summary, segments written before the manifest existed are summarized once"""
+    directory = directory or _archive_dir()
+    if not os.path.isdir(directory):
+        return {}
+    with _manifest_lock:
+        try:
+            with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as handle:
+                manifest = json.load(handle)
+        except FileNotFoundError:
+            manifest = {}
+        names = {name for name in os.listdir(directory) if name.endswith('.jsonl.gz')}
+        # Entries written before the manifest held dimension ids are summarized again
+        missing = {name for name in names if 'ids' not in manifest.get(name, {})}
+        for name in missing:
+            manifest[name] = _segment_summary(list(_read_segment(os.path.join(directory, name))))
+        if missing or manifest.keys() - names:
+            manifest = {name: summary for name, summary in manifest.items() if name in names}
+            _write_manifest(directory, manifest)
+    return manifest
+
+def _write_segment(records, month):
+    """Write one compressed JSONL segment atomically, record it in the manifest and return its path"""
+    directory = _archive_dir()
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    name = f'jobs-{month}-{stamp}.jsonl.gz'
+    path = os.path.join(directory, name)
+    temp_path = path + '.tmp'
+    with gzip.open(temp_path, 'wt', encoding='utf-8') as segment:
+        for record in records:
+            segment.write(json.dumps(record, separators=(',', ':')))
+            segment.write('\n')
+    os.replace(temp_path, path)
+    manifest = load_manifest(directory)
+    with _manifest_lock:
+        manifest[name] = _segment_summary(records)
+        _write_manifest(directory, manifest)
+    return path
+
+def archive_old_jobs(days=None, batch_size=None):
+    """Move scraped jobs older than `days` (by posting_date) from the hot table into the archive
+
+    Works in batches: each batch is written to segment files (one per posting month)
+    before its rows are deleted, so a crash can at worst archive a row twice, which
+    readers skip.
+    """
+    days = days if days is not None else current_app.config.get('ARCHIVE_AFTER_DAYS', 180)
+    batch_size = batch_size or current_app.config.get('ARCHIVE_BATCH_SIZE', 500)
+    cutoff = datetime.utcnow().date() - timedelta(days=days)
+    columns = [getattr(Job, field) for field in ARCHIVE_FIELDS]
+    archived = 0
+
+    while True:
+        rows = (Job.query
+                .filter(Job.source == 'scraped', Job.posting_date < cutoff)
+                .order_by(Job.id)
+                .with_entities(*columns)
+                .limit(batch_size)
+                .all())
+        if not rows:
+            break
+
+        # Archive records carry the full description, decompressed from the side table
+        records = descriptions.attach([_to_record(row) for row in rows])
+
+        # Group the batch by posting month so segments cover one month each
+        by_month = {}
+        for record in records:
+            month = (record.get('posting_date') or '0000-00')[:7].replace('-', '')
+            by_month.setdefault(month, []).append(record)
+        for month, records in by_month.items():
+            _write_segment(records, month)
+
+        ids = [row[0] for row in rows]
+        try:
+            # Live clients stop counting the archived jobs
+            live.record_scraped_deletes(records)
+            descriptions.delete_scraped(ids)
+            Job.query.filter(Job.id.in_(ids)).delete(synchronize_session=False)
+            JobListingRead.query.filter(
+                JobListingRead.source == 'scraped',
+                JobListingRead.job_id.in_([str(job_id) for job_id in ids])
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # Archived jobs no longer take part in near-duplicate matching, and jobs
+        # flagged as their duplicates are listed again
+        dedup.release(*[dedup.job_key('scraped', job_id) for job_id in ids])
+
+        archived += len(ids)
+        logger.info(f"Archived {len(ids)} scraped jobs posted before {cutoff}")
+
+    if archived:
+        # Archived jobs no longer count towards the typeahead suggestions
+        suggest.rebuild()
+    return archived
+
+def _matching_ids(filters):
+    """Dimension ids each filter allows, resolved like the live listing filters"""
+    return {
+        field: set(dimensions.matching_ids(field, filters[field])) for field in FILTER_FIELDS if filters.get(field)
+    }
+
+def _matches(record, filters, allowed):
+    """Apply the listing filters, allowed holds the dimension ids of each filter"""
+    for field, ids in allowed.items():
+        if _dimension_id(record, field) not in ids:
+            return False
+    if filters.get('collapse_duplicates') and record.get('duplicate_of'):
+        return False
+    return True
+
+def _segment_matches(summary, allowed, since, until):
+    """Whether a segment can hold matching jobs, by its posting date range and dimension ids"""
+    if since and summary['max_posting_date'] and summary['max_posting_date'] < since:
+        return False
+    if until and summary['min_posting_date'] and summary['min_posting_date'] > until:
+        return False
+    for field, ids in allowed.items():
+        if ids.isdisjoint(summary['ids'][field]):
+            return False
+    return True
+
+def default_since():
+    """Oldest posting date listed by default, ARCHIVE_READ_DAYS before the archive cutoff"""
+    config = current_app.config
+    days = config.get('ARCHIVE_AFTER_DAYS', 180) + config.get('ARCHIVE_READ_DAYS', 365)
+    return datetime.utcnow().date() - timedelta(days=days)
+
+def parse_range(since, until):
+    """archived_since and archived_until parameters (YYYY-MM-DD) as dates or None, raises ValueError"""
+    try:
+        since = datetime.strptime(since, DATE_FORMAT).date() if since else None
+        until = datetime.strptime(until, DATE_FORMAT).date() if until else None
+    except ValueError:
+        raise ValueError("archived_since and archived_until must be dates in YYYY-MM-DD format")
+    return since, until
+
+def iter_archived_jobs(filters=None, fields=JOB_FIELDS, since=None, until=None):
+    """Lazily yield archived jobs matching the filters and posted between since and until (dates)
+
+    since defaults to default_since(), so a listing never reads the whole archive
+    unless asked to. Segments whose manifest entry rules them out are not opened.
+    """
+    filters = filters or {}
+    allowed = _matching_ids(filters)
+    directory = _archive_dir()
+    since = since or default_since()
+    since = since.strftime(DATE_FORMAT) if isinstance(since, date) else since
+    until = until.strftime(DATE_FORMAT) if isinstance(until, date) else until
+
+    seen = set()
+    for name, summary in sorted(load_manifest(directory).items()):
+        if not _segment_matches(summary, allowed, since, until):
+            continue
+        for record in _read_segment(os.path.join(directory, name)):
+            # A batch interrupted between writing and deleting may have been archived twice
+            if record['id'] in seen:
+                continue
+            seen.add(record['id'])
+            posting_date = record.get('posting_date')
+            if (since and (not posting_date or posting_date < since)) or (until and posting_date and posting_date > until):
+                continue
+            if _matches(record, filters, allowed):
+                record = _from_record(record)
+                yield {field: record.get(field) for field in fields}
+
+# Flask CLI commands, e.g. `flask --app app archive run --days 90`
+archive_cli = AppGroup('archive', help='Move old scraped jobs out of the hot table')
+
+@archive_cli.command('run')
+@click.option('--days', type=int, default=None, help='Archive jobs posted more than this many days ago')
+@click.option('--batch-size', type=int, default=None, help='Rows moved per batch')
+def run_command(days, batch_size):
+    """Archive scraped jobs older than ARCHIVE_AFTER_DAYS"""
+    archived = archive_old_jobs(days, batch_size)
+    click.echo(f"Archived {archived} scraped jobs")
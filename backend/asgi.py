@@ -0,0 +1,23 @@
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from app import create_app
+from async_api import ASYNC_ROUTES, create_async_app
+import dedup
+
+# ASGI entry point: `hypercorn asgi:app --bind 0.0.0.0:5000 --workers 2`
+# The endpoints that combine both stores are served by the async Quart app, every
+# other request goes to the Flask app, which runs in a thread pool. The scheduler
+# is not started here, scraping stays with the `python app.py` process.
+
+flask_app = create_app()
+# Build the near-duplicate index now rather than in the first POST
+dedup.warm_up(flask_app)
+async_app = create_async_app(flask_app)
+wsgi_app = AsyncioWSGIMiddleware(flask_app)
+
+async def app(scope, receive, send):
+    """Route a request to the async app or the Flask app"""
+    if scope['type'] == 'lifespan' or (scope['type'] == 'http' and (scope['method'], scope['path']) in ASYNC_ROUTES):
+        # Lifespan events open and close the async database connections
+        await async_app(scope, receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
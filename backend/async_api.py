@@ -0,0 +1,311 @@
+import asyncio
+import logging
+from flask import g
+from quart import Quart, Blueprint, Response, jsonify, request
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from motor.motor_asyncio import AsyncIOMotorClient
+from models import Job
+from mongo_models import UserJob, restore_dates
+import live
+import read_model
+import replicas
+from compression import init_async_compression
+from routes import (parse_job_listing, list_read_model_jobs, build_queries, merge_listing, complete_listing,
+                    read_model_job_stats, build_stats_queries, FACET_FIELDS, combine_job_stats, scraper_status)
+from serializers import dumps
+
+# Async variants of the endpoints that combine both stores, served over ASGI by asgi.py.
+# MySQL (SQLAlchemy asyncio) and MongoDB (motor) are queried concurrently, so these
+# endpoints take about as long as the slower store instead of both added up.
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Async driver per SQLAlchemy backend
+ASYNC_DRIVERS = {'mysql': 'mysql+aiomysql', 'sqlite': 'sqlite+aiosqlite'}
+
+# (method, path) pairs asgi.py routes here, everything else is served by the Flask app
+ASYNC_ROUTES = {('GET', '/api/jobs'), ('GET', '/api/jobs/stats'), ('GET', '/api/scraper/status'),
+                ('GET', '/api/jobs/events')}
+
+def async_database_uri(uri):
+    """The database URI with its async driver, e.g. mysql:// becomes mysql+aiomysql://"""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend} databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+class AsyncStores:
+    """Async MySQL engine and MongoDB client of the ASGI app, opened when it starts serving"""
+
+    def __init__(self):
+        self.flask_app = None
+        self.engine = None
+        self.replica_engine = None
+        self.client = None
+        self.mongo_db = None
+
+    def init_app(self, app, flask_app):
+        self.flask_app = flask_app
+
+        @app.before_serving
+        async def open_stores():
+            # Created inside the serving event loop, the drivers bind to it
+            uri = flask_app.config.get('ASYNC_DATABASE_URI') or flask_app.config['SQLALCHEMY_DATABASE_URI']
+            self.engine = create_async_engine(async_database_uri(uri),
+                                              pool_size=flask_app.config.get('ASYNC_DB_POOL_SIZE', 10))
+            replica_uri = flask_app.config.get('DATABASE_REPLICA_URI')
+            if replica_uri:
+                self.replica_engine = create_async_engine(async_database_uri(replica_uri),
+                                                          pool_size=flask_app.config.get('ASYNC_DB_POOL_SIZE', 10))
+            self.client = AsyncIOMotorClient(flask_app.config['MONGO_URI'])
+            self.mongo_db = self.client.get_default_database()
+
+        @app.after_serving
+        async def close_stores():
+            await self.engine.dispose()
+            if self.replica_engine is not None:
+                await self.replica_engine.dispose()
+            self.client.close()
+
+    async def run_sync(self, function, *args):
+        """Run blocking code in a worker thread with the Flask app context
+
+        Used for query building (dimension lookups come from the in-process cache)
+        and the sync helpers, never for the store round trips themselves.
+        """
+        read_replica = self._reads_from_replica()
+
+        def call():
+            with self.flask_app.app_context():
+                # Sync reads follow the request's replica routing like the async ones
+                g.read_replica = read_replica
+                return function(*args)
+        return await asyncio.to_thread(call)
+
+    def _reads_from_replica(self):
+        # Every async endpoint is a GET, only clients that just wrote stay on the primaries
+        return replicas.STICKY_COOKIE not in request.cookies
+
+    def read_engine(self):
+        if self.replica_engine is not None and self._reads_from_replica():
+            return self.replica_engine
+        return self.engine
+
+    def read_collection(self, collection):
+        if self.flask_app.config.get('MONGO_READ_SECONDARY', False) and self._reads_from_replica():
+            return self.mongo_db[collection].with_options(
+                read_preference=replicas.secondary_preference(self.flask_app.config))
+        return self.mongo_db[collection]
+
+    async def rows(self, statement):
+        async with self.read_engine().connect() as connection:
+            result = await connection.execute(statement)
+            return result.all()
+
+    async def scalar(self, statement):
+        async with self.read_engine().connect() as connection:
+            return await connection.scalar(statement)
+
+    async def select_rows(self, statement, fields):
+        """Job column tuples as dictionaries, like serializers.select_job_rows"""
+        return [dict(zip(fields, row)) for row in await self.rows(statement)]
+
+    async def aggregate(self, collection, pipeline):
+        return await self.read_collection(collection).aggregate(pipeline).to_list(None)
+
+    async def count(self, collection):
+        return await self.read_collection(collection).count_documents({})
+
+stores = AsyncStores()
+
+class AsyncSubscription(live.Subscription):
+    """Subscription read from the event loop, the broker's threads hand events over thread-safely"""
+
+    def __init__(self, maxsize):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def push(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+async def _nothing():
+    """Result of a store the listing leaves out"""
+    return None
+
+def json_response(payload, status=200):
+    """Quart counterpart of serializers.json_response"""
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+# Create blueprint
+async_api = Blueprint('async_api', __name__)
+
+@async_api.route('/jobs', methods=['GET'])
+async def get_jobs():
+    """Get job listings with optional filtering and sorting, both stores are queried at once"""
+    try:
+        try:
+            listing = parse_job_listing(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        if stores.flask_app.config.get('READ_MODEL_ENABLED', False):
+            jobs_list = await stores.run_sync(list_read_model_jobs, listing)
+        else:
+            pipeline, statement = await stores.run_sync(build_queries, listing)
+            manual_jobs, scraped_jobs = await asyncio.gather(
+                stores.aggregate('user_jobs', pipeline) if pipeline is not None else _nothing(),
+                stores.select_rows(statement, listing['fields']) if statement is not None else _nothing()
+            )
+            if manual_jobs is not None:
+                manual_jobs = [restore_dates(job) for job in manual_jobs]
+            # Each store returns its jobs sorted, merge them
+            jobs_list = merge_listing(listing, manual_jobs, scraped_jobs)
+
+        jobs_list = await stores.run_sync(complete_listing, listing, jobs_list)
+
+        return json_response({
+            'success': True,
+            'count': len(jobs_list),
+            'jobs': jobs_list
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting jobs: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to retrieve jobs',
+            'error': str(e)
+        }), 500
+
+@async_api.route('/jobs/stats', methods=['GET'])
+async def get_job_stats():
+    """Get statistics about job listings, every count of both stores runs at once"""
+    try:
+        if stores.flask_app.config.get('READ_MODEL_ENABLED', False):
+            return json_response(await stores.run_sync(read_model_job_stats))
+
+        total, facets = await stores.run_sync(build_stats_queries)
+        results = await asyncio.gather(
+            stores.scalar(total),
+            stores.count('user_jobs'),
+            *[stores.rows(statement) for statement in facets.values()],
+            *[stores.aggregate('user_jobs', UserJob.facet_pipeline(f'{field}_id')) for field in FACET_FIELDS]
+        )
+        sql_total, mongo_total = results[:2]
+        sql_facets = dict(zip(facets, results[2:2 + len(facets)]))
+        mongo_facets = {
+            field: [(group['_id'], group['count']) for group in groups]
+            for field, groups in zip(FACET_FIELDS, results[2 + len(facets):])
+        }
+
+        stats = await stores.run_sync(combine_job_stats, sql_total, sql_facets, mongo_total, mongo_facets)
+        return json_response(stats)
+
+    except Exception as e:
+        logger.error(f"Error getting job stats: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to retrieve job statistics',
+            'error': str(e)
+        }), 500
+
+@async_api.route('/scraper/status', methods=['GET'])
+async def get_scraper_status():
+    """Get the status of the job scraper, the job counts of both stores run at once"""
+    try:
+        most_recent = stores.scalar(select(Job.updated_at).order_by(Job.updated_at.desc()).limit(1))
+        if stores.flask_app.config.get('READ_MODEL_ENABLED', False):
+            counts, most_recent_update = await asyncio.gather(
+                stores.run_sync(read_model.count_by_source), most_recent)
+            scraped_jobs = counts.get('scraped', 0)
+            manual_jobs = counts.get('manual', 0)
+        else:
+            scraped_jobs, manual_jobs, most_recent_update = await asyncio.gather(
+                stores.scalar(select(func.count(Job.id)).where(Job.source == 'scraped')),
+                stores.count('user_jobs'),
+                most_recent
+            )
+
+        status = await stores.run_sync(scraper_status, scraped_jobs, manual_jobs, most_recent_update)
+        return json_response(status)
+
+    except Exception as e:
+        logger.error(f"Error getting scraper status: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to get scraper status',
+            'error': str(e)
+        }), 500
+
+@async_api.route('/jobs/events', methods=['GET'])
+async def job_events():
+    """Server-sent stream of job inserts and deletes, a waiting client holds no thread"""
+    config = stores.flask_app.config
+    if not config.get('LIVE_EVENTS_ENABLED', True):
+        return jsonify({
+            'success': False,
+            'message': 'Live job events are disabled'
+        }), 404
+
+    broker = live.get_broker(stores.flask_app)
+    subscription = broker.subscribe(AsyncSubscription(config.get('LIVE_QUEUE_SIZE', 100)),
+                                    live.parse_last_event_id(request.headers.get('Last-Event-ID')))
+    heartbeat = config.get('LIVE_HEARTBEAT_INTERVAL', 15)
+
+    async def body():
+        try:
+            yield b'retry: 3000\n\n'
+            while not subscription.overflowed:
+                event = await subscription.get(heartbeat)
+                yield live.format_event(event) if event is not None else b': keepalive\n\n'
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = Response(body(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.timeout = None  # Quart would end the stream after RESPONSE_TIMEOUT
+    return response
+
+def init_async_cors(app):
+    """The Flask app's CORS (flask-cors in app.py) for the async endpoints: the same origins, with credentials"""
+    # Preflight OPTIONS requests are not in ASYNC_ROUTES, flask-cors answers them with the same settings
+    origins = set(app.config.get('CORS_ORIGINS', []))
+
+    @app.after_request
+    async def add_cors_headers(response):
+        response.vary.add('Origin')
+        origin = request.headers.get('Origin')
+        if origin in origins:
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers['Access-Control-Allow-Credentials'] = 'true'
+        return response
+
+def create_async_app(flask_app):
+    """Quart app serving the async endpoints with the Flask app's configuration"""
+    app = Quart(__name__)
+    app.config.from_mapping(flask_app.config)
+    stores.init_app(app, flask_app)
+    init_async_cors(app)
+    init_async_compression(app)
+    app.register_blueprint(async_api, url_prefix='/api')
+    return app
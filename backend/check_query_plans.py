@@ -0,0 +1,393 @@
+import itertools
+import json
+import logging
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import func, select
+
+# Query plan regression checks for every query shape the job listing and stats endpoints
+# generate, run from the backend folder against a seeded local database:
+#   python check_query_plans.py --seed 20000     # once, into a scratch DATABASE_URI / MONGO_URI
+#   python check_query_plans.py
+# MySQL (and SQLite) statements go through EXPLAIN, MongoDB queries through explain with
+# executionStats. A shape fails when it scans a whole table or collection, or sorts a
+# large number of rows outside an index. Exits with 1 when any shape fails.
+
+# Set up logging
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Tables and collections below this many rows are not judged, planners rightly scan tiny tables
+DEFAULT_MIN_ROWS = 1000
+# Listing shapes examining more rows than this many times what they return fail
+DEFAULT_MAX_RATIO = 10.0
+# Listings returning at least this share of a table may scan it
+FULL_READ_SHARE = 0.9
+
+FILTER_FIELDS = ('company', 'location', 'job_type')
+
+_SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+class ShapeResult:
+    """Plan verdict of one query shape"""
+
+    def __init__(self, store, name, aggregate=False):
+        self.store = store
+        self.name = name
+        self.aggregate = aggregate
+        self.problems = []
+        self.examined = None
+        self.returned = None
+        self.plan = None
+
+    @property
+    def ratio(self):
+        if self.examined is None or self.returned is None:
+            return None
+        return self.examined / max(self.returned, 1)
+
+    @property
+    def ok(self):
+        return not self.problems
+
+    def to_dict(self):
+        return {'store': self.store, 'name': self.name, 'ok': self.ok, 'problems': self.problems,
+                'examined': self.examined, 'returned': self.returned,
+                'ratio': round(self.ratio, 2) if self.ratio is not None else None}
+
+def filter_combinations():
+    """Every subset of the dimension filters, from none to all three"""
+    for size in range(len(FILTER_FIELDS) + 1):
+        yield from itertools.combinations(FILTER_FIELDS, size)
+
+def _shape_name(prefix, filters, collapse, sort_by=None, sort_order=None, source=None):
+    parts = list(filters) + (['collapse'] if collapse else [])
+    name = f"{prefix}[{','.join(parts)}]"
+    if source:
+        name += f" source={source}"
+    if sort_by:
+        name += f" sort={sort_by} {sort_order}"
+    return name
+
+def sample_filter_values():
+    """A dimension name per filter field that matches some, but not all, jobs"""
+    from models import db, Job
+    import dimensions
+    values = {}
+    for field in FILTER_FIELDS:
+        column = getattr(Job, f'{field}_id')
+        row = (db.session.query(column).filter(column.isnot(None)).group_by(column)
+               .order_by(func.count(Job.id).desc()).first())
+        values[field] = dimensions.name(field, row[0]) if row else None
+    return values
+
+def sql_listing_shapes(values):
+    """(name, statement) of every scraped jobs query get_jobs can build"""
+    from models import Job, SORT_FIELDS
+    from routes import _scraped_jobs_query
+    from serializers import SUMMARY_FIELDS, SORT_ORDERS
+    for filters, collapse, sort_by, sort_order in itertools.product(
+            filter_combinations(), (False, True), SORT_FIELDS, SORT_ORDERS):
+        arguments = {field: values[field] for field in filters}
+        query = _scraped_jobs_query(sort_by=sort_by, sort_order=sort_order, collapse_duplicates=collapse, **arguments)
+        statement = query.with_entities(*[getattr(Job, field) for field in SUMMARY_FIELDS]).statement
+        yield _shape_name('jobs', filters, collapse, sort_by, sort_order), statement
+
+def read_model_listing_shapes(values):
+    """(name, statement) of every read model listing query"""
+    from models import JobListingRead, SORT_FIELDS
+    from read_model import filtered_query
+    from serializers import SORT_ORDERS
+    for source, filters, collapse, sort_by, sort_order in itertools.product(
+            (None, 'manual', 'scraped'), filter_combinations(), (False, True), SORT_FIELDS, SORT_ORDERS):
+        arguments = {field: values[field] for field in filters}
+        query = filtered_query(source=source, collapse_duplicates=collapse, **arguments)
+        column = getattr(JobListingRead, sort_by)
+        order = (column.asc(), JobListingRead.id.asc()) if sort_order == 'asc' else (column.desc(), JobListingRead.id.desc())
+        statement = query.order_by(*order).with_entities(JobListingRead.job_id, JobListingRead.source).statement
+        yield _shape_name('read_model', filters, collapse, sort_by, sort_order, source), statement
+
+def sql_stats_shapes():
+    """(name, statement) of the stats queries of both get_job_stats branches"""
+    from models import Job, JobListingRead
+    from routes import scraped_facet_columns
+    scraped = Job.source == 'scraped'
+    yield 'stats total', select(func.count(Job.id)).where(scraped)
+    for field, column in scraped_facet_columns().items():
+        yield f'stats facet {field}', select(column, func.count(Job.id)).where(scraped).group_by(column)
+    for column in (JobListingRead.source, JobListingRead.company_id, JobListingRead.location_id,
+                   JobListingRead.job_type_id):
+        yield f'read_model stats {column.key}', select(column, func.count(JobListingRead.id)).group_by(column)
+
+def _table_rows(connection, table):
+    return connection.exec_driver_sql(f'SELECT COUNT(*) FROM {table}').scalar()
+
+def _explain_mysql(connection, sql):
+    """EXPLAIN rows as (table, type, key, rows, extra)"""
+    rows = connection.exec_driver_sql(f'EXPLAIN {sql}').mappings().all()
+    return [(row['table'], row['type'], row['key'], row['rows'], row['Extra'] or '') for row in rows]
+
+def _mysql_findings(plan):
+    """(finding, table) pairs of an EXPLAIN and the rows the optimizer expects to read"""
+    findings = []
+    examined = 1
+    for table, access, key, rows, extra in plan:
+        if table is None or table.startswith('<'):
+            # Derived tables and unions, their own rows are listed separately
+            continue
+        if access == 'ALL':
+            findings.append(('full scan', table))
+        if 'Using filesort' in extra:
+            findings.append(('filesort', table))
+        # Joins multiply
+        examined *= rows or 1
+    return findings, examined
+
+def _explain_sqlite(connection, sql):
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').all()
+    return [row[-1] for row in rows]
+
+def _sqlite_findings(plan, main_table, table_rows):
+    """(finding, table) pairs of an EXPLAIN QUERY PLAN, SQLite only estimates full scans"""
+    findings = []
+    examined = None
+    for detail in plan:
+        match = _SQLITE_SCAN_RE.match(detail)
+        if match:
+            findings.append(('full scan', match.group(1)))
+            examined = table_rows(match.group(1))
+        if detail.startswith('USE TEMP B-TREE FOR ORDER BY'):
+            findings.append(('filesort', main_table))
+    return findings, examined
+
+def check_sql(name, statement, min_rows, aggregate=False):
+    """Plan verdict of one SQLAlchemy statement against DATABASE_URI"""
+    from models import db
+    result = ShapeResult('sql', name, aggregate)
+    compiled = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    main_table = statement.get_final_froms()[0].name
+    with db.engine.connect() as connection:
+        counts = {}
+
+        def table_rows(table):
+            if table not in counts:
+                counts[table] = _table_rows(connection, table)
+            return counts[table]
+
+        if db.engine.dialect.name == 'mysql':
+            result.plan = _explain_mysql(connection, compiled)
+            findings, result.examined = _mysql_findings(result.plan)
+        else:
+            result.plan = _explain_sqlite(connection, compiled)
+            findings, result.examined = _sqlite_findings(result.plan, main_table, table_rows)
+        result.returned = connection.execute(select(func.count()).select_from(statement.subquery())).scalar()
+
+        for finding, table in findings:
+            rows = table_rows(table)
+            if rows < min_rows:
+                continue
+            if finding == 'full scan' and not aggregate and result.returned >= FULL_READ_SHARE * rows:
+                # Listing (nearly) the whole table, reading it in full is the cheapest plan
+                continue
+            if finding == 'filesort' and result.returned < min_rows:
+                # A selective filter index was preferred and only a few matching rows are sorted
+                continue
+            result.problems.append(f"{finding} of {table}" if finding == 'full scan' else f"{finding} on {table}")
+    return result
+
+def mongo_shapes(values):
+    """(name, pipeline) of every UserJob aggregation"""
+    from models import SORT_FIELDS
+    from mongo_models import UserJob
+    from serializers import SUMMARY_FIELDS, SORT_ORDERS
+    for filters, collapse, sort_by, sort_order in itertools.product(
+            filter_combinations(), (False, True), SORT_FIELDS, SORT_ORDERS):
+        query_filters = {field: values[field] for field in filters}
+        if collapse:
+            query_filters['collapse_duplicates'] = True
+        pipeline = UserJob.list_pipeline(query_filters, SUMMARY_FIELDS, sort_by, sort_order)
+        yield _shape_name('user_jobs', filters, collapse, sort_by, sort_order), pipeline, False
+    for field in FILTER_FIELDS:
+        yield f'user_jobs facet {field}', UserJob.facet_pipeline(f'{field}_id'), True
+    # UserJob.count, count_documents runs this pipeline
+    yield 'user_jobs count', [{'$match': {}}, {'$group': {'_id': 1, 'n': {'$sum': 1}}}], True
+
+def _walk(document):
+    """Every dictionary nested in an explain document"""
+    if isinstance(document, dict):
+        yield document
+        for value in document.values():
+            yield from _walk(value)
+    elif isinstance(document, list):
+        for value in document:
+            yield from _walk(value)
+
+def _filters_documents(pipeline):
+    return any(stage.get('$match') for stage in pipeline)
+
+def _mongo_verdict(result, explain, collection_size, min_rows, whole_collection=False):
+    stages = [node['stage'] for node in _walk(explain) if isinstance(node.get('stage'), str)]
+    large = collection_size >= min_rows
+    # Like full table scans, listing (nearly) the whole collection may read all of it. A $group over
+    # every document (the facets and the count) reads it in full whatever the indexes
+    if result.aggregate:
+        reads_all = whole_collection
+    else:
+        reads_all = (result.returned or 0) >= FULL_READ_SHARE * collection_size
+    if large and 'COLLSCAN' in stages and not reads_all:
+        result.problems.append("COLLSCAN of user_jobs")
+    # A blocking SORT stage, or a $sort the pipeline could not push into the query
+    pipeline_sort = any('$sort' in stage for stage in explain.get('stages', []))
+    if large and ('SORT' in stages or pipeline_sort):
+        result.problems.append("in-memory sort of user_jobs")
+    examined = [max(node.get('totalDocsExamined', 0), node.get('totalKeysExamined', 0))
+                for node in _walk(explain) if 'totalDocsExamined' in node]
+    result.examined = max(examined) if examined else None
+    result.plan = stages
+
+def check_mongo(name, pipeline, min_rows, aggregate=False):
+    """Plan verdict of one user_jobs aggregation against MONGO_URI"""
+    from mongo_models import mongo
+    result = ShapeResult('mongo', name, aggregate)
+    explain = mongo.db.command('explain', {'aggregate': 'user_jobs', 'pipeline': pipeline, 'cursor': {}},
+                               verbosity='executionStats')
+    result.returned = sum(1 for _ in mongo.db.user_jobs.aggregate(pipeline))
+    _mongo_verdict(result, explain, mongo.db.user_jobs.estimated_document_count(), min_rows,
+                   whole_collection=not _filters_documents(pipeline))
+    return result
+
+def check_mongo_get_by_id(min_rows):
+    """Plan verdict of UserJob.get_by_id"""
+    from mongo_models import mongo
+    result = ShapeResult('mongo', 'user_jobs get_by_id')
+    document = mongo.db.user_jobs.find_one({}, {'_id': 1})
+    if document is None:
+        return result
+    explain = mongo.db.user_jobs.find({'_id': document['_id']}).explain()
+    result.returned = 1
+    _mongo_verdict(result, explain, mongo.db.user_jobs.estimated_document_count(), min_rows)
+    return result
+
+def _judge_ratio(result, max_ratio):
+    if not result.aggregate and result.ratio is not None and result.ratio > max_ratio:
+        result.problems.append(f"examines {result.ratio:.1f} rows per returned row")
+
+def check_query_plans(min_rows=DEFAULT_MIN_ROWS, max_ratio=DEFAULT_MAX_RATIO, mongo_checks=True):
+    """Plan verdicts of every listing and stats query shape"""
+    values = sample_filter_values()
+    results = []
+    for name, statement in itertools.chain(sql_listing_shapes(values), read_model_listing_shapes(values)):
+        results.append(check_sql(name, statement, min_rows))
+    for name, statement in sql_stats_shapes():
+        results.append(check_sql(name, statement, min_rows, aggregate=True))
+    if mongo_checks:
+        for name, pipeline, aggregate in mongo_shapes(values):
+            results.append(check_mongo(name, pipeline, min_rows, aggregate))
+        results.append(check_mongo_get_by_id(min_rows))
+    for result in results:
+        _judge_ratio(result, max_ratio)
+    return results
+
+def seed(count):
+    """Insert count scraped jobs and a tenth as many manual jobs with realistic value spreads"""
+    from models import db, Job
+    from mongo_models import mongo, to_bson_date
+    import dimensions
+    import read_model
+
+    now = datetime.utcnow()
+    companies = [f'Company {number}' for number in range(200)]
+    locations = [f'City {number}, Country {number % 20}' for number in range(60)]
+    job_types = ['Full-time', 'Part-time', 'Contract', 'Internship', 'Temporary']
+    ids = {}
+    for field, names in (('company', companies), ('location', locations), ('job_type', job_types)):
+        for name in names:
+            ids[name] = dimensions.intern(field, name)
+    db.session.commit()
+
+    def job(number):
+        company = companies[number * 7 % len(companies)]
+        location = locations[number * 13 % len(locations)]
+        job_type = job_types[number % len(job_types)]
+        created_at = now - timedelta(minutes=number)
+        return {
+            'title': f'Actuary {number}', 'company': company, 'location': location, 'job_type': job_type,
+            'company_id': ids[company], 'location_id': ids[location], 'job_type_id': ids[job_type],
+            'posting_date': created_at.date(), 'url': f'https://example.com/jobs/{number}',
+            'duplicate_of': f'scraped:{number - 1}' if number % 50 == 0 else None,
+            'created_at': created_at, 'updated_at': created_at
+        }
+
+    batch = []
+    for number in range(count):
+        batch.append(dict(job(number), source='scraped'))
+        if len(batch) >= 1000:
+            db.session.execute(db.insert(Job), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(Job), batch)
+    db.session.commit()
+
+    documents = []
+    for number in range(count, count + count // 10):
+        document = dict(job(number), source='manual')
+        document['posting_date'] = to_bson_date(document['posting_date'])
+        documents.append(document)
+    if documents:
+        mongo.db.user_jobs.insert_many(documents)
+    read_model.rebuild()
+
+    # The planners judge index selectivity from table statistics, MySQL keeps them up to
+    # date on its own while SQLite only has them once ANALYZE ran
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(db.text('ANALYZE'))
+    else:
+        db.session.execute(db.text('ANALYZE TABLE jobs, job_listings_read'))
+    db.session.commit()
+
+def _print_result(result, verbose):
+    if result.ok and not verbose:
+        return
+    ratio = f"{result.ratio:.1f}" if result.ratio is not None else 'n/a'
+    status = 'ok  ' if result.ok else 'FAIL'
+    click.echo(f"{status} {result.store:<5} {result.name:<60} examined/returned {ratio:>8}"
+               + (f"  {'; '.join(result.problems)}" if result.problems else ''))
+    if verbose and result.plan:
+        click.echo(f"       plan: {result.plan}")
+
+@click.command()
+@click.option('--seed', 'seed_count', type=int, default=0, help='Insert this many scraped jobs first (scratch databases only)')
+@click.option('--min-rows', type=int, default=DEFAULT_MIN_ROWS, help='Tables smaller than this are not judged')
+@click.option('--max-ratio', type=float, default=DEFAULT_MAX_RATIO, help='Rows examined per returned row allowed for listings')
+@click.option('--skip-mongo', is_flag=True, help='Only check the SQL queries')
+@click.option('--verbose', is_flag=True, help='Print every shape with its plan, not only the failures')
+@click.option('--json', 'as_json', is_flag=True, help='Print the verdicts as JSON')
+def main(seed_count, min_rows, max_ratio, skip_mongo, verbose, as_json):
+    """Check the query plans of every job listing and stats query shape"""
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        if seed_count:
+            started = time.perf_counter()
+            seed(seed_count)
+            click.echo(f"Seeded {seed_count} scraped jobs in {time.perf_counter() - started:.1f}s")
+        results = check_query_plans(min_rows, max_ratio, mongo_checks=not skip_mongo)
+
+    failures = [result for result in results if not result.ok]
+    if as_json:
+        click.echo(json.dumps([result.to_dict() for result in results], indent=2))
+    else:
+        for result in results:
+            _print_result(result, verbose)
+        click.echo(f"{len(results)} query shapes checked, {len(failures)} failed")
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
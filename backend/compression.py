@@ -0,0 +1,180 @@
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+class CompressedBodyCache:
+    """Small thread-safe LRU of compressed bodies keyed by body digest and encoding
+
+    Polled endpoints return the same payload until the data changes, so each
+    distinct body is compressed once and reused until it is evicted.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+def _accepted_encodings(header):
+    """Parse an Accept-Encoding header into a set of encodings with a non-zero q-value"""
+    accepted = set()
+    for part in header.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(token)
+    return accepted
+
+def choose_encoding(header):
+    """Pick the best supported encoding for an Accept-Encoding header, or None"""
+    accepted = _accepted_encodings(header or '')
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+def compress_body(body, encoding, level):
+    """Compress a complete body with the given encoding"""
+    if encoding == 'br':
+        # Brotli quality runs 0-11, map the zlib style level onto it
+        return brotli.compress(body, quality=min(11, max(0, level + 1)))
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+def _compress_stream(chunks, encoding, level):
+    """Compress a streamed body chunk by chunk, flushing so clients see data as it is produced"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(11, max(0, level + 1)))
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        # wbits=31 produces a gzip container
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+def init_compression(app):
+    """Register negotiated gzip/brotli compression for JSON and streaming responses"""
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+
+    cache = CompressedBodyCache(app.config.get('COMPRESSION_CACHE_SIZE', 64))
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+    level = app.config.get('COMPRESSION_LEVEL', 6)
+    mimetypes = set(app.config.get('COMPRESSION_MIMETYPES', ['application/json']))
+    app.extensions['compression_cache'] = cache
+
+    @app.after_request
+    def compress_response(response):
+        # Event streams are never compressed, the compressor would hold events back until its buffer fills
+        if (response.status_code < 200 or response.status_code in (204, 304)
+                or response.mimetype not in mimetypes or response.mimetype == 'text/event-stream'
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            # Size is unknown up front, always compress streams
+            response.response = _compress_stream(response.response, encoding, level)
+            response.direct_passthrough = False
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = encoding
+            return response
+
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+
+        # Identical bodies (e.g. repeated dashboard polls) are compressed only once
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = compress_body(body, encoding, level)
+            cache.set(key, compressed)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+def init_async_compression(app):
+    """The same negotiated compression for the Quart app in async_api.py (complete bodies only)"""
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+    # Imported here, only the ASGI app needs Quart
+    from quart import request as async_request
+
+    cache = CompressedBodyCache(app.config.get('COMPRESSION_CACHE_SIZE', 64))
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+    level = app.config.get('COMPRESSION_LEVEL', 6)
+    mimetypes = set(app.config.get('COMPRESSION_MIMETYPES', ['application/json']))
+
+    @app.after_request
+    async def compress_response(response):
+        if (response.status_code < 200 or response.status_code in (204, 304)
+                or response.mimetype not in mimetypes or response.mimetype == 'text/event-stream'
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(async_request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        body = await response.get_data()
+        if len(body) < min_size:
+            return response
+
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = compress_body(body, encoding, level)
+            cache.set(key, compressed)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
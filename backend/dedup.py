@@ -0,0 +1,326 @@
+import hashlib
+import logging
+import random
+import re
+import threading
+import click
+from datetime import datetime
+from bson.objectid import ObjectId
+from flask import current_app
+from flask.cli import AppGroup
+from models import db, Job, JobListingRead
+import descriptions
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Large Mersenne prime for the universal hash family used by MinHash
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 64) - 1
+_TOKEN_RE = re.compile(r'\w+')
+
+def job_key(source, job_id):
+    """Key identifying a job across both stores, e.g. scraped:42 or manual:<ObjectId>"""
+    return f'{source}:{job_id}'
+
+def job_text(title, description):
+    """Text a job's signature is computed from"""
+    return f'{title or ""} {description or ""}'
+
+def shingles(text, size=3):
+    """Word shingles of a normalized text, short texts fall back to single words"""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < size:
+        return set(tokens)
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+class MinHasher:
+    """Computes fixed length MinHash signatures with a seeded universal hash family"""
+
+    def __init__(self, num_perm=64, shingle_size=3, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._params = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, text):
+        """MinHash signature of a text as a tuple of num_perm integers"""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+            for shingle in shingles(text, self.shingle_size)
+        ]
+        if not hashes:
+            return (_MAX_HASH,) * self.num_perm
+        prime = _MERSENNE_PRIME
+        return tuple(min((a * h + b) % prime for h in hashes) for a, b in self._params)
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two signatures"""
+    same = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+    return same / len(signature_a)
+
+class LSHIndex:
+    """Banded locality sensitive hashing index over MinHash signatures
+
+    Lookups only touch the buckets a signature falls into, so finding candidates
+    stays sub-linear in the number of indexed jobs.
+    """
+
+    def __init__(self, num_perm=64, bands=16):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets = [dict() for _ in range(bands)]
+        self._signatures = {}
+        self._canonical = {}
+        # Canonical key -> keys of the jobs duplicating it, so removals find them without a scan
+        self._duplicates = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, signature[start:start + self.rows]
+
+    def add(self, key, signature, canonical=None):
+        """Index a job, canonical is the key of the job it duplicates (if any)"""
+        self._unlink(key)
+        self._signatures[key] = signature
+        self._canonical[key] = canonical
+        if canonical is not None:
+            self._duplicates.setdefault(canonical, set()).add(key)
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, set()).add(key)
+
+    def _unlink(self, key):
+        canonical = self._canonical.pop(key, None)
+        duplicates = self._duplicates.get(canonical)
+        if duplicates is not None:
+            duplicates.discard(key)
+            if not duplicates:
+                del self._duplicates[canonical]
+
+    def remove(self, key):
+        """Remove a job from the index, jobs that duplicated it become originals
+
+        Returns the keys of those former duplicates.
+        """
+        signature = self._signatures.pop(key, None)
+        self._unlink(key)
+        if signature is None:
+            return []
+        for band, band_key in self._band_keys(signature):
+            bucket = self._buckets[band].get(band_key)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+        orphans = sorted(self._duplicates.pop(key, ()))
+        for orphan in orphans:
+            self._canonical[orphan] = None
+        return orphans
+
+    def candidates(self, signature):
+        """Keys sharing at least one band with the signature"""
+        found = set()
+        for band, band_key in self._band_keys(signature):
+            found.update(self._buckets[band].get(band_key, ()))
+        return found
+
+    def best_match(self, signature, threshold):
+        """Canonical key of the most similar indexed job at or above the threshold"""
+        best_key, best_score = None, threshold
+        for key in self.candidates(signature):
+            score = similarity(signature, self._signatures[key])
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is None:
+            return None
+        # Point at the original posting, not at another duplicate
+        return self._canonical.get(best_key) or best_key
+
+# Process wide index over both stores, built lazily on first use
+_index = None
+_hasher = None
+_lock = threading.RLock()
+
+def _build_index():
+    """Build the LSH index from every job in MySQL and MongoDB"""
+    # Imported here, mongo_models runs dedup when manual jobs are created
+    from mongo_models import mongo
+
+    config = current_app.config
+    hasher = MinHasher(config.get('DEDUP_NUM_PERM', 64), config.get('DEDUP_SHINGLE_SIZE', 3))
+    index = LSHIndex(config.get('DEDUP_NUM_PERM', 64), config.get('DEDUP_BANDS', 16))
+
+    rows = db.session.query(Job.id, Job.title, Job.description, Job.duplicate_of).filter_by(source='scraped').all()
+    texts = descriptions.load_scraped(job_id for job_id, _, _, _ in rows)
+    for job_id, title, description, duplicate_of in rows:
+        text = job_text(title, texts.get(job_id, description))
+        index.add(job_key('scraped', job_id), hasher.signature(text), duplicate_of)
+
+    projection = {'title': 1, 'description': 1, 'duplicate_of': 1}
+    docs = list(mongo.db.user_jobs.find({'source': 'manual'}, projection))
+    texts = descriptions.load_manual(str(doc['_id']) for doc in docs)
+    for doc in docs:
+        text = job_text(doc.get('title'), texts.get(str(doc['_id']), doc.get('description')))
+        index.add(job_key('manual', doc['_id']), hasher.signature(text), doc.get('duplicate_of'))
+
+    logger.info(f"Near-duplicate index built with {len(index)} jobs")
+    return hasher, index
+
+def _ensure_index():
+    global _index, _hasher
+    if _index is None:
+        _hasher, _index = _build_index()
+    return _hasher, _index
+
+def warm_up(app):
+    """Build the index in a background thread, so no request or scrape has to build it"""
+    if not app.config.get('DEDUP_ENABLED', True):
+        return None
+
+    def build():
+        with app.app_context():
+            try:
+                with _lock:
+                    _ensure_index()
+            except Exception as e:
+                # Built on first use instead
+                logger.error(f"Failed to build the near-duplicate index: {str(e)}")
+            finally:
+                db.session.remove()
+
+    thread = threading.Thread(target=build, name='dedup-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def reset():
+    """Drop the in-process index so it is rebuilt from the stores on next use"""
+    global _index, _hasher
+    with _lock:
+        _index = None
+        _hasher = None
+
+def mark_batch(items):
+    """Find near-duplicates for a batch of new jobs and add them to the index
+
+    items is a list of (key, title, description). Returns a dict mapping each key
+    to the canonical key it duplicates, or None for original postings. Jobs in the
+    same batch are matched against each other as well as against the stores.
+    """
+    if not current_app.config.get('DEDUP_ENABLED', True) or not items:
+        return {key: None for key, _, _ in items}
+
+    threshold = current_app.config.get('DEDUP_THRESHOLD', 0.8)
+    results = {}
+    with _lock:
+        hasher, index = _ensure_index()
+        for key, title, description in items:
+            # A lazily built index may already hold jobs flushed in the caller's transaction
+            index.remove(key)
+            signature = hasher.signature(job_text(title, description))
+            canonical = index.best_match(signature, threshold)
+            index.add(key, signature, canonical)
+            results[key] = canonical
+
+    duplicates = sum(1 for canonical in results.values() if canonical)
+    if duplicates:
+        logger.info(f"Flagged {duplicates} of {len(items)} new jobs as near-duplicates")
+    return results
+
+def forget(key):
+    """Remove a deleted (or rolled back) job from the index and promote jobs that pointed at it
+
+    Returns the keys of former duplicates so the caller can clear their flag.
+    """
+    with _lock:
+        if _index is None:
+            return []
+        return _index.remove(key)
+
+def release(*keys):
+    """Clear duplicate_of on jobs in both stores that pointed at deleted or archived jobs
+
+    Call once the removal itself is committed, the MySQL updates are committed
+    here. The keys are dropped from the index even when clearing the flags fails,
+    the jobs are gone and must not be matched again.
+    """
+    # Imported here, mongo_models runs dedup when manual jobs are created
+    from mongo_models import mongo
+
+    if not keys:
+        return
+    try:
+        Job.query.filter(Job.duplicate_of.in_(keys)).update({'duplicate_of': None}, synchronize_session=False)
+        JobListingRead.query.filter(JobListingRead.duplicate_of.in_(keys)).update(
+            {'duplicate_of': None}, synchronize_session=False
+        )
+        db.session.commit()
+        mongo.db.user_jobs.update_many({'duplicate_of': {'$in': list(keys)}}, {'$set': {'duplicate_of': None}})
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        for key in keys:
+            forget(key)
+
+def rebuild():
+    """Recompute duplicate flags for every job, oldest first"""
+    global _index, _hasher
+    # Imported here, mongo_models runs dedup when manual jobs are created
+    from mongo_models import mongo
+
+    config = current_app.config
+    with _lock:
+        _hasher = MinHasher(config.get('DEDUP_NUM_PERM', 64), config.get('DEDUP_SHINGLE_SIZE', 3))
+        _index = LSHIndex(config.get('DEDUP_NUM_PERM', 64), config.get('DEDUP_BANDS', 16))
+
+    rows = db.session.query(Job.id, Job.title, Job.description, Job.created_at).filter_by(source='scraped').all()
+    texts = descriptions.load_scraped(job_id for job_id, _, _, _ in rows)
+    jobs = [
+        (created_at, job_key('scraped', job_id), title, texts.get(job_id, description))
+        for job_id, title, description, created_at in rows
+    ]
+    projection = {'title': 1, 'description': 1, 'created_at': 1}
+    docs = list(mongo.db.user_jobs.find({'source': 'manual'}, projection))
+    texts = descriptions.load_manual(str(doc['_id']) for doc in docs)
+    jobs.extend(
+        (doc.get('created_at'), job_key('manual', doc['_id']), doc.get('title'),
+         texts.get(str(doc['_id']), doc.get('description')))
+        for doc in docs
+    )
+    jobs.sort(key=lambda job: job[0] or datetime.min)
+
+    results = mark_batch([(key, title, description) for _, key, title, description in jobs])
+
+    # Write the flags back to both stores and the read model
+    for key, canonical in results.items():
+        source, job_id = key.split(':', 1)
+        if source == 'scraped':
+            Job.query.filter_by(id=int(job_id)).update({'duplicate_of': canonical}, synchronize_session=False)
+        else:
+            mongo.db.user_jobs.update_one({'_id': ObjectId(job_id)}, {'$set': {'duplicate_of': canonical}})
+        JobListingRead.query.filter_by(source=source, job_id=job_id).update({'duplicate_of': canonical}, synchronize_session=False)
+    db.session.commit()
+
+    return sum(1 for canonical in results.values() if canonical), len(results)
+
+# Flask CLI commands, e.g. `flask --app app dedup rebuild`
+dedup_cli = AppGroup('dedup', help='Near-duplicate job detection')
+
+@dedup_cli.command('rebuild')
+def rebuild_command():
+    """Recompute near-duplicate flags across MySQL and MongoDB"""
+    duplicates, total = rebuild()
+    click.echo(f"Flagged {duplicates} of {total} jobs as near-duplicates")
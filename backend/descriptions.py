@@ -0,0 +1,255 @@
+import logging
+import threading
+import zlib
+import click
+from collections import Counter
+from bson.binary import Binary
+from bson.objectid import ObjectId
+from flask import current_app
+from flask.cli import AppGroup
+from models import db, Job, JobDescription, DescriptionDictionary
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# zlib only looks back 32KB, a larger preset dictionary would be wasted
+MAX_DICTIONARY_SIZE = 32 * 1024
+MIGRATE_BATCH_SIZE = 500
+LOAD_BATCH_SIZE = 1000
+
+# Cache of dictionaries by id, they are immutable once trained
+_dictionaries = {}
+_current_dictionary_id = None
+_dictionary_loaded = False
+_lock = threading.Lock()
+
+def _dictionary(dictionary_id):
+    """Dictionary bytes for an id (cached)"""
+    if dictionary_id is None:
+        return None
+    data = _dictionaries.get(dictionary_id)
+    if data is None:
+        row = db.session.get(DescriptionDictionary, dictionary_id)
+        if row is None:
+            raise LookupError(f'Description dictionary {dictionary_id} is missing')
+        data = _dictionaries[dictionary_id] = row.data
+    return data
+
+def _current_dictionary():
+    """Id and bytes of the newest trained dictionary, or (None, None)"""
+    global _current_dictionary_id, _dictionary_loaded
+    with _lock:
+        if not _dictionary_loaded:
+            row = DescriptionDictionary.query.order_by(DescriptionDictionary.id.desc()).first()
+            if row is not None:
+                _dictionaries[row.id] = row.data
+                _current_dictionary_id = row.id
+            _dictionary_loaded = True
+    return _current_dictionary_id, _dictionaries.get(_current_dictionary_id)
+
+def compress(text):
+    """Compress a description with the current dictionary, returns (dictionary_id, body)"""
+    dictionary_id, dictionary = _current_dictionary()
+    level = current_app.config.get('DESCRIPTION_COMPRESSION_LEVEL', 9)
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level)
+    return dictionary_id, compressor.compress(text.encode('utf-8')) + compressor.flush()
+
+def decompress(dictionary_id, body):
+    """Decompress a stored description"""
+    dictionary = _dictionary(dictionary_id)
+    decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+    return (decompressor.decompress(body) + decompressor.flush()).decode('utf-8')
+
+def train_dictionary(samples, size=MAX_DICTIONARY_SIZE):
+    """Build a preset dictionary from lines and phrases that repeat across descriptions
+
+    zlib matches against the end of the dictionary most cheaply, so the most
+    frequent strings are placed last.
+    """
+    counts = Counter()
+    for text in samples:
+        if not text:
+            continue
+        pieces = set()
+        for line in text.splitlines():
+            line = line.strip()
+            if len(line) >= 8:
+                pieces.add(line)
+            words = line.split()
+            pieces.update(' '.join(words[i:i + 4]) for i in range(len(words) - 3))
+        counts.update(pieces)
+
+    # Score by bytes saved: occurrences beyond the first times length
+    scored = sorted(
+        ((count - 1) * len(piece), piece) for piece, count in counts.items() if count > 1
+    )
+    chosen = []
+    total = 0
+    for _, piece in reversed(scored):
+        encoded = piece.encode('utf-8') + b'\n'
+        if total + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        total += len(encoded)
+    return b''.join(reversed(chosen))
+
+def store_scraped(job_id, text):
+    """Add the compressed description of a scraped job to the session"""
+    if text is None:
+        return
+    dictionary_id, body = compress(text)
+    db.session.add(JobDescription(job_id=job_id, dictionary_id=dictionary_id, body=body,
+                                  size=len(text.encode('utf-8'))))
+
+def store_manual(job_id, text):
+    """Store the compressed description of a manual job in the MongoDB side collection"""
+    # Imported here, mongo_models stores descriptions when manual jobs are created
+    from mongo_models import mongo
+    if text is None:
+        return
+    dictionary_id, body = compress(text)
+    mongo.db.user_job_descriptions.replace_one(
+        {'_id': ObjectId(job_id)},
+        {'_id': ObjectId(job_id), 'dictionary_id': dictionary_id, 'body': Binary(body),
+         'size': len(text.encode('utf-8'))},
+        upsert=True
+    )
+
+def delete_scraped(job_ids):
+    """Delete scraped job descriptions in the current session"""
+    JobDescription.query.filter(JobDescription.job_id.in_(list(job_ids))).delete(synchronize_session=False)
+
+def delete_manual(job_id):
+    """Delete a manual job description from MongoDB"""
+    from mongo_models import mongo
+    mongo.db.user_job_descriptions.delete_one({'_id': ObjectId(job_id)})
+
+def _chunks(values, size=LOAD_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def load_scraped(job_ids):
+    """Descriptions of scraped jobs by id, decompressed"""
+    texts = {}
+    for chunk in _chunks(job_ids):
+        rows = db.session.query(JobDescription.job_id, JobDescription.dictionary_id, JobDescription.body).filter(
+            JobDescription.job_id.in_(chunk)
+        )
+        texts.update((job_id, decompress(dictionary_id, body)) for job_id, dictionary_id, body in rows)
+    return texts
+
+def load_manual(job_ids):
+    """Descriptions of manual jobs by id string, decompressed"""
+    from mongo_models import mongo
+    texts = {}
+    object_ids = [ObjectId(job_id) for job_id in job_ids if ObjectId.is_valid(job_id)]
+    for chunk in _chunks(object_ids):
+        docs = mongo.db.user_job_descriptions.find({'_id': {'$in': chunk}})
+        texts.update((str(doc['_id']), decompress(doc.get('dictionary_id'), bytes(doc['body']))) for doc in docs)
+    return texts
+
+def attach(jobs):
+    """Fill in the description of job dictionaries that do not carry it inline
+
+    Scraped jobs have integer ids and manual jobs ObjectId strings, the same rule
+    the frontend uses. Jobs that still have an inline description keep it.
+    """
+    missing = [job for job in jobs if not job.get('description')]
+    if not missing:
+        return jobs
+    scraped = load_scraped(job['id'] for job in missing if isinstance(job.get('id'), int))
+    manual = load_manual(job['id'] for job in missing if isinstance(job.get('id'), str))
+    for job in missing:
+        texts = scraped if isinstance(job.get('id'), int) else manual
+        job['description'] = texts.get(job.get('id'), job.get('description'))
+    return jobs
+
+def _sample_descriptions(limit):
+    """Inline and already stored descriptions from both stores, used for training"""
+    from mongo_models import mongo
+    samples = [
+        text for (text,) in db.session.query(Job.description).filter(Job.description.isnot(None)).limit(limit)
+    ]
+    remaining = max(0, limit - len(samples))
+    if remaining:
+        rows = db.session.query(JobDescription.dictionary_id, JobDescription.body).limit(remaining)
+        samples.extend(decompress(dictionary_id, body) for dictionary_id, body in rows)
+    remaining = max(0, limit - len(samples))
+    if remaining:
+        docs = mongo.db.user_jobs.find({'description': {'$type': 'string'}}, {'description': 1}).limit(remaining)
+        samples.extend(doc['description'] for doc in docs)
+    return samples
+
+def train(limit=5000):
+    """Train and store a new dictionary, new descriptions are compressed with it"""
+    global _current_dictionary_id, _dictionary_loaded
+    samples = _sample_descriptions(limit)
+    data = train_dictionary(samples)
+    if not data:
+        logger.warning("Not enough repeated text to train a description dictionary")
+        return None
+
+    row = DescriptionDictionary(data=data, sample_count=len(samples))
+    db.session.add(row)
+    db.session.commit()
+    with _lock:
+        _dictionaries[row.id] = data
+        _current_dictionary_id = row.id
+        _dictionary_loaded = True
+    logger.info(f"Trained description dictionary {row.id} ({len(data)} bytes) on {len(samples)} samples")
+    return row.id
+
+def migrate(batch_size=MIGRATE_BATCH_SIZE):
+    """Move inline descriptions from both stores into the compressed side stores"""
+    from mongo_models import mongo
+    moved_scraped = 0
+    while True:
+        rows = (db.session.query(Job.id, Job.description)
+                .filter(Job.description.isnot(None))
+                .order_by(Job.id).limit(batch_size).all())
+        if not rows:
+            break
+        try:
+            for job_id, text in rows:
+                store_scraped(job_id, text)
+            Job.query.filter(Job.id.in_([job_id for job_id, _ in rows])).update(
+                {'description': None}, synchronize_session=False
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        moved_scraped += len(rows)
+
+    moved_manual = 0
+    for doc in mongo.db.user_jobs.find({'description': {'$exists': True}}, {'description': 1}):
+        if doc.get('description') is not None:
+            store_manual(str(doc['_id']), doc['description'])
+        mongo.db.user_jobs.update_one({'_id': doc['_id']}, {'$unset': {'description': ''}})
+        moved_manual += 1
+
+    logger.info(f"Moved {moved_scraped} scraped and {moved_manual} manual descriptions out of line")
+    return moved_scraped, moved_manual
+
+# Flask CLI commands, e.g. `flask --app app descriptions migrate`
+descriptions_cli = AppGroup('descriptions', help='Compressed out-of-line job descriptions')
+
+@descriptions_cli.command('train')
+@click.option('--limit', type=int, default=5000, help='Number of descriptions to sample')
+def train_command(limit):
+    """Train a new zlib preset dictionary on the description corpus"""
+    dictionary_id = train(limit)
+    click.echo(f"Trained dictionary {dictionary_id}" if dictionary_id else "No dictionary trained")
+
+@descriptions_cli.command('migrate')
+@click.option('--train/--no-train', 'train_first', default=True, help='Train a dictionary before moving')
+def migrate_command(train_first):
+    """Move inline descriptions into job_descriptions and user_job_descriptions"""
+    if train_first:
+        train()
+    moved_scraped, moved_manual = migrate()
+    click.echo(f"Moved {moved_scraped} scraped and {moved_manual} manual descriptions")
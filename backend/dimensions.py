@@ -0,0 +1,259 @@
+import logging
+import re
+import threading
+import time
+import unicodedata
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from models import db, Job, JobListingRead, Company, Location, JobType
+import replicas
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Dimension per free-text job field, and the foreign key column holding its id
+MODELS = {'company': Company, 'location': Location, 'job_type': JobType}
+ID_FIELDS = tuple(f'{field}_id' for field in MODELS)
+
+_WORD_RE = re.compile(r'[^\w]+')
+# Legal form suffixes that do not distinguish companies ("Swiss Re Ltd" is "Swiss Re")
+_COMPANY_SUFFIXES = {
+    'ag', 'bv', 'co', 'corp', 'corporation', 'gmbh', 'inc', 'incorporated',
+    'limited', 'llc', 'llp', 'lp', 'ltd', 'plc', 'sa', 'se'
+}
+
+def _normalize(name):
+    """Casefolded words of a name without accents or punctuation"""
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _WORD_RE.sub(' ', text.casefold()).split()
+
+def canonical_key(field, name):
+    """Canonical form names of the same dimension value share
+
+    Companies drop legal form suffixes, locations are keyed on the whole name
+    ("London, UK" and "London, Ontario" stay apart, a country filter matches
+    both parts) and job types ignore spacing and hyphens ("Full-time", "Full Time").
+    """
+    if not name:
+        return None
+    words = _normalize(name)
+    if field == 'company':
+        while len(words) > 1 and words[-1] in _COMPANY_SUFFIXES:
+            words.pop()
+    if field == 'job_type':
+        return ''.join(words) or None
+    return ' '.join(words) or None
+
+class DimensionCache:
+    """In-process name_key -> id and id -> name maps for one dimension"""
+
+    def __init__(self):
+        self.ids = {}
+        self.names = {}
+        self.max_id = 0
+        self.loaded_at = None
+
+    def add(self, dimension_id, key, name):
+        self.ids[key] = dimension_id
+        self.names[dimension_id] = name
+        self.max_id = max(self.max_id, dimension_id)
+
+_caches = {field: DimensionCache() for field in MODELS}
+_lock = threading.RLock()
+
+def reset():
+    """Drop the cached dimensions, they are reloaded on next use"""
+    with _lock:
+        for field in MODELS:
+            _caches[field] = DimensionCache()
+
+# Ids interned in a transaction that is rolled back no longer exist
+event.listen(db.session, 'after_rollback', lambda session: reset())
+
+def _cache(field):
+    """Loaded cache of a dimension, refreshed after DIMENSION_CACHE_TTL seconds"""
+    ttl = current_app.config.get('DIMENSION_CACHE_TTL', 300)
+    with _lock:
+        cache = _caches[field]
+        if cache.loaded_at is None or time.monotonic() - cache.loaded_at > ttl:
+            model = MODELS[field]
+            cache = DimensionCache()
+            # From the primary, a lagging replica would leave new ids unnamed until the next reload
+            with replicas.on_primary():
+                for dimension_id, key, name in db.session.query(model.id, model.name_key, model.name):
+                    cache.add(dimension_id, key, name)
+            cache.loaded_at = time.monotonic()
+            _caches[field] = cache
+        return cache
+
+def _load_new(field, cache):
+    """Add the rows created since the cache was loaded, by this or any other process
+
+    Dimension rows are never deleted and ids only grow, so one primary key range
+    query keeps filters and names current between the DIMENSION_CACHE_TTL reloads.
+    """
+    model = MODELS[field]
+    with replicas.on_primary():
+        rows = db.session.query(model.id, model.name_key, model.name).filter(model.id > cache.max_id).all()
+    for dimension_id, key, name in rows:
+        cache.add(dimension_id, key, name)
+
+def intern(field, name):
+    """Id of the dimension row for a name, creating it in the current session if new"""
+    key = canonical_key(field, name)
+    if key is None:
+        return None
+    with _lock:
+        cache = _cache(field)
+        dimension_id = cache.ids.get(key)
+        if dimension_id is not None:
+            return dimension_id
+
+        model = MODELS[field]
+        # Another process may have added it since the cache was loaded
+        row = model.query.filter_by(name_key=key).first()
+        if row is None:
+            length = model.name.type.length
+            row = model(name=name.strip()[:length], name_key=key[:length])
+            try:
+                with db.session.begin_nested():
+                    db.session.add(row)
+            except IntegrityError:
+                row = model.query.filter_by(name_key=key).one()
+        cache.add(row.id, key, row.name)
+        return row.id
+
+def lookup(field, name):
+    """Id of the existing dimension row for a name, None when there is none (nothing is created)"""
+    key = canonical_key(field, name)
+    if key is None:
+        return None
+    with _lock:
+        cache = _cache(field)
+        if key not in cache.ids:
+            _load_new(field, cache)
+        return cache.ids.get(key)
+
+def ids_for(company=None, location=None, job_type=None):
+    """Dimension ids for a job's company, location and job type"""
+    return {
+        'company_id': intern('company', company),
+        'location_id': intern('location', location),
+        'job_type_id': intern('job_type', job_type)
+    }
+
+def name(field, dimension_id):
+    """Display name of a dimension id"""
+    if dimension_id is None:
+        return None
+    with _lock:
+        cache = _cache(field)
+        if dimension_id not in cache.names:
+            # Interned by another process since the cache was loaded
+            _load_new(field, cache)
+        return cache.names.get(dimension_id)
+
+def name_matches(field, name, needle):
+    """Whether a filter needle matches a name (case-insensitive, on the name or its canonical key)"""
+    if not name:
+        return False
+    needle = needle.strip().casefold()
+    key = canonical_key(field, needle) or needle
+    return key in (canonical_key(field, name) or '') or needle in name.casefold()
+
+def matching_ids(field, needle):
+    """Ids of dimension values containing the needle (case-insensitive), for filters"""
+    needle = needle.strip().casefold()
+    key = canonical_key(field, needle) or needle
+    with _lock:
+        cache = _cache(field)
+        # Values interned by other processes (the scraper, other workers) are filterable right away
+        _load_new(field, cache)
+        return [
+            dimension_id for name_key, dimension_id in cache.ids.items()
+            if key in name_key or needle in cache.names[dimension_id].casefold()
+        ]
+
+def facet(field, counts):
+    """Merge (id, count) pairs from one or more stores into facet entries, largest first"""
+    totals = {}
+    for dimension_id, count in counts:
+        totals[dimension_id] = totals.get(dimension_id, 0) + count
+    entries = [{field: name(field, dimension_id), 'count': count} for dimension_id, count in totals.items()]
+    entries.sort(key=lambda entry: entry['count'], reverse=True)
+    return entries
+
+def rekey():
+    """Recompute name_key of every dimension row after canonical_key changed
+
+    A row whose new key is already taken keeps its old key, backfill moves its
+    jobs to the row of their own name. Returns the number of rows changed.
+    """
+    changed = 0
+    for field, model in MODELS.items():
+        rows = model.query.all()
+        taken = {row.name_key for row in rows}
+        length = model.name_key.type.length
+        for row in rows:
+            key = (canonical_key(field, row.name) or row.name_key)[:length]
+            # Freed keys are not reused, the updates are flushed in row order
+            if key != row.name_key and key not in taken:
+                taken.add(key)
+                row.name_key = key
+                changed += 1
+    db.session.flush()
+    reset()
+    return changed
+
+def backfill():
+    """Intern the names already stored in both stores and the read model and set their ids
+
+    Keys are recomputed first, so jobs merged under an earlier canonical_key
+    (locations keyed by their first part) get a row of their own.
+    """
+    # Imported here, mongo_models interns dimensions when manual jobs are created
+    from mongo_models import mongo
+
+    updated = 0
+    try:
+        rekeyed = rekey()
+        if rekeyed:
+            logger.info(f"Recomputed the key of {rekeyed} dimension rows")
+        for field in MODELS:
+            id_field = f'{field}_id'
+            names = {value for (value,) in db.session.query(getattr(Job, field)).distinct()}
+            names.update(mongo.db.user_jobs.distinct(field))
+            for value in names:
+                if value is None:
+                    continue
+                dimension_id = intern(field, value)
+                updated += Job.query.filter(getattr(Job, field) == value).update(
+                    {id_field: dimension_id}, synchronize_session=False
+                )
+                JobListingRead.query.filter(getattr(JobListingRead, field) == value).update(
+                    {id_field: dimension_id}, synchronize_session=False
+                )
+                updated += mongo.db.user_jobs.update_many(
+                    {field: value}, {'$set': {id_field: dimension_id}}
+                ).modified_count
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    logger.info(f"Dimension ids set on {updated} jobs")
+    return updated
+
+# Flask CLI commands, e.g. `flask --app app dimensions backfill`
+dimensions_cli = AppGroup('dimensions', help='Company, location and job type dimension tables')
+
+@dimensions_cli.command('backfill')
+def backfill_command():
+    """Populate the dimension tables and ids from existing jobs"""
+    updated = backfill()
+    counts = ', '.join(f"{len(_cache(field).ids)} {field}s" for field in MODELS)
+    click.echo(f"Set dimension ids on {updated} jobs ({counts})")
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy import text
+from models import db
+from mongo_models import mongo
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Probes for the container runtime, served outside /api
+probes = Blueprint('probes', __name__)
+
+# Last result per check, probes within HEALTH_CACHE_TTL seconds reuse it
+_results = {}
+_locks = defaultdict(threading.Lock)
+
+class CheckTimeout(Exception):
+    """Raised when a database does not answer within HEALTH_CHECK_TIMEOUT seconds"""
+
+def _call_with_timeout(app, check, timeout):
+    """Run check() in its own thread and app context, waiting at most timeout seconds for it"""
+    outcome = {}
+
+    def target():
+        with app.app_context():
+            try:
+                outcome['value'] = check()
+            except Exception as e:
+                outcome['error'] = e
+            finally:
+                db.session.remove()
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise CheckTimeout(f"No answer within {timeout:g} seconds")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('value')
+
+def cached(name, check):
+    """Result of a check as {'ok', 'value' or 'error', 'latency_ms'}, run at most once per HEALTH_CACHE_TTL seconds
+
+    Concurrent probes wait for the check in flight instead of starting their own.
+    """
+    ttl = current_app.config.get('HEALTH_CACHE_TTL', 5)
+    with _locks[name]:
+        checked_at, result = _results.get(name, (None, None))
+        if checked_at is not None and time.monotonic() - checked_at < ttl:
+            return result
+        started = time.perf_counter()
+        try:
+            value = _call_with_timeout(current_app._get_current_object(), check,
+                                       current_app.config.get('HEALTH_CHECK_TIMEOUT', 2))
+            result = {'ok': True, 'value': value}
+        except Exception as e:
+            logger.error(f"Health check {name} failed: {str(e)}")
+            result = {'ok': False, 'error': str(e)}
+        result['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        _results[name] = (time.monotonic(), result)
+        return result
+
+def reset():
+    """Forget the cached results, the next probe checks again"""
+    _results.clear()
+
+def _ping_mysql():
+    db.session.execute(text('SELECT 1'))
+
+def _ping_mongo():
+    mongo.db.command('ping')
+
+def _estimate_mysql_jobs():
+    """Row estimate of the jobs table from the InnoDB statistics, None where those are not available"""
+    if db.engine.dialect.name != 'mysql':
+        return None
+    return db.session.execute(text(
+        "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'jobs'"
+    )).scalar()
+
+def _estimate_mongo_jobs():
+    # Read from the collection metadata, no documents are scanned
+    return mongo.db.user_jobs.estimated_document_count()
+
+def database_status():
+    """Cached ping of each database, {'mysql': result, 'mongodb': result}"""
+    return {'mysql': cached('mysql', _ping_mysql), 'mongodb': cached('mongodb', _ping_mongo)}
+
+def estimated_job_counts():
+    """Cached job count estimates per database, None where a database cannot be asked"""
+    mysql_count = cached('mysql_jobs', _estimate_mysql_jobs)
+    mongo_count = cached('mongodb_jobs', _estimate_mongo_jobs)
+    return {
+        'mysql': mysql_count.get('value') if mysql_count['ok'] else None,
+        'mongodb': mongo_count.get('value') if mongo_count['ok'] else None
+    }
+
+@probes.route('/livez', methods=['GET'])
+def livez():
+    """The process is up and serving requests, never touches a database"""
+    return jsonify({'status': 'ok'})
+
+@probes.route('/readyz', methods=['GET'])
+def readyz():
+    """Both databases answer a ping, 503 otherwise"""
+    checks = database_status()
+    ready = all(check['ok'] for check in checks.values())
+    body = {
+        'status': 'ok' if ready else 'unavailable',
+        'checks': {
+            name: {'status': 'ok' if check['ok'] else 'error', 'latency_ms': check['latency_ms'],
+                   **({} if check['ok'] else {'error': check['error']})}
+            for name, check in checks.items()
+        }
+    }
+    return jsonify(body), 200 if ready else 503
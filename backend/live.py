@@ -0,0 +1,323 @@
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from flask import current_app
+from pymongo.errors import PyMongoError
+from models import db, JobEvent
+from mongo_models import mongo, restore_dates
+from serializers import dumps
+import dimensions
+
+# Live job events for the SSE endpoints. Scraped jobs reach the MySQL outbox (job_events)
+# in the transaction that stores or deletes them, manual jobs are read from a MongoDB change
+# stream on user_jobs. One broker per process reads both feeds and fans every event out to
+# all connected clients, so the number of clients never multiplies the database reads.
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Job fields sent with every event, the dimension ids are only used for the stats deltas
+EVENT_FIELDS = ('id', 'source', 'title', 'company', 'location', 'job_type', 'posting_date', 'url', 'created_at')
+# Stats response key of each dimension
+STATS_KEYS = {'company': 'companies', 'location': 'locations', 'job_type': 'job_types'}
+
+OUTBOX_BATCH_SIZE = 500
+# Most skipped outbox ids looked up again after one read, a bigger jump is a rolled back bulk insert
+MAX_OUTBOX_GAPS = 1000
+# MongoDB error codes of change streams on a standalone server and of an expired resume token
+NOT_A_REPLICA_SET = 40573
+CHANGE_STREAM_HISTORY_LOST = 286
+
+def _enabled():
+    return current_app.config.get('LIVE_EVENTS_ENABLED', True)
+
+def job_summary(job, source):
+    """Event fields and dimension ids of a Job row or a user job document"""
+    fields = EVENT_FIELDS + dimensions.ID_FIELDS
+    values = job if isinstance(job, dict) else {field: getattr(job, field, None) for field in fields}
+    summary = {field: values.get(field) for field in fields}
+    summary['id'] = str(values.get('_id', values.get('id')))
+    summary['source'] = source
+    return summary
+
+def _outbox_row(event_type, job):
+    job_id = job['id'] if isinstance(job, dict) else job.id
+    return JobEvent(event_type=event_type, job_id=job_id,
+                    payload=dumps(job_summary(job, 'scraped')).decode('utf-8'))
+
+def record_scraped_inserts(jobs):
+    """Add outbox rows for new scraped jobs to the session, committed with the jobs"""
+    if jobs and _enabled():
+        db.session.add_all([_outbox_row('insert', job) for job in jobs])
+
+def record_scraped_delete(job):
+    """Add the outbox row of a deleted scraped job to the session, committed with the delete"""
+    if _enabled():
+        db.session.add(_outbox_row('delete', job))
+
+def record_scraped_deletes(jobs):
+    """Add outbox rows for scraped jobs (rows or archive records) leaving the hot table, committed with the deletes"""
+    if jobs and _enabled():
+        db.session.add_all([_outbox_row('delete', job) for job in jobs])
+
+def prune_outbox(retention_hours):
+    """Delete outbox rows older than retention_hours, returns how many were deleted"""
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+    deleted = JobEvent.query.filter(JobEvent.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+def stats_delta(event_type, summary):
+    """Change of the /api/jobs/stats counts caused by one event
+
+    Facet entries are keyed by the dimension's display name, like the stats
+    response. Dimensions the event does not know (a deleted manual job the
+    broker never saw) are left out.
+    """
+    change = 1 if event_type == 'insert' else -1
+    delta = {'total_jobs': change, 'sources': {summary['source']: change}}
+    for field, key in STATS_KEYS.items():
+        name = dimensions.name(field, summary.get(f'{field}_id'))
+        if name is not None:
+            delta[key] = {name: change}
+    return delta
+
+def format_event(event):
+    """One server-sent event as bytes"""
+    if event.get('type') == 'reset':
+        return b'event: reset\ndata: {}\n\n'
+    return b'id: %d\ndata: %s\n\n' % (event['seq'], dumps(event))
+
+class Subscription:
+    """Bounded queue of events for one client
+
+    A client that falls LIVE_QUEUE_SIZE events behind is dropped instead of
+    holding up the others, it reconnects and catches up with Last-Event-ID.
+    """
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next event, None when none arrived within timeout seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class OutboxCursor:
+    """Read position in the job_events outbox that looks up the ids it skipped again
+
+    Auto-increment ids are handed out on insert but become visible on commit,
+    so a transaction can commit a smaller id after a bigger one was read. Ids
+    skipped by a read are looked up again for gap_timeout seconds, after that
+    their transaction counts as rolled back.
+    """
+
+    def __init__(self, gap_timeout):
+        self.last_id = None
+        self.gap_timeout = gap_timeout
+        self._gaps = {}  # Skipped id -> time.monotonic() of the read that skipped it
+
+    def read(self, limit):
+        """Outbox rows committed since the previous read, in id order"""
+        if self.last_id is None:
+            # Start at the current end, earlier events are already reflected in the data
+            self.last_id = db.session.query(db.func.max(JobEvent.id)).scalar() or 0
+        now = time.monotonic()
+        for event_id, skipped_at in list(self._gaps.items()):
+            if now - skipped_at > self.gap_timeout:
+                del self._gaps[event_id]
+        condition = JobEvent.id > self.last_id
+        if self._gaps:
+            condition = db.or_(condition, JobEvent.id.in_(list(self._gaps)))
+        rows = JobEvent.query.filter(condition).order_by(JobEvent.id).limit(limit).all()
+        for row in rows:
+            if row.id > self.last_id:
+                skipped = range(max(self.last_id + 1, row.id - MAX_OUTBOX_GAPS), row.id)
+                self._gaps.update(dict.fromkeys(skipped, now))
+                self.last_id = row.id
+            else:
+                self._gaps.pop(row.id, None)
+        return rows
+
+class Broker:
+    """Reads the outbox and the change stream once per process and publishes to every subscription"""
+
+    def __init__(self, app):
+        self.app = app
+        self._subscriptions = set()
+        self._recent = deque(maxlen=app.config.get('LIVE_REPLAY_SIZE', 500))
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._started = False
+        self._stop = threading.Event()
+        # Dimension ids of the manual jobs, change stream deletes only carry the _id
+        self._manual_dimensions = {}
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for target in (self._tail_outbox, self._watch_mongo):
+            threading.Thread(target=target, name=f'live{target.__name__}', daemon=True).start()
+        logger.info("Live event feeds started")
+
+    def stop(self):
+        self._stop.set()
+
+    def subscribe(self, subscription, last_event_id=None):
+        """Register a subscription, replaying the events after last_event_id
+
+        A reset event is queued instead when those events are no longer kept
+        (or were sent by another process), the client then reloads its data.
+        """
+        self.start()
+        with self._lock:
+            if last_event_id is not None and last_event_id != self._sequence:
+                oldest = self._recent[0]['seq'] if self._recent else self._sequence + 1
+                if oldest - 1 <= last_event_id < self._sequence:
+                    for event in self._recent:
+                        if event['seq'] > last_event_id:
+                            subscription.push(event)
+                else:
+                    subscription.push({'type': 'reset'})
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event_type, summary):
+        event = {
+            'type': event_type,
+            'job': {field: summary.get(field) for field in EVENT_FIELDS},
+            'stats': stats_delta(event_type, summary)
+        }
+        with self._lock:
+            self._sequence += 1
+            event['seq'] = self._sequence
+            self._recent.append(event)
+            for subscription in list(self._subscriptions):
+                subscription.push(event)
+                if subscription.overflowed:
+                    self._subscriptions.discard(subscription)
+        return event
+
+    def _tail_outbox(self):
+        """Poll job_events for the rows committed since the last poll"""
+        poll_interval = self.app.config.get('LIVE_POLL_INTERVAL', 1.0)
+        retention = self.app.config.get('LIVE_OUTBOX_RETENTION', 24)
+        cursor = OutboxCursor(self.app.config.get('LIVE_OUTBOX_GAP_TIMEOUT', 60))
+        pruned_at = 0.0
+        while not self._stop.is_set():
+            rows = []
+            with self.app.app_context():
+                try:
+                    rows = cursor.read(OUTBOX_BATCH_SIZE)
+                    for row in rows:
+                        self.publish(row.event_type, json.loads(row.payload))
+                    if time.monotonic() - pruned_at > 3600:
+                        pruned = prune_outbox(retention)
+                        pruned_at = time.monotonic()
+                        if pruned:
+                            logger.info(f"Pruned {pruned} outbox events older than {retention} hours")
+                except Exception as e:
+                    logger.error(f"Error reading the job event outbox: {str(e)}")
+                finally:
+                    db.session.remove()
+            if len(rows) < OUTBOX_BATCH_SIZE:
+                self._stop.wait(poll_interval)
+
+    def _watch_mongo(self):
+        """Follow the user_jobs change stream, resuming after errors where it left off"""
+        retry_interval = self.app.config.get('LIVE_RETRY_INTERVAL', 30)
+        resume_token = None
+        warned = False
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    pipeline = [{'$match': {'operationType': {'$in': ['insert', 'delete']}}}]
+                    with mongo.db.user_jobs.watch(pipeline, resume_after=resume_token) as stream:
+                        if resume_token is None:
+                            # Opened first, so no job inserted while loading is missed
+                            self._load_manual_dimensions(mongo.db.user_jobs)
+                        while not self._stop.is_set() and stream.alive:
+                            change = stream.try_next()
+                            if change is not None:
+                                self._publish_change(change)
+                            resume_token = stream.resume_token or resume_token
+                except PyMongoError as e:
+                    if getattr(e, 'code', None) == NOT_A_REPLICA_SET:
+                        if not warned:
+                            warned = True
+                            logger.warning("MongoDB is not a replica set, manual job events are not available "
+                                           "(start mongod with --replSet)")
+                    else:
+                        logger.error(f"MongoDB change stream failed: {str(e)}")
+                    if getattr(e, 'code', None) == CHANGE_STREAM_HISTORY_LOST:
+                        # The oplog moved past the token, start over from now
+                        resume_token = None
+                except Exception as e:
+                    logger.error(f"Error following the MongoDB change stream: {str(e)}")
+                finally:
+                    db.session.remove()
+            self._stop.wait(retry_interval)
+
+    def _load_manual_dimensions(self, collection):
+        projection = {field: 1 for field in dimensions.ID_FIELDS}
+        self._manual_dimensions = {
+            str(doc['_id']): {field: doc.get(field) for field in dimensions.ID_FIELDS}
+            for doc in collection.find({}, projection)
+        }
+
+    def _publish_change(self, change):
+        job_id = str(change['documentKey']['_id'])
+        if change['operationType'] == 'insert':
+            summary = job_summary(restore_dates(change['fullDocument']), 'manual')
+            self._manual_dimensions[job_id] = {field: summary[field] for field in dimensions.ID_FIELDS}
+            self.publish('insert', summary)
+        else:
+            summary = {'id': job_id, 'source': 'manual', **self._manual_dimensions.pop(job_id, {})}
+            self.publish('delete', summary)
+
+# Process wide broker, started by the first subscriber
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker(app=None):
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = Broker(app or current_app._get_current_object())
+        return _broker
+
+def parse_last_event_id(value):
+    """Last-Event-ID header as an int, None when missing or malformed"""
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+def stream_events(broker, subscription, heartbeat):
+    """SSE body for a subscription: events as they arrive and a comment line every heartbeat seconds"""
+    try:
+        yield b'retry: 3000\n\n'
+        while not subscription.overflowed:
+            event = subscription.get(heartbeat)
+            yield format_event(event) if event is not None else b': keepalive\n\n'
+    finally:
+        broker.unsubscribe(subscription)
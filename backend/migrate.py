@@ -0,0 +1,117 @@
+import logging
+import click
+from flask.cli import AppGroup
+from models import db, SORT_FIELDS
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Single column indexes replaced by the (source, field, id) and (duplicate_of, field, id) listing indexes
+OBSOLETE_INDEXES = {
+    'jobs': ('idx_company', 'idx_location', 'idx_posting_date', 'idx_created_at', 'ix_jobs_duplicate_of'),
+    'job_listings_read': ('idx_read_source_created_at', 'idx_read_created_at', 'idx_read_posting_date',
+                          'ix_job_listings_read_duplicate_of'),
+}
+
+def create_tables():
+    """Create the MySQL tables that do not exist yet"""
+    db.create_all()
+    logger.info("MySQL database tables created")
+
+def create_indexes():
+    """Add declared indexes missing from existing tables and drop the obsolete ones
+
+    create_all only creates indexes together with a new table, so indexes added to
+    a model later are created here.
+    """
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                logger.info(f"Created index {index.name} on {table.name}")
+        for name in OBSOLETE_INDEXES.get(table.name, ()):
+            if name in existing:
+                # Dropped through a bare copy of the table, the model must not gain the index
+                db.Index(name, _table=db.Table(table.name, db.MetaData())).drop(db.engine)
+                logger.info(f"Dropped index {name} on {table.name}")
+
+def create_mongo_indexes():
+    """Create the MongoDB indexes, existing ones are left as they are"""
+    # Imported here so migrating MySQL alone does not need the Mongo models
+    from mongo_models import mongo
+
+    mongo.db.user_jobs.create_index([("company", "text"), ("location", "text"), ("title", "text")])
+    # Filters and facets run on the dimension ids
+    for id_field in ("company_id", "location_id", "job_type_id"):
+        mongo.db.user_jobs.create_index(id_field)
+    # Sorted listings, source first because every listing matches on it
+    for field in SORT_FIELDS:
+        mongo.db.user_jobs.create_index([("source", 1), (field, 1), ("_id", 1)], name=f"source_{field}_id")
+    # One inbox entry per saved search and job, paged in (matched_at, _id) order
+    mongo.db.saved_search_inbox.create_index([("search_id", 1), ("job_key", 1)], unique=True)
+    mongo.db.saved_search_inbox.create_index([("search_id", 1), ("matched_at", 1), ("_id", 1)],
+                                             name="search_matched_id")
+    if "search_id_1_matched_at_-1" in mongo.db.saved_search_inbox.index_information():
+        # Replaced by search_matched_id, which also orders the entries matched in the same second
+        mongo.db.saved_search_inbox.drop_index("search_id_1_matched_at_-1")
+    logger.info("MongoDB indexes created successfully")
+
+def migrate_mongo_dates(batch_size=1000):
+    """Convert user job dates stored as text to BSON dates, returns (converted, cleared)
+
+    Posting dates used to be stored as YYYY-MM-DD strings. Ones that do not parse
+    are removed, listings show them as missing like any job without a date.
+    """
+    from pymongo import UpdateOne
+    from mongo_models import mongo, to_bson_date
+
+    converted = cleared = 0
+    updates = []
+    for doc in mongo.db.user_jobs.find({'posting_date': {'$type': 'string'}}, {'posting_date': 1}):
+        try:
+            # Only the date part, in case a time was stored along with it
+            value = to_bson_date(doc['posting_date'].strip()[:10])
+        except ValueError:
+            value = None
+        if value is None:
+            updates.append(UpdateOne({'_id': doc['_id']}, {'$unset': {'posting_date': ''}}))
+            cleared += 1
+        else:
+            updates.append(UpdateOne({'_id': doc['_id']}, {'$set': {'posting_date': value}}))
+            converted += 1
+        if len(updates) >= batch_size:
+            mongo.db.user_jobs.bulk_write(updates, ordered=False)
+            updates = []
+    if updates:
+        mongo.db.user_jobs.bulk_write(updates, ordered=False)
+    logger.info(f"Converted {converted} MongoDB posting dates, cleared {cleared} that were not dates")
+    return converted, cleared
+
+def migrate(mongo_indexes=True):
+    """Bring both databases up to the current schema, safe to run repeatedly"""
+    create_tables()
+    create_indexes()
+    if mongo_indexes:
+        create_mongo_indexes()
+        migrate_mongo_dates()
+
+# Flask CLI commands, e.g. `flask --app app db migrate`
+db_cli = AppGroup('db', help='Database schema and indexes')
+
+@db_cli.command('migrate')
+@click.option('--skip-mongo', is_flag=True, help='Only create the MySQL tables and indexes')
+def migrate_command(skip_mongo):
+    """Create missing MySQL tables and indexes and MongoDB indexes, convert text dates (run on deploy, the app no longer does it on startup)"""
+    migrate(mongo_indexes=not skip_mongo)
+    click.echo("Database schema is up to date")
+
+@db_cli.command('migrate-dates')
+@click.option('--batch-size', type=int, default=1000, help='Documents updated per bulk write')
+def migrate_dates_command(batch_size):
+    """Convert MongoDB posting dates stored as text to BSON dates"""
+    converted, cleared = migrate_mongo_dates(batch_size)
+    click.echo(f"Converted {converted} posting dates, cleared {cleared} that were not dates")
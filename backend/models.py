@@ -1,22 +1,69 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from replicas import RoutingSession
 
-db = SQLAlchemy()
+# Reads of GET requests go to the read replica when one is configured
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+class Company(db.Model):
+    """Company dimension, one row per canonical company name"""
+    __tablename__ = 'companies'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), nullable=False)  # Display name (first spelling seen)
+    name_key = db.Column(db.String(255), nullable=False, unique=True)  # Canonicalized name
+
+class Location(db.Model):
+    """Location dimension, one row per canonical location"""
+    __tablename__ = 'locations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    name_key = db.Column(db.String(255), nullable=False, unique=True)
+
+class JobType(db.Model):
+    """Job type dimension (Full-time, Contract, scraped categories, ...)"""
+    __tablename__ = 'job_types'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    name_key = db.Column(db.String(50), nullable=False, unique=True)
+
+# Fields job listings can be sorted on, each backed by a (source, field, id) index
+# so a sorted page is read in index order without a sort step
+SORT_FIELDS = ('created_at', 'posting_date', 'title', 'company', 'location')
 
 class Job(db.Model):
     __tablename__ = 'jobs'
+    __table_args__ = tuple(
+        db.Index(f'idx_jobs_source_{field}', 'source', field, 'id') for field in SORT_FIELDS
+    ) + tuple(
+        # Listings collapsing duplicates (duplicate_of IS NULL), the leading duplicate_of
+        # also serves the lookups of the jobs pointing at a posting
+        db.Index(f'idx_jobs_duplicate_sort_{field}', 'duplicate_of', 'source', field, 'id') for field in SORT_FIELDS
+    ) + (
+        # The scraper looks up each batch's jobs by title, company and location
+        db.Index('idx_jobs_identity', 'title', 'company', 'location'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     company = db.Column(db.String(255), nullable=False)
     location = db.Column(db.String(255))
-    description = db.Column(db.Text)
+    # Legacy inline copy, descriptions are stored compressed in job_descriptions
+    # (`flask --app app descriptions migrate` moves old rows out of this column)
+    description = db.deferred(db.Column(db.Text))
     posting_date = db.Column(db.Date)
-    url = db.Column(db.String(500))
+    url = db.Column(db.String(500), index=True)  # Job page, re-parsed snapshots are matched on it
     salary = db.Column(db.String(100))
     job_type = db.Column(db.String(50))  # Full-time, Part-time, Contract, etc.
     experience_level = db.Column(db.String(50))
+    # Integer keys into the dimension tables, filters and facets run on these
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), index=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), index=True)
+    job_type_id = db.Column(db.Integer, db.ForeignKey('job_types.id'), index=True)
     source = db.Column(db.String(50), default="manual")  # manual or scraped
+    duplicate_of = db.Column(db.String(40))  # Key of the posting this one near-duplicates
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -34,6 +81,116 @@ class Job(db.Model):
             'job_type': self.job_type,
             'experience_level': self.experience_level,
             'source': self.source,
+            'duplicate_of': self.duplicate_of,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
\ No newline at end of file
+        }
+
+class DescriptionDictionary(db.Model):
+    """Preset zlib dictionary trained on the description corpus"""
+    __tablename__ = 'description_dictionaries'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    sample_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class JobDescription(db.Model):
+    """Compressed description of a scraped job, kept out of the jobs table"""
+    __tablename__ = 'job_descriptions'
+    
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id', ondelete='CASCADE'), primary_key=True)
+    dictionary_id = db.Column(db.Integer, db.ForeignKey('description_dictionaries.id'))
+    body = db.Column(db.LargeBinary(length=16777215), nullable=False)  # MEDIUMBLOB on MySQL
+    size = db.Column(db.Integer)  # Uncompressed size in bytes
+
+class JobListingRead(db.Model):
+    """Denormalized read model holding scraped (MySQL) and manual (MongoDB) jobs in one table
+
+    Descriptions are not copied, they are loaded from the compressed side stores when needed.
+    """
+    __tablename__ = 'job_listings_read'
+    __table_args__ = (
+        db.UniqueConstraint('source', 'job_id', name='uq_read_source_job'),
+        db.Index('idx_read_company_id', 'company_id'),
+        db.Index('idx_read_location_id', 'location_id'),
+        db.Index('idx_read_job_type_id', 'job_type_id'),
+    ) + tuple(
+        # Sorted listings across both sources and within one
+        index
+        for field in SORT_FIELDS
+        for index in (db.Index(f'idx_read_sort_{field}', field, 'id'),
+                      db.Index(f'idx_read_source_sort_{field}', 'source', field, 'id'))
+    ) + tuple(
+        # Listings collapsing duplicates (duplicate_of IS NULL) across both sources, the
+        # leading duplicate_of also serves the lookups of the jobs pointing at a posting
+        db.Index(f'idx_read_duplicate_sort_{field}', 'duplicate_of', field, 'id') for field in SORT_FIELDS
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(24), nullable=False)  # MySQL id or MongoDB ObjectId, as a string
+    source = db.Column(db.String(50), nullable=False)  # manual or scraped
+    title = db.Column(db.String(255), nullable=False)
+    company = db.Column(db.String(255), nullable=False)
+    location = db.Column(db.String(255))
+    posting_date = db.Column(db.Date)
+    url = db.Column(db.String(500))
+    salary = db.Column(db.String(100))
+    job_type = db.Column(db.String(50))
+    experience_level = db.Column(db.String(50))
+    company_id = db.Column(db.Integer)
+    location_id = db.Column(db.Integer)
+    job_type_id = db.Column(db.Integer)
+    duplicate_of = db.Column(db.String(40))
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+
+class ScraperRun(db.Model):
+    """One scraper run with its checkpoint, the last page whose jobs were committed"""
+    __tablename__ = 'scraper_logs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    run_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    source = db.Column(db.String(50), nullable=False, default='actuarylist', index=True)  # Source adapter
+    status = db.Column(db.String(50), nullable=False, index=True)  # running, success, partial, error
+    jobs_found = db.Column(db.Integer, default=0)
+    jobs_added = db.Column(db.Integer, default=0)
+    jobs_updated = db.Column(db.Integer, default=0)
+    error_message = db.Column(db.Text)
+    duration_seconds = db.Column(db.Integer, default=0)
+    start_page = db.Column(db.Integer, default=1)
+    end_page = db.Column(db.Integer)  # Last page the run was meant to crawl
+    last_committed_page = db.Column(db.Integer)  # Checkpoint, None until a page is committed
+    pages_completed = db.Column(db.Integer, default=0)
+    page_retries = db.Column(db.Integer, default=0)
+    resumed_from = db.Column(db.Integer)  # Run whose checkpoint this run continued from
+    finished_at = db.Column(db.DateTime)
+
+class PageSnapshot(db.Model):
+    """Raw HTML of a fetched page, stored gzipped under its content hash in the snapshot directory"""
+    __tablename__ = 'page_snapshots'
+    __table_args__ = (
+        db.UniqueConstraint('url', 'content_hash', name='uq_snapshot_url_hash'),
+        db.Index('idx_snapshot_kind_fetched_at', 'kind', 'fetched_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(500), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # listing or detail
+    source = db.Column(db.String(50), nullable=False, default='actuarylist')  # Source adapter that fetched it
+    content_hash = db.Column(db.String(64), nullable=False, index=True)  # sha256 of the HTML
+    size = db.Column(db.Integer)  # Uncompressed size in bytes
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class JobEvent(db.Model):
+    """Outbox of scraped job inserts and deletes, written in the transaction that changes the jobs
+
+    live.py tails it by id and pushes the events to the SSE clients.
+    """
+    __tablename__ = 'job_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(10), nullable=False)  # insert or delete
+    job_id = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON job summary with its dimension ids
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
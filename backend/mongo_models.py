@@ -1,10 +1,44 @@
 from flask_pymongo import PyMongo
 from bson.objectid import ObjectId
-from datetime import datetime
+from pymongo.errors import BulkWriteError
+from datetime import datetime, date
+from models import db
+import read_model
+import dedup
+import descriptions
+import dimensions
+import suggest
+import percolator
+import replicas
 
 # Initialize MongoDB
 mongo = PyMongo()
 
+def to_bson_date(value):
+    """A posting date (date, datetime or YYYY-MM-DD string) as the midnight datetime BSON stores
+
+    BSON has no date-only type. Empty values give None, anything else that is
+    not a date raises ValueError.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d')
+    raise ValueError(f"Not a date: {value!r}")
+
+def restore_dates(job):
+    """Turn a user job's stored posting date back into a date, like the MySQL DATE column
+
+    Both stores then return comparable native values, merged lists are sorted
+    on them directly and formatted once when encoded.
+    """
+    posting_date = job.get('posting_date')
+    if isinstance(posting_date, datetime):
+        job['posting_date'] = posting_date.date()
+    return job
+
 class UserJob:
     """MongoDB collection for user-added jobs"""
     
@@ -16,57 +50,96 @@ class UserJob:
         job_data['updated_at'] = datetime.utcnow()
         job_data['source'] = 'manual'  # Force source to manual for user-added jobs
         
-        # Handle date conversion for posting_date - convert to string format for MongoDB
+        # Posting dates are stored as BSON dates so they sort and range-filter server side
         if 'posting_date' in job_data:
-            if isinstance(job_data['posting_date'], str):
-                # Keep string format
-                pass
-            elif hasattr(job_data['posting_date'], 'strftime'):
-                # Convert datetime or date object to string
-                job_data['posting_date'] = job_data['posting_date'].strftime('%Y-%m-%d')
-            else:
-                # If not a string or date object, remove it to avoid serialization issues
-                job_data.pop('posting_date', None)
-        
-        result = mongo.db.user_jobs.insert_one(job_data)
+            job_data['posting_date'] = to_bson_date(job_data['posting_date'])
+        
+        # Intern company, location and job type into the shared dimension tables
+        job_data.update(dimensions.ids_for(job_data.get('company'), job_data.get('location'), job_data.get('job_type')))
+        # Committed before the document refers to the new ids, not left to the read model's transaction
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        # Assign the id up front so the job can be checked for near-duplicates before it is stored
+        job_id = ObjectId()
+        key = dedup.job_key('manual', job_id)
+        matches = dedup.mark_batch([(key, job_data.get('title'), job_data.get('description'))])
+        job_data['_id'] = job_id
+        job_data['duplicate_of'] = matches.get(key)
+        
+        # The description goes to the compressed side collection, not the job document
+        description = job_data.pop('description', None)
+        try:
+            result = mongo.db.user_jobs.insert_one(job_data)
+        except Exception:
+            # mark_batch indexed the job already, later jobs must not be flagged as its duplicates
+            dedup.forget(key)
+            raise
         job_data['_id'] = str(result.inserted_id)
+        descriptions.store_manual(job_data['_id'], description)
+        
+        # Keep the unified read model and the suggestion indexes in step with MongoDB
+        read_model.upsert_manual(job_data)
+        suggest.record(job_data)
+        job_data['description'] = description
+        restore_dates(job_data)
+        
+        # Deliver the new job to the inboxes of matching saved searches
+        percolator.percolate([dict(job_data, id=job_data['_id'])])
         return job_data
     
     @staticmethod
-    def get_all(filters=None):
-        """Retrieve all user jobs with optional filtering"""
+    def list_pipeline(filters=None, fields=None, sort_by='created_at', sort_order='desc'):
+        """Aggregation pipeline listing user jobs with optional filtering and field projection
+
+        sort_by is one of the SORT_FIELDS, each has a {source, field, _id} index
+        so the sort is read in index order.
+        """
         if filters is None:
             filters = {}
         
-        # Convert string filters to regex for case-insensitive search
+        # Resolve string filters to dimension ids (case-insensitive substring match)
         query = {}
-        if 'company' in filters and filters['company']:
-            query['company'] = {'$regex': filters['company'], '$options': 'i'}
-        if 'location' in filters and filters['location']:
-            query['location'] = {'$regex': filters['location'], '$options': 'i'}
-        if 'job_type' in filters and filters['job_type']:
-            query['job_type'] = {'$regex': filters['job_type'], '$options': 'i'}
+        for field in ('company', 'location', 'job_type'):
+            if filters.get(field):
+                query[f'{field}_id'] = {'$in': dimensions.matching_ids(field, filters[field])}
+        if filters.get('collapse_duplicates'):
+            # Matches documents without the field as well as explicit nulls
+            query['duplicate_of'] = None
         
         # Add source=manual by default (this is a user job collection)
         query['source'] = 'manual'
         
-        cursor = mongo.db.user_jobs.find(query).sort('created_at', -1)  # -1 for descending order
-        
-        # Convert MongoDB documents to dictionaries and convert ObjectId to string
-        jobs = []
-        for job in cursor:
-            job['id'] = str(job['_id'])  # Map MongoDB _id to id for frontend consistency
-            del job['_id']  # Remove the original _id
-            
-            # Format dates to match SQL format for frontend consistency
-            if 'created_at' in job and isinstance(job['created_at'], datetime):
-                job['created_at'] = job['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-            if 'updated_at' in job and isinstance(job['updated_at'], datetime):
-                job['updated_at'] = job['updated_at'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            jobs.append(job)
-        
-        return jobs
+        # Let the server map _id to id (string) so documents come back ready to encode,
+        # dates stay native and are formatted once at serialization time
+        direction = 1 if sort_order.lower() == 'asc' else -1
+        pipeline = [
+            {'$match': query},
+            {'$sort': {sort_by: direction, '_id': direction}}
+        ]
+        if fields:
+            # Only ship the requested fields (list views leave out the description)
+            projection = {field: 1 for field in fields if field != 'id'}
+            projection['_id'] = 0
+            projection['id'] = {'$toString': '$_id'}
+            pipeline.append({'$project': projection})
+        else:
+            pipeline.append({'$addFields': {'id': {'$toString': '$_id'}}})
+            pipeline.append({'$project': {'_id': 0}})
+        return pipeline
+    
+    @staticmethod
+    def get_all(filters=None, fields=None, sort_by='created_at', sort_order='desc'):
+        """Retrieve all user jobs with optional filtering, field projection and sorting"""
+        return UserJob.aggregate(UserJob.list_pipeline(filters, fields, sort_by, sort_order))
+    
+    @staticmethod
+    def aggregate(pipeline):
+        """User jobs of a list_pipeline, with their posting dates restored"""
+        return [restore_dates(job) for job in replicas.read_collection(mongo.db.user_jobs).aggregate(pipeline)]
     
     @staticmethod
     def get_by_id(job_id):
@@ -74,17 +147,11 @@ class UserJob:
         if not ObjectId.is_valid(job_id):
             return None
         
-        job = mongo.db.user_jobs.find_one({'_id': ObjectId(job_id)})
+        job = replicas.read_collection(mongo.db.user_jobs).find_one({'_id': ObjectId(job_id)})
         if job:
-            job['id'] = str(job['_id'])
-            del job['_id']
-            
-            # Format dates
-            if 'created_at' in job and isinstance(job['created_at'], datetime):
-                job['created_at'] = job['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-            if 'updated_at' in job and isinstance(job['updated_at'], datetime):
-                job['updated_at'] = job['updated_at'].strftime('%Y-%m-%d %H:%M:%S')
-                    
+            job['id'] = str(job.pop('_id'))
+            restore_dates(job)
+        
         return job
     
     @staticmethod
@@ -93,41 +160,144 @@ class UserJob:
         if not ObjectId.is_valid(job_id):
             return False
         
-        result = mongo.db.user_jobs.delete_one({'_id': ObjectId(job_id)})
-        return result.deleted_count > 0
+        # Return the deleted document's names so the suggestion counts can be lowered
+        projection = {'title': 1, 'company': 1, 'location': 1, 'job_type': 1,
+                      'company_id': 1, 'location_id': 1, 'job_type_id': 1}
+        deleted = mongo.db.user_jobs.find_one_and_delete({'_id': ObjectId(job_id)}, projection=projection)
+        if deleted is not None:
+            descriptions.delete_manual(job_id)
+            read_model.remove_manual(job_id)
+            dedup.release(dedup.job_key('manual', job_id))
+            suggest.record(deleted, -1)
+            return True
+        return False
+    
+    @staticmethod
+    def count():
+        """Count user jobs"""
+        return replicas.read_collection(mongo.db.user_jobs).count_documents({})
+    
+    @staticmethod
+    def facet_pipeline(id_field):
+        """Aggregation pipeline counting user jobs per value of a dimension id field"""
+        return [
+            {'$group': {'_id': f'${id_field}', 'count': {'$sum': 1}}}
+        ]
+    
+    @staticmethod
+    def get_facet_counts(id_field):
+        """(dimension id, count) pairs for one of company_id, location_id or job_type_id"""
+        groups = replicas.read_collection(mongo.db.user_jobs).aggregate(UserJob.facet_pipeline(id_field))
+        return [(group['_id'], group['count']) for group in groups]
     
     @staticmethod
     def get_stats():
         """Get statistics about user jobs"""
-        total = mongo.db.user_jobs.count_documents({})
+        return {
+            'total': UserJob.count(),
+            'companies': dimensions.facet('company', UserJob.get_facet_counts('company_id')),
+            'locations': dimensions.facet('location', UserJob.get_facet_counts('location_id')),
+            'job_types': dimensions.facet('job_type', UserJob.get_facet_counts('job_type_id'))
+        }
+
+class SavedSearch:
+    """MongoDB collection of saved searches, matched jobs are delivered to saved_search_inbox"""
+    
+    FIELDS = ('name', 'company', 'location', 'job_type', 'source', 'keywords')
+    
+    @staticmethod
+    def create(search_data):
+        """Create a saved search"""
+        search = {field: search_data.get(field) for field in SavedSearch.FIELDS}
+        search['created_at'] = datetime.utcnow()
+        result = mongo.db.saved_searches.insert_one(search)
+        search['id'] = str(search.pop('_id', result.inserted_id))
         
-        # Get company stats
-        company_pipeline = [
-            {'$group': {'_id': '$company', 'count': {'$sum': 1}}},
-            {'$sort': {'count': -1}}
-        ]
-        companies = list(mongo.db.user_jobs.aggregate(company_pipeline))
-        companies_stats = [{'company': company['_id'], 'count': company['count']} for company in companies]
+        # The percolator picks up the new search on its next batch
+        percolator.reset()
+        return search
+    
+    @staticmethod
+    def get_all():
+        """Retrieve all saved searches, oldest first"""
+        searches = []
+        for search in mongo.db.saved_searches.find().sort('created_at', 1):
+            search['id'] = str(search.pop('_id'))
+            searches.append(search)
+        return searches
+    
+    @staticmethod
+    def get_by_id(search_id):
+        """Retrieve a saved search by ID"""
+        if not ObjectId.is_valid(search_id):
+            return None
         
-        # Get location stats
-        location_pipeline = [
-            {'$group': {'_id': '$location', 'count': {'$sum': 1}}},
-            {'$sort': {'count': -1}}
-        ]
-        locations = list(mongo.db.user_jobs.aggregate(location_pipeline))
-        locations_stats = [{'location': location['_id'], 'count': location['count']} for location in locations]
+        search = mongo.db.saved_searches.find_one({'_id': ObjectId(search_id)})
+        if search:
+            search['id'] = str(search.pop('_id'))
         
-        # Get job type stats
-        job_type_pipeline = [
-            {'$group': {'_id': '$job_type', 'count': {'$sum': 1}}},
-            {'$sort': {'count': -1}}
-        ]
-        job_types = list(mongo.db.user_jobs.aggregate(job_type_pipeline))
-        job_types_stats = [{'job_type': job_type['_id'], 'count': job_type['count']} for job_type in job_types]
+        return search
+    
+    @staticmethod
+    def delete(search_id):
+        """Delete a saved search and its inbox"""
+        if not ObjectId.is_valid(search_id):
+            return False
         
-        return {
-            'total': total,
-            'companies': companies_stats,
-            'locations': locations_stats,
-            'job_types': job_types_stats
-        }
\ No newline at end of file
+        result = mongo.db.saved_searches.delete_one({'_id': ObjectId(search_id)})
+        if result.deleted_count > 0:
+            mongo.db.saved_search_inbox.delete_many({'search_id': search_id})
+            percolator.reset()
+            return True
+        return False
+    
+    @staticmethod
+    def add_matches(entries):
+        """Insert percolator matches, a job already in a search's inbox is skipped"""
+        try:
+            mongo.db.saved_search_inbox.insert_many(entries, ordered=False)
+        except BulkWriteError as e:
+            # Duplicate (search_id, job_key) entries are expected, anything else is not
+            if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                raise
+    
+    @staticmethod
+    def inbox_cursor(entry):
+        """Opaque position of an inbox entry, reading resumes after it"""
+        return f"{entry['matched_at']:%Y%m%d%H%M%S}-{entry['_id']}"
+    
+    @staticmethod
+    def _parse_inbox_cursor(cursor):
+        matched_at, _, entry_id = cursor.partition('-')
+        if not ObjectId.is_valid(entry_id):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return datetime.strptime(matched_at, '%Y%m%d%H%M%S'), ObjectId(entry_id)
+    
+    @staticmethod
+    def get_inbox(search_id, after=None, since=None, limit=100):
+        """Matched jobs of a saved search in match order, after a cursor or matched since a time
+
+        Returns (entries, cursor, has_more). Pass the cursor as after to read the
+        next page, and to poll for new matches once has_more is False. Raises
+        ValueError for a malformed cursor.
+        """
+        query = {'search_id': search_id}
+        if after:
+            matched_at, entry_id = SavedSearch._parse_inbox_cursor(after)
+            query['$or'] = [
+                {'matched_at': {'$gt': matched_at}},
+                {'matched_at': matched_at, '_id': {'$gt': entry_id}}
+            ]
+        elif since:
+            query['matched_at'] = {'$gte': since}
+        entries = list(
+            mongo.db.saved_search_inbox.find(query, {'search_id': 0})
+            .sort([('matched_at', 1), ('_id', 1)])
+            .limit(limit + 1)
+        )
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        cursor = SavedSearch.inbox_cursor(entries[-1]) if entries else after
+        for entry in entries:
+            del entry['_id']
+        return entries, cursor, has_more
@@ -0,0 +1,142 @@
+import logging
+import re
+import threading
+from datetime import datetime, date
+from serializers import format_date
+import dimensions
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+FILTER_FIELDS = ('company', 'location', 'job_type', 'source')
+_TOKEN_RE = re.compile(r'\w+')
+
+def tokens(text):
+    """Casefolded word tokens of a text"""
+    return set(_TOKEN_RE.findall((text or '').casefold()))
+
+class Percolator:
+    """Inverted index over saved searches, matches jobs against every search at once
+
+    Searches with keywords are indexed under each of their keywords and match
+    when all of them occur in the job's title or description. Searches without
+    keywords are checked against every job. Filter conditions that several
+    searches share are evaluated once per job.
+    """
+
+    def __init__(self, searches=()):
+        self._filters = {}
+        self._keyword_counts = {}
+        self._index = {}
+        self._unanchored = set()
+        for search in searches:
+            self.add(search)
+
+    def __len__(self):
+        return len(self._filters)
+
+    def add(self, search):
+        search_id = search['id']
+        self._filters[search_id] = [
+            (field, search[field].strip()) for field in FILTER_FIELDS if search.get(field)
+        ]
+        keywords = tokens(search.get('keywords'))
+        self._keyword_counts[search_id] = len(keywords)
+        if not keywords:
+            self._unanchored.add(search_id)
+        for keyword in keywords:
+            self._index.setdefault(keyword, set()).add(search_id)
+
+    @staticmethod
+    def _condition(job, field, needle):
+        if field == 'source':
+            return job.get('source') == needle
+        return dimensions.name_matches(field, job.get(field), needle)
+
+    def match(self, job):
+        """Ids of the searches a job matches"""
+        hits = {}
+        for token in tokens(job.get('title')) | tokens(job.get('description')):
+            for search_id in self._index.get(token, ()):
+                hits[search_id] = hits.get(search_id, 0) + 1
+        candidates = [search_id for search_id, count in hits.items() if count == self._keyword_counts[search_id]]
+        candidates.extend(self._unanchored)
+
+        conditions = {}
+        matched = []
+        for search_id in candidates:
+            for condition in self._filters[search_id]:
+                if condition not in conditions:
+                    conditions[condition] = self._condition(job, *condition)
+                if not conditions[condition]:
+                    break
+            else:
+                matched.append(search_id)
+        return matched
+
+# Process wide percolator, rebuilt from MongoDB when saved searches change
+_percolator = None
+_lock = threading.Lock()
+
+def reset():
+    """Drop the percolator so it is rebuilt with the current saved searches"""
+    global _percolator
+    with _lock:
+        _percolator = None
+
+def _ensure_percolator():
+    global _percolator
+    # Imported here, mongo_models percolates manual jobs when they are created
+    from mongo_models import SavedSearch
+    with _lock:
+        if _percolator is None:
+            _percolator = Percolator(SavedSearch.get_all())
+            logger.info(f"Percolator built with {len(_percolator)} saved searches")
+        return _percolator
+
+def _inbox_entry(search_id, job, matched_at):
+    posting_date = job.get('posting_date')
+    if isinstance(posting_date, (datetime, date)):
+        posting_date = format_date(posting_date)
+    return {
+        'search_id': search_id,
+        'job_key': f"{job['source']}:{job['id']}",
+        'job_id': job['id'],
+        'source': job['source'],
+        'title': job.get('title'),
+        'company': job.get('company'),
+        'location': job.get('location'),
+        'job_type': job.get('job_type'),
+        'posting_date': posting_date,
+        'url': job.get('url'),
+        'matched_at': matched_at
+    }
+
+def percolate(jobs):
+    """Match a batch of new jobs against all saved searches and fill the inboxes
+
+    jobs are dicts with id, source, title, company, location, job_type and
+    description. Failures are logged rather than raised, the jobs themselves
+    are already stored.
+    """
+    from mongo_models import SavedSearch
+    if not jobs:
+        return 0
+    try:
+        percolator = _ensure_percolator()
+        if not len(percolator):
+            return 0
+        # Second precision, the same precision the inbox endpoint takes since= in
+        matched_at = datetime.utcnow().replace(microsecond=0)
+        entries = [
+            _inbox_entry(search_id, job, matched_at)
+            for job in jobs
+            for search_id in percolator.match(job)
+        ]
+        if entries:
+            SavedSearch.add_matches(entries)
+            logger.info(f"Percolated {len(jobs)} new jobs into {len(entries)} saved search matches")
+        return len(entries)
+    except Exception as e:
+        logger.error(f"Failed to percolate new jobs: {str(e)}")
+        return 0
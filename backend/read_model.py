@@ -0,0 +1,330 @@
+import logging
+import click
+from datetime import datetime, date
+from flask.cli import AppGroup
+from models import db, Job, JobListingRead, SORT_FIELDS
+from serializers import JOB_FIELDS
+import dimensions
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Rows written per statement when rebuilding the read model
+REBUILD_BATCH_SIZE = 1000
+
+# Columns copied from both stores into the read model (id is mapped to job_id,
+# descriptions stay in the compressed side stores)
+COPIED_FIELDS = tuple(
+    field for field in JOB_FIELDS if field not in ('id', 'source', 'description')
+) + dimensions.ID_FIELDS
+
+def _clip(value, length):
+    """Trim free text from MongoDB to the column width of the read model"""
+    if isinstance(value, str) and len(value) > length:
+        return value[:length]
+    return value
+
+def _parse_date(value):
+    """Turn a stored posting date (date, datetime or YYYY-MM-DD string) into a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return datetime.strptime(value[:10], '%Y-%m-%d').date()
+        except ValueError:
+            return None
+    return None
+
+def _parse_datetime(value):
+    """Turn a stored timestamp (datetime or SQL formatted string) into a datetime"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return None
+    return None
+
+def scraped_values(job):
+    """Read model row values for a scraped Job"""
+    values = {field: getattr(job, field) for field in COPIED_FIELDS}
+    values['job_id'] = str(job.id)
+    values['source'] = 'scraped'
+    return values
+
+def manual_values(doc):
+    """Read model row values for a manual MongoDB job document"""
+    values = {
+        'job_id': str(doc.get('_id') or doc.get('id')),
+        'source': 'manual',
+        'title': _clip(doc.get('title') or '', 255),
+        'company': _clip(doc.get('company') or '', 255),
+        'location': _clip(doc.get('location'), 255),
+        'posting_date': _parse_date(doc.get('posting_date')),
+        'url': _clip(doc.get('url'), 500),
+        'salary': _clip(doc.get('salary'), 100),
+        'job_type': _clip(doc.get('job_type'), 50),
+        'experience_level': _clip(doc.get('experience_level'), 50),
+        'company_id': doc.get('company_id'),
+        'location_id': doc.get('location_id'),
+        'job_type_id': doc.get('job_type_id'),
+        'duplicate_of': doc.get('duplicate_of'),
+        'created_at': _parse_datetime(doc.get('created_at')),
+        'updated_at': _parse_datetime(doc.get('updated_at'))
+    }
+    return values
+
+def _commit_best_effort(action):
+    """Commit a read model change that is not part of the source store's transaction
+
+    Failures are logged rather than raised, the consistency checker repairs drift.
+    """
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to {action} in read model: {str(e)}")
+
+def add_scraped(jobs):
+    """Add freshly flushed scraped jobs to the session (committed with the jobs themselves)"""
+    for job in jobs:
+        db.session.add(JobListingRead(**scraped_values(job)))
+
+def update_scraped(jobs):
+    """Refresh the rows of changed scraped jobs in the session (committed with the jobs themselves)"""
+    for job in jobs:
+        values = scraped_values(job)
+        JobListingRead.query.filter_by(source='scraped', job_id=values['job_id']).update(
+            values, synchronize_session=False
+        )
+
+def remove_scraped(job_id):
+    """Remove a scraped job in the current session (committed with the delete itself)"""
+    JobListingRead.query.filter_by(source='scraped', job_id=str(job_id)).delete(synchronize_session=False)
+
+def upsert_manual(doc):
+    """Insert or refresh a manual job after it was written to MongoDB"""
+    values = manual_values(doc)
+    row = JobListingRead.query.filter_by(source='manual', job_id=values['job_id']).first()
+    if row:
+        for key, value in values.items():
+            setattr(row, key, value)
+    else:
+        db.session.add(JobListingRead(**values))
+    _commit_best_effort('upsert manual job')
+
+def remove_manual(job_id):
+    """Remove a manual job after it was deleted from MongoDB"""
+    JobListingRead.query.filter_by(source='manual', job_id=str(job_id)).delete(synchronize_session=False)
+    _commit_best_effort('remove manual job')
+
+def filtered_query(company=None, location=None, job_type=None, source=None, collapse_duplicates=False):
+    """Build the filtered read model query for both sources"""
+    query = JobListingRead.query
+    if source in ('manual', 'scraped'):
+        query = query.filter(JobListingRead.source == source)
+    if collapse_duplicates:
+        query = query.filter(JobListingRead.duplicate_of.is_(None))
+    # Filters resolve to dimension ids in process and run on the integer keys
+    if company:
+        query = query.filter(JobListingRead.company_id.in_(dimensions.matching_ids('company', company)))
+    if location:
+        query = query.filter(JobListingRead.location_id.in_(dimensions.matching_ids('location', location)))
+    if job_type:
+        query = query.filter(JobListingRead.job_type_id.in_(dimensions.matching_ids('job_type', job_type)))
+    return query
+
+def list_jobs(company=None, location=None, job_type=None, source=None,
+              sort_by='created_at', sort_order='desc', fields=JOB_FIELDS, collapse_duplicates=False):
+    """List jobs from both stores with one filtered, sorted query"""
+    query = filtered_query(company, location, job_type, source, collapse_duplicates)
+
+    # Apply sorting, the id tiebreaker keeps the order stable across sources and
+    # matches the (field, id) and (source, field, id) indexes
+    if sort_by not in SORT_FIELDS:
+        logger.warning(f"Invalid sort_by parameter: {sort_by}, using default")
+        sort_by = 'created_at'
+    column = getattr(JobListingRead, sort_by)
+    if sort_order.lower() == 'asc':
+        query = query.order_by(column.asc(), JobListingRead.id.asc())
+    else:
+        query = query.order_by(column.desc(), JobListingRead.id.desc())
+
+    # Plain column tuples, the original id is exposed as id and the source is
+    # always selected last so scraped ids can be turned back into integers.
+    # Descriptions are not part of the read model, callers attach them by id.
+    selected = [field for field in fields if field != 'description']
+    columns = [JobListingRead.job_id if field == 'id' else getattr(JobListingRead, field) for field in selected]
+    columns.append(JobListingRead.job_id)
+    columns.append(JobListingRead.source)
+
+    jobs = []
+    for row in query.with_entities(*columns).all():
+        job = dict(zip(selected, row))
+        job_id = row[-2]
+        job['id'] = int(job_id) if row[-1] == 'scraped' else job_id
+        jobs.append(job)
+    return jobs
+
+def count_by_source():
+    """Get job counts per source"""
+    rows = db.session.query(JobListingRead.source, db.func.count(JobListingRead.id)).group_by(JobListingRead.source).all()
+    return dict(rows)
+
+def get_stats():
+    """Get combined job statistics with one grouped query per facet"""
+    def counts(column):
+        return db.session.query(column, db.func.count(JobListingRead.id)).group_by(column).all()
+
+    sources = [{'source': source, 'count': count} for source, count in counts(JobListingRead.source)]
+    return {
+        'total': sum(item['count'] for item in sources),
+        # Grouped on the integer dimension keys, names come from the dimension cache
+        'companies': dimensions.facet('company', counts(JobListingRead.company_id)),
+        'locations': dimensions.facet('location', counts(JobListingRead.location_id)),
+        'job_types': dimensions.facet('job_type', counts(JobListingRead.job_type_id)),
+        'sources': sources
+    }
+
+def _insert_batches(rows):
+    """Bulk insert read model rows in fixed size batches"""
+    batch = []
+    inserted = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            db.session.execute(db.insert(JobListingRead), batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(JobListingRead), batch)
+        inserted += len(batch)
+    return inserted
+
+def _scraped_source_rows():
+    """Yield read model rows for every scraped job in MySQL
+
+    Pages through the table by primary key so the rebuild can write to the same
+    connection between pages.
+    """
+    columns = [Job.id] + [getattr(Job, field) for field in COPIED_FIELDS]
+    last_id = 0
+    while True:
+        rows = (Job.query.filter(Job.source == 'scraped', Job.id > last_id)
+                .order_by(Job.id).with_entities(*columns).limit(REBUILD_BATCH_SIZE).all())
+        if not rows:
+            break
+        for row in rows:
+            values = dict(zip(COPIED_FIELDS, row[1:]))
+            values['job_id'] = str(row[0])
+            values['source'] = 'scraped'
+            yield values
+        last_id = rows[-1][0]
+
+def _manual_source_rows():
+    """Yield read model rows for every manual job in MongoDB"""
+    # Imported here, mongo_models maintains the read model on writes
+    from mongo_models import mongo
+    for doc in mongo.db.user_jobs.find({'source': 'manual'}).batch_size(REBUILD_BATCH_SIZE):
+        yield manual_values(doc)
+
+def rebuild():
+    """Rebuild the read model from scratch from both stores"""
+    try:
+        JobListingRead.query.delete(synchronize_session=False)
+        scraped = _insert_batches(_scraped_source_rows())
+        manual = _insert_batches(_manual_source_rows())
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    logger.info(f"Read model rebuilt with {scraped} scraped and {manual} manual jobs")
+    return {'scraped': scraped, 'manual': manual}
+
+def _same_timestamp(a, b):
+    """Compare timestamps at second precision (MySQL DATETIME drops MongoDB's milliseconds)"""
+    if a is None or b is None:
+        return a is b
+    return abs((a - b).total_seconds()) < 1
+
+def _same_values(read_values, source_values):
+    """Whether a read model row still holds every projected column of its source job"""
+    for field in COPIED_FIELDS:
+        read_value, source_value = read_values[field], source_values[field]
+        if isinstance(read_value, datetime) or isinstance(source_value, datetime):
+            if not _same_timestamp(read_value, source_value):
+                return False
+        elif read_value != source_value:
+            return False
+    return True
+
+def check_consistency(repair=False):
+    """Compare the read model against both stores
+
+    Reports rows missing from the read model, orphaned rows whose source job is
+    gone and stale rows where any projected column differs (duplicate flags and
+    dimension ids included, whether or not updated_at changed). With repair=True
+    the read model is fixed up in place.
+    """
+    columns = [getattr(JobListingRead, field) for field in COPIED_FIELDS]
+    read_rows = {
+        (source, job_id): dict(zip(COPIED_FIELDS, values))
+        for source, job_id, *values in db.session.query(JobListingRead.source, JobListingRead.job_id, *columns)
+    }
+    source_rows = {}
+    for values in _scraped_source_rows():
+        source_rows[('scraped', values['job_id'])] = values
+    for values in _manual_source_rows():
+        source_rows[('manual', values['job_id'])] = values
+
+    missing = [key for key in source_rows if key not in read_rows]
+    orphaned = [key for key in read_rows if key not in source_rows]
+    stale = [
+        key for key, values in source_rows.items()
+        if key in read_rows and not _same_values(read_rows[key], values)
+    ]
+
+    if repair and (missing or orphaned or stale):
+        try:
+            for source, job_id in orphaned + stale:
+                JobListingRead.query.filter_by(source=source, job_id=job_id).delete(synchronize_session=False)
+            _insert_batches(source_rows[key] for key in missing + stale)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        logger.info(f"Read model repaired: {len(missing)} missing, {len(orphaned)} orphaned, {len(stale)} stale")
+
+    return {
+        'consistent': not (missing or orphaned or stale),
+        'missing': missing,
+        'orphaned': orphaned,
+        'stale': stale
+    }
+
+# Flask CLI commands, e.g. `flask --app app read-model rebuild`
+read_model_cli = AppGroup('read-model', help='Maintain the job_listings_read projection')
+
+@read_model_cli.command('rebuild')
+def rebuild_command():
+    """Rebuild job_listings_read from MySQL and MongoDB"""
+    result = rebuild()
+    click.echo(f"Rebuilt read model: {result['scraped']} scraped, {result['manual']} manual jobs")
+
+@read_model_cli.command('check')
+@click.option('--repair', is_flag=True, help='Fix any differences that are found')
+def check_command(repair):
+    """Check job_listings_read against MySQL and MongoDB"""
+    result = check_consistency(repair=repair)
+    for kind in ('missing', 'orphaned', 'stale'):
+        click.echo(f"{kind}: {len(result[kind])}")
+        for source, job_id in result[kind][:20]:
+            click.echo(f"  {source} {job_id}")
+    if result['consistent']:
+        click.echo("Read model is consistent")
+    elif not repair:
+        raise SystemExit(1)
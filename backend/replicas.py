@@ -0,0 +1,75 @@
+import logging
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from pymongo.read_preferences import SecondaryPreferred
+from sqlalchemy.sql.dml import UpdateBase
+
+# Read/write splitting. GET requests read MySQL from the DATABASE_REPLICA_URI replica and
+# MongoDB user jobs from secondaries (MONGO_READ_SECONDARY), writes and background work
+# (scraper, scheduler, CLI) always use the primaries. A client that just wrote reads from
+# the primaries for REPLICA_STICKY_SECONDS so it sees its own changes despite replication lag.
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# SQLALCHEMY_BINDS key of the MySQL read replica
+REPLICA_BIND = 'replica'
+# Set on responses to writes, requests carrying it read from the primaries
+STICKY_COOKIE = 'read_primary'
+READ_METHODS = ('GET', 'HEAD')
+
+def reads_from_replica():
+    """Whether the current request may read from the replicas, never outside a request"""
+    return has_app_context() and g.get('read_replica', False)
+
+@contextmanager
+def on_primary():
+    """Send the reads inside the block to the primaries, for data that must not lag behind"""
+    previous = reads_from_replica()
+    if previous:
+        g.read_replica = False
+    try:
+        yield
+    finally:
+        if previous:
+            g.read_replica = True
+
+class RoutingSession(Session):
+    """Session sending the reads of replica-eligible requests to the replica engine
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not isinstance(clause, UpdateBase)
+                and reads_from_replica()):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def secondary_preference(config):
+    """Read preference for MongoDB reads from secondaries no more than MONGO_MAX_STALENESS seconds behind"""
+    # MongoDB rejects a max staleness below 90 seconds
+    return SecondaryPreferred(max_staleness=max(90, config.get('MONGO_MAX_STALENESS', 90)))
+
+def read_collection(collection):
+    """A MongoDB collection for the current request's reads, from secondaries where allowed"""
+    if reads_from_replica() and current_app.config.get('MONGO_READ_SECONDARY', False):
+        return collection.with_options(read_preference=secondary_preference(current_app.config))
+    return collection
+
+def init_app(app):
+    """Decide per request where reads go and mark clients that wrote as sticky"""
+    sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 10)
+
+    @app.before_request
+    def route_reads():
+        g.read_replica = request.method in READ_METHODS and STICKY_COOKIE not in request.cookies
+
+    @app.after_request
+    def stick_to_primary(response):
+        if request.method not in READ_METHODS and request.method != 'OPTIONS' and response.status_code < 400:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=sticky_seconds, httponly=True, samesite='Lax')
+        return response
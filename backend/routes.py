@@ -1,10 +1,19 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, Response, jsonify, request, current_app
 from models import db, Job
-from mongo_models import UserJob, mongo
+from mongo_models import UserJob, SavedSearch, to_bson_date
+import read_model
+import dedup
+import archive
+import descriptions
+import dimensions
+import suggest
+import health
+import live
+from serializers import select_job_rows, json_response, parse_fields, parse_sort, JOB_FIELDS, DATETIME_FORMAT
 from datetime import datetime
+import heapq
 import logging, re
-from scraper.bot import scrape_jobs
-from bson.objectid import ObjectId
+from scraper import adaptive, checkpoints, driver_pool, sources
 
 # Set up logger
 logging.basicConfig(level=logging.INFO)
@@ -13,118 +22,162 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 api = Blueprint('api', __name__)
 
+def _is_mongo_id(job_id):
+    """Check if an ID is a MongoDB ObjectId (for user jobs)"""
+    return bool(re.match(r'^[0-9a-f]{24}$', job_id, re.IGNORECASE))
+
+def _scraped_jobs_query(company=None, location=None, job_type=None, sort_by='created_at', sort_order='desc',
+                        collapse_duplicates=False):
+    """Build the filtered and sorted query for scraped jobs in MySQL"""
+    # Start with base query for scraped jobs from MySQL
+    query = Job.query.filter_by(source='scraped')
+    
+    # Hide postings flagged as near-duplicates of another job
+    if collapse_duplicates:
+        query = query.filter(Job.duplicate_of.is_(None))
+    
+    # Apply filters if provided, names are resolved to dimension ids in process
+    if company:
+        query = query.filter(Job.company_id.in_(dimensions.matching_ids('company', company)))
+    if location:
+        query = query.filter(Job.location_id.in_(dimensions.matching_ids('location', location)))
+    if job_type:
+        query = query.filter(Job.job_type_id.in_(dimensions.matching_ids('job_type', job_type)))
+    
+    # Apply sorting, callers validate sort_by against SORT_FIELDS. Ordering on the
+    # (source, field, id) index with the id tiebreaker reads the page in index order
+    column = getattr(Job, sort_by)
+    if sort_order.lower() == 'asc':
+        query = query.order_by(column.asc(), Job.id.asc())
+    else:
+        query = query.order_by(column.desc(), Job.id.desc())
+    
+    return query
+
+def _sort_key(sort_by):
+    """Sort key of job dictionaries from any store
+
+    Both stores return native values (dates as date and datetime objects), so rows
+    are compared as they are without parsing. Missing values sort first.
+    """
+    def sort_key(job):
+        value = job.get(sort_by)
+        return (value is not None, value)
+    return sort_key
+
+def _sort_jobs(jobs_list, sort_by, sort_order):
+    """Sort job dictionaries in place"""
+    jobs_list.sort(key=_sort_key(sort_by), reverse=(sort_order.lower() == 'desc'))
+
+def _merge_jobs(job_lists, sort_by, sort_order):
+    """Merge job lists that are each sorted already into one sorted list"""
+    return list(heapq.merge(*job_lists, key=_sort_key(sort_by), reverse=(sort_order.lower() == 'desc')))
+
+def _archived_jobs(filters, fields, sort_by, sort_order, since, until):
+    """Archived jobs from the segments that can match, sorted like the listing"""
+    archived = list(archive.iter_archived_jobs(filters, fields, since, until))
+    _sort_jobs(archived, sort_by, sort_order)
+    return archived
+
+def parse_job_listing(args):
+    """Listing parameters of a /jobs request, raises ValueError for invalid ones
+
+    Shared by the Flask and the async app so both serve the same listing.
+    """
+    listing = {
+        'company': args.get('company'),
+        'location': args.get('location'),
+        'job_type': args.get('job_type'),
+        'source': args.get('source'),
+        'collapse_duplicates': args.get('collapse_duplicates', '').lower() in ('1', 'true', 'yes'),
+        'include_archived': args.get('include_archived', '').lower() in ('1', 'true', 'yes')
+    }
+    
+    # Only indexed sort keys are accepted, sparse fieldsets give list views
+    # the summary projection unless asked otherwise
+    listing['sort_by'], listing['sort_order'] = parse_sort(args.get('sort_by', 'created_at'),
+                                                           args.get('sort_order', 'desc'))
+    listing['fields'] = parse_fields(args.get('fields'), required=(listing['sort_by'],))
+    if listing['include_archived']:
+        listing['archived_since'], listing['archived_until'] = archive.parse_range(args.get('archived_since'),
+                                                                                   args.get('archived_until'))
+    
+    filters = {field: listing[field] for field in ('company', 'location', 'job_type') if listing[field]}
+    if listing['collapse_duplicates']:
+        filters['collapse_duplicates'] = True
+    listing['filters'] = filters
+    return listing
+
+def list_read_model_jobs(listing):
+    """Every store's jobs of a listing with one query against the unified read model"""
+    return read_model.list_jobs(listing['company'], listing['location'], listing['job_type'], listing['source'],
+                                listing['sort_by'], listing['sort_order'], listing['fields'],
+                                listing['collapse_duplicates'])
+
+def build_queries(listing):
+    """(user job pipeline, scraped job statement) of a listing, None for a store the source leaves out"""
+    pipeline = None
+    if listing['source'] != 'scraped':
+        pipeline = UserJob.list_pipeline(listing['filters'], listing['fields'], listing['sort_by'],
+                                         listing['sort_order'])
+    statement = None
+    if listing['source'] != 'manual':
+        query = _scraped_jobs_query(listing['company'], listing['location'], listing['job_type'], listing['sort_by'],
+                                    listing['sort_order'], listing['collapse_duplicates'])
+        statement = query.with_entities(*[getattr(Job, field) for field in listing['fields']]).statement
+    return pipeline, statement
+
+def merge_listing(listing, manual_jobs, scraped_jobs):
+    """One sorted list from the sorted results of the stores build_queries queried"""
+    return _merge_jobs([jobs for jobs in (manual_jobs, scraped_jobs) if jobs is not None],
+                       listing['sort_by'], listing['sort_order'])
+
+def complete_listing(listing, jobs_list):
+    """Attach descriptions and merge in archived jobs where the listing asks for them"""
+    # Descriptions live in the compressed side stores, only load them when asked for
+    if 'description' in listing['fields']:
+        descriptions.attach(jobs_list)
+    
+    # Archived scraped jobs are only read (from the segments that can match) when asked for
+    if listing['include_archived'] and listing['source'] != 'manual':
+        archived = _archived_jobs(listing['filters'], listing['fields'], listing['sort_by'], listing['sort_order'],
+                                  listing['archived_since'], listing['archived_until'])
+        jobs_list = _merge_jobs([jobs_list, archived], listing['sort_by'], listing['sort_order'])
+    return jobs_list
+
 @api.route('/jobs', methods=['GET'])
 def get_jobs():
     """Get job listings with optional filtering and sorting"""
     try:
-        # Get query parameters for filtering
-        company = request.args.get('company')
-        location = request.args.get('location')
-        job_type = request.args.get('job_type')
-        source = request.args.get('source')
-        sort_by = request.args.get('sort_by', 'created_at')  # Default sort by creation date
-        sort_order = request.args.get('sort_order', 'desc')  # Default descending
-        
-        filters = {}
-        if company:
-            filters['company'] = company
-        if location:
-            filters['location'] = location
-        if job_type:
-            filters['job_type'] = job_type
+        try:
+            listing = parse_job_listing(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
-        # Process based on source
-        if source == 'manual':
-            # Get user jobs from MongoDB
-            jobs_list = UserJob.get_all(filters)
-        elif source == 'scraped':
-            # Start with base query for scraped jobs from MySQL
-            query = Job.query.filter_by(source='scraped')
-            
-            # Apply filters if provided
-            if company:
-                query = query.filter(Job.company.ilike(f'%{company}%'))
-            if location:
-                query = query.filter(Job.location.ilike(f'%{location}%'))
-            if job_type:
-                query = query.filter(Job.job_type.ilike(f'%{job_type}%'))
-            
-            # Apply sorting
-            if hasattr(Job, sort_by):
-                if sort_order.lower() == 'asc':
-                    query = query.order_by(getattr(Job, sort_by).asc())
-                else:
-                    query = query.order_by(getattr(Job, sort_by).desc())
-            else:
-                logger.warning(f"Invalid sort_by parameter: {sort_by}, using default")
-                query = query.order_by(Job.created_at.desc())
-            
-            # Execute query
-            jobs = query.all()
-            
-            # Convert to dictionary for JSON response
-            jobs_list = [job.to_dict() for job in jobs]
+        # Serve everything with one query when the unified read model is enabled
+        if current_app.config.get('READ_MODEL_ENABLED', False):
+            jobs_list = list_read_model_jobs(listing)
         else:
-            # If no source specified, combine results from both databases
-            # First get manual jobs from MongoDB
-            manual_jobs = UserJob.get_all(filters)
-            
-            # Then get scraped jobs from MySQL
-            query = Job.query.filter_by(source='scraped')
-            
-            # Apply filters if provided
-            if company:
-                query = query.filter(Job.company.ilike(f'%{company}%'))
-            if location:
-                query = query.filter(Job.location.ilike(f'%{location}%'))
-            if job_type:
-                query = query.filter(Job.job_type.ilike(f'%{job_type}%'))
-            
-            # Apply sorting
-            if hasattr(Job, sort_by):
-                if sort_order.lower() == 'asc':
-                    query = query.order_by(getattr(Job, sort_by).asc())
-                else:
-                    query = query.order_by(getattr(Job, sort_by).desc())
-            else:
-                logger.warning(f"Invalid sort_by parameter: {sort_by}, using default")
-                query = query.order_by(Job.created_at.desc())
-            
-            # Execute query
-            scraped_jobs = query.all()
-            scraped_jobs_list = [job.to_dict() for job in scraped_jobs]
-            
-            # Combine both lists
-            jobs_list = manual_jobs + scraped_jobs_list
-            
-            # Sort combined list
-            if sort_by in ['created_at', 'updated_at', 'posting_date']:
-                # For date fields, convert strings to datetime first
-                date_format = '%Y-%m-%d %H:%M:%S' if sort_by != 'posting_date' else '%Y-%m-%d'
-                # Define a safe sorting function
-                def safe_date_sort(job):
-                    date_str = job.get(sort_by)
-                    if not date_str:
-                        return datetime(1970, 1, 1)  # Default for empty dates
-                    try:
-                        return datetime.strptime(date_str, date_format)
-                    except (ValueError, TypeError):
-                        return datetime(1970, 1, 1)  # Fallback for invalid formats
-                
-                jobs_list.sort(key=safe_date_sort, reverse=(sort_order.lower() == 'desc'))
-            else:
-                # For non-date fields, sort directly with a safe function
-                def safe_sort(job):
-                    val = job.get(sort_by, '')
-                    return val if val is not None else ''
-                
-                jobs_list.sort(key=safe_sort, reverse=(sort_order.lower() == 'desc'))
+            # User jobs from MongoDB and plain scraped job rows from MySQL (no ORM
+            # hydration), as the source asks for; both come back sorted and are merged
+            pipeline, statement = build_queries(listing)
+            manual_jobs = UserJob.aggregate(pipeline) if pipeline is not None else None
+            scraped_jobs = None
+            if statement is not None:
+                scraped_jobs = [dict(zip(listing['fields'], row)) for row in db.session.execute(statement)]
+            jobs_list = merge_listing(listing, manual_jobs, scraped_jobs)
         
-        return jsonify({
+        jobs_list = complete_listing(listing, jobs_list)
+        
+        # Encode straight to JSON bytes, dates are formatted during encoding
+        return json_response({
             'success': True,
             'count': len(jobs_list),
             'jobs': jobs_list
-        }), 200
+        })
     
     except Exception as e:
         logger.error(f"Error getting jobs: {str(e)}")
@@ -150,27 +203,30 @@ def add_job():
                     'message': f'Missing required field: {field}'
                 }), 400
         
+        # Posting dates are stored as dates, reject text that is not one
+        if 'posting_date' in data:
+            try:
+                to_bson_date(data['posting_date'])
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'message': 'posting_date must be a date in YYYY-MM-DD format'
+                }), 400
+        
         # Always set source to manual for MongoDB
         data['source'] = 'manual'
         
         # Create the job in MongoDB
         try:
-            # Make sure posting_date is a string
-            if 'posting_date' in data and not isinstance(data['posting_date'], str):
-                if hasattr(data['posting_date'], 'strftime'):
-                    data['posting_date'] = data['posting_date'].strftime('%Y-%m-%d')
-                else:
-                    # If it can't be converted, remove it
-                    data.pop('posting_date', None)
-            
             new_job = UserJob.create(data)
             logger.info(f"Job created in MongoDB: {new_job}")
             
-            return jsonify({
+            # Dates are formatted like the listings
+            return json_response({
                 'success': True,
                 'message': 'Job added successfully',
                 'job': new_job
-            }), 201
+            }, status=201)
         
         except Exception as mongo_error:
             logger.error(f"MongoDB error: {str(mongo_error)}")
@@ -188,17 +244,68 @@ def add_job():
             'error': str(e)
         }), 500
 
+@api.route('/jobs/events', methods=['GET'])
+def job_events():
+    """Server-sent stream of job inserts and deletes with the stats change of each"""
+    if not current_app.config.get('LIVE_EVENTS_ENABLED', True):
+        return jsonify({
+            'success': False,
+            'message': 'Live job events are disabled'
+        }), 404
+    
+    broker = live.get_broker()
+    subscription = broker.subscribe(live.Subscription(current_app.config.get('LIVE_QUEUE_SIZE', 100)),
+                                    live.parse_last_event_id(request.headers.get('Last-Event-ID')))
+    body = live.stream_events(broker, subscription, current_app.config.get('LIVE_HEARTBEAT_INTERVAL', 15))
+    # No buffering anywhere between here and the browser, events are sent as they happen
+    return Response(body, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a single job listing by ID, including heavy fields like the description"""
+    try:
+        if _is_mongo_id(job_id):
+            job = UserJob.get_by_id(job_id)
+        else:
+            try:
+                sql_id = int(job_id)
+            except (ValueError, TypeError):
+                return jsonify({
+                    'success': False,
+                    'message': f'Invalid job ID format: {job_id}'
+                }), 400
+            
+            rows = select_job_rows(Job.query.filter_by(id=sql_id), JOB_FIELDS)
+            job = rows[0] if rows else None
+        
+        if not job:
+            return jsonify({
+                'success': False,
+                'message': f'Job with ID {job_id} not found'
+            }), 404
+        
+        descriptions.attach([job])
+        return json_response({
+            'success': True,
+            'job': job
+        })
+    
+    except Exception as e:
+        logger.error(f"Error getting job {job_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to retrieve job',
+            'error': str(e)
+        }), 500
+
 @api.route('/jobs/<job_id>', methods=['DELETE'])
 def delete_job(job_id):
     """Delete a job listing by ID"""
     try:
         logger.info(f"Delete request received for job ID: {job_id}")
         
-        # Check if this is a MongoDB ObjectId (for user jobs)
-        mongo_id_pattern = r'^[0-9a-f]{24}$'
-        is_mongo_id = bool(re.match(mongo_id_pattern, job_id, re.IGNORECASE))
-        
-        if is_mongo_id:
+        if _is_mongo_id(job_id):
             logger.info(f"Attempting to delete MongoDB job with ID: {job_id}")
             # Try to delete from MongoDB
             if UserJob.delete(job_id):
@@ -229,8 +336,15 @@ def delete_job(job_id):
                         'message': f'Job with ID {job_id} not found'
                     }), 404
                 
+                # Names for lowering the suggestion counts, the row is gone after the commit
+                suggested = {field: getattr(job, field) for field in suggest.SUGGEST_FIELDS + dimensions.ID_FIELDS}
+                descriptions.delete_scraped([sql_id])
                 db.session.delete(job)
+                read_model.remove_scraped(sql_id)
+                live.record_scraped_delete(job)
                 db.session.commit()
+                dedup.release(dedup.job_key('scraped', sql_id))
+                suggest.record(suggested, -1)
                 logger.info(f"Successfully deleted MySQL job with ID: {job_id}")
                 
                 return jsonify({
@@ -255,82 +369,211 @@ def delete_job(job_id):
         }), 500
 
 
-@api.route('/jobs/stats', methods=['GET'])
-def get_job_stats():
-    """Get statistics about job listings"""
+@api.route('/suggest', methods=['GET'])
+def get_suggestions():
+    """Typeahead suggestions for a filter field, served from the in-process prefix index"""
+    field = request.args.get('field', 'company')
+    prefix = request.args.get('prefix', '')
+    if field not in suggest.SUGGEST_FIELDS:
+        return jsonify({
+            'success': False,
+            'message': f"Unsupported field: {field} (expected one of {', '.join(suggest.SUGGEST_FIELDS)})"
+        }), 400
     try:
-        # Get MySQL stats (scraped jobs)
-        sql_total = Job.query.filter_by(source='scraped').count()
-        
-        companies = db.session.query(Job.company, db.func.count(Job.id)).filter_by(source='scraped').group_by(Job.company).all()
-        sql_companies_stats = [{'company': company, 'count': count} for company, count in companies]
-        
-        locations = db.session.query(Job.location, db.func.count(Job.id)).filter_by(source='scraped').group_by(Job.location).all()
-        sql_locations_stats = [{'location': location, 'count': count} for location, count in locations]
-        
-        job_types = db.session.query(Job.job_type, db.func.count(Job.id)).filter_by(source='scraped').group_by(Job.job_type).all()
-        sql_job_types_stats = [{'job_type': job_type, 'count': count} for job_type, count in job_types]
-        
-        # Get MongoDB stats (manual jobs)
-        mongo_stats = UserJob.get_stats()
-        mongo_total = mongo_stats.get('total', 0)
-        mongo_companies_stats = mongo_stats.get('companies', [])
-        mongo_locations_stats = mongo_stats.get('locations', [])
-        mongo_job_types_stats = mongo_stats.get('job_types', [])
-        
-        # Combine stats
-        total_jobs = sql_total + mongo_total
-        
-        # Combine and merge company stats
-        company_stats = {}
-        for company in sql_companies_stats:
-            company_name = company['company']
-            company_stats[company_name] = company_stats.get(company_name, 0) + company['count']
-        
-        for company in mongo_companies_stats:
-            company_name = company['company']
-            company_stats[company_name] = company_stats.get(company_name, 0) + company['count']
-        
-        combined_companies_stats = [{'company': company, 'count': count} for company, count in company_stats.items()]
-        
-        # Combine and merge location stats
-        location_stats = {}
-        for location in sql_locations_stats:
-            location_name = location['location']
-            location_stats[location_name] = location_stats.get(location_name, 0) + location['count']
+        limit = min(int(request.args.get('limit', suggest.DEFAULT_LIMIT)), suggest.MAX_LIMIT)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'limit must be an integer'
+        }), 400
+    
+    try:
+        return jsonify({
+            'success': True,
+            'field': field,
+            'suggestions': suggest.suggest(field, prefix, limit)
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Error getting suggestions: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to retrieve suggestions',
+            'error': str(e)
+        }), 500
+
+@api.route('/searches', methods=['GET'])
+def get_saved_searches():
+    """Get all saved searches"""
+    try:
+        searches = SavedSearch.get_all()
+        return json_response({
+            'success': True,
+            'count': len(searches),
+            'searches': searches
+        })
+    
+    except Exception as e:
+        logger.error(f"Error getting saved searches: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to retrieve saved searches',
+            'error': str(e)
+        }), 500
+
+@api.route('/searches', methods=['POST'])
+def add_saved_search():
+    """Save a search (filters and keywords), new matching jobs are delivered to its inbox"""
+    try:
+        data = request.get_json() or {}
         
-        for location in mongo_locations_stats:
-            location_name = location['location']
-            location_stats[location_name] = location_stats.get(location_name, 0) + location['count']
+        if not data.get('name'):
+            return jsonify({
+                'success': False,
+                'message': 'Missing required field: name'
+            }), 400
+        if not any(data.get(field) for field in ('company', 'location', 'job_type', 'source', 'keywords')):
+            return jsonify({
+                'success': False,
+                'message': 'A saved search needs at least one filter or keywords'
+            }), 400
         
-        combined_locations_stats = [{'location': location, 'count': count} for location, count in location_stats.items()]
+        search = SavedSearch.create(data)
+        return json_response({
+            'success': True,
+            'message': 'Search saved successfully',
+            'search': search
+        }, 201)
+    
+    except Exception as e:
+        logger.error(f"Error saving search: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to save search',
+            'error': str(e)
+        }), 500
+
+@api.route('/searches/<search_id>', methods=['DELETE'])
+def delete_saved_search(search_id):
+    """Delete a saved search and its inbox"""
+    try:
+        if SavedSearch.delete(search_id):
+            return jsonify({
+                'success': True,
+                'message': f'Search with ID {search_id} deleted successfully'
+            }), 200
+        return jsonify({
+            'success': False,
+            'message': f'Search with ID {search_id} not found'
+        }), 404
+    
+    except Exception as e:
+        logger.error(f"Error deleting saved search: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to delete saved search',
+            'error': str(e)
+        }), 500
+
+@api.route('/searches/<search_id>/inbox', methods=['GET'])
+def get_saved_search_inbox(search_id):
+    """Get the jobs matched by a saved search in match order, a page at a time
+
+    Pass the returned cursor as after= for the next page and, once has_more is
+    false, to poll for new matches. since= starts at a match time instead.
+    """
+    try:
+        if not SavedSearch.get_by_id(search_id):
+            return jsonify({
+                'success': False,
+                'message': f'Search with ID {search_id} not found'
+            }), 404
         
-        # Combine and merge job type stats
-        job_type_stats = {}
-        for job_type in sql_job_types_stats:
-            job_type_name = job_type['job_type']
-            job_type_stats[job_type_name] = job_type_stats.get(job_type_name, 0) + job_type['count']
+        try:
+            since = request.args.get('since')
+            since = datetime.strptime(since, DATETIME_FORMAT) if since else None
+            limit = max(1, min(int(request.args.get('limit', 100)), 500))
+            jobs, cursor, has_more = SavedSearch.get_inbox(search_id, request.args.get('after'), since, limit)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': f'Invalid since, after or limit parameter: {str(e)}'
+            }), 400
         
-        for job_type in mongo_job_types_stats:
-            job_type_name = job_type['job_type']
-            job_type_stats[job_type_name] = job_type_stats.get(job_type_name, 0) + job_type['count']
+        return json_response({
+            'success': True,
+            'count': len(jobs),
+            'cursor': cursor,
+            'has_more': has_more,
+            'jobs': jobs
+        })
+    
+    except Exception as e:
+        logger.error(f"Error getting inbox of saved search {search_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to retrieve saved search inbox',
+            'error': str(e)
+        }), 500
+
+# Dimensions faceted by the stats endpoint, with the response key of each
+FACET_FIELDS = {'company': 'companies', 'location': 'locations', 'job_type': 'job_types'}
+
+def scraped_facet_columns():
+    """Job column grouped on per facet"""
+    return {field: getattr(Job, f'{field}_id') for field in FACET_FIELDS}
+
+def combine_job_stats(sql_total, sql_facets, mongo_total, mongo_facets):
+    """Stats response body from the per store totals and (dimension id, count) pairs per facet"""
+    stats = {'success': True, 'total_jobs': sql_total + mongo_total}
+    # Both stores group on the integer dimension keys, counts are merged per id
+    # so spellings of the same company or location land in one facet
+    for field, key in FACET_FIELDS.items():
+        stats[key] = dimensions.facet(field, list(sql_facets[field]) + list(mongo_facets[field]))
+    # Source stats
+    stats['sources'] = [
+        {'source': 'manual', 'count': mongo_total},
+        {'source': 'scraped', 'count': sql_total}
+    ]
+    return stats
+
+def read_model_job_stats():
+    """Stats response body from the unified read model, every facet is one GROUP BY"""
+    stats = read_model.get_stats()
+    return {
+        'success': True,
+        'total_jobs': stats['total'],
+        'companies': stats['companies'],
+        'locations': stats['locations'],
+        'job_types': stats['job_types'],
+        'sources': stats['sources']
+    }
+
+def build_stats_queries():
+    """(total, facets) statements of the scraped job stats, facets holds a (dimension id, count) GROUP BY per facet"""
+    scraped = Job.source == 'scraped'
+    total = db.select(db.func.count(Job.id)).where(scraped)
+    facets = {field: db.select(column, db.func.count(Job.id)).where(scraped).group_by(column)
+              for field, column in scraped_facet_columns().items()}
+    return total, facets
+
+@api.route('/jobs/stats', methods=['GET'])
+def get_job_stats():
+    """Get statistics about job listings"""
+    try:
+        if current_app.config.get('READ_MODEL_ENABLED', False):
+            return json_response(read_model_job_stats())
         
-        combined_job_types_stats = [{'job_type': job_type, 'count': count} for job_type, count in job_type_stats.items()]
+        # Get MySQL stats (scraped jobs)
+        total, facets = build_stats_queries()
+        sql_total = db.session.scalar(total)
+        sql_facets = {field: db.session.execute(statement).all() for field, statement in facets.items()}
         
-        # Source stats
-        sources_stats = [
-            {'source': 'manual', 'count': mongo_total},
-            {'source': 'scraped', 'count': sql_total}
-        ]
+        # Get MongoDB stats (manual jobs)
+        mongo_total = UserJob.count()
+        mongo_facets = {field: UserJob.get_facet_counts(f'{field}_id') for field in FACET_FIELDS}
         
-        return jsonify({
-            'success': True,
-            'total_jobs': total_jobs,
-            'companies': combined_companies_stats,
-            'locations': combined_locations_stats,
-            'job_types': combined_job_types_stats,
-            'sources': sources_stats
-        }), 200
+        return json_response(combine_job_stats(sql_total, sql_facets, mongo_total, mongo_facets))
     
     except Exception as e:
         logger.error(f"Error getting job stats: {str(e)}")
@@ -343,8 +586,26 @@ def get_job_stats():
 @api.route('/scraper/run', methods=['POST'])
 def trigger_scraper():
     """Manually trigger the job scraper"""
+    # Imported on first use, web processes that never scrape do not load the scraper
+    from scraper.bot import scrape_jobs
     try:
         result = scrape_jobs()
+        if result.get('skipped', False):
+            return jsonify({
+                'success': False,
+                'message': result.get('error')
+            }), 409
+        
+        # Manual runs crawl to full depth, their yield still informs the adaptive schedule
+        adaptive.get_schedule(current_app.config).record_run(result.get('pages', []))
+        if not result.get('success', False):
+            # Pages committed before the failure are kept, the next run resumes after them
+            return jsonify({
+                'success': False,
+                'message': 'Job scraper failed',
+                'error': result.get('error'),
+                'jobs_processed': result.get('jobs_saved', 0)
+            }), 500
         
         return jsonify({
             'success': True,
@@ -360,44 +621,56 @@ def trigger_scraper():
             'error': str(e)
         }), 500
 
+def scraper_status(scraped_jobs, manual_jobs, most_recent_update):
+    """Scraper status response body around the job counts"""
+    # Schedule info from config
+    schedule_times = current_app.config.get('SCRAPER_SCHEDULE', {})
+    test_interval = current_app.config.get('SCRAPER_TEST_INTERVAL', 3)
+    adaptive_enabled = current_app.config.get('SCRAPER_ADAPTIVE_ENABLED', True)
+    
+    return {
+        'success': True,
+        'stats': {
+            'total_jobs': scraped_jobs + manual_jobs,
+            'scraped_jobs': scraped_jobs,
+            'manual_jobs': manual_jobs,
+            'most_recent_update': most_recent_update.strftime(DATETIME_FORMAT) if most_recent_update else None
+        },
+        'schedule': {
+            'regular_times': list(schedule_times.values()),
+            'test_interval_minutes': test_interval,
+            # Interval, crawl depth and the reasons behind recent changes
+            'adaptive': adaptive.get_schedule(current_app.config).status() if adaptive_enabled else None
+        },
+        # Last run per source with its checkpoint, and whether its circuit breaker paused it
+        'runs': checkpoints.last_run_status(sources.source_names()),
+        'drivers': driver_pool.get_pool().status(),
+        'database_health': {
+            name: 'connected' if check['ok'] else 'error'
+            for name, check in health.database_status().items()
+        }
+    }
+
 @api.route('/scraper/status', methods=['GET'])
 def get_scraper_status():
     """Get the status of the job scraper"""
     try:
-        # Get job counts from MySQL (scraped jobs)
-        scraped_jobs = Job.query.filter_by(source='scraped').count()
-        
-        # Get job counts from MongoDB (manual jobs)
-        mongo_stats = UserJob.get_stats()
-        manual_jobs = mongo_stats.get('total', 0)
-        
-        total_jobs = scraped_jobs + manual_jobs
+        if current_app.config.get('READ_MODEL_ENABLED', False):
+            counts = read_model.count_by_source()
+            scraped_jobs = counts.get('scraped', 0)
+            manual_jobs = counts.get('manual', 0)
+        else:
+            # Get job counts from MySQL (scraped jobs)
+            scraped_jobs = Job.query.filter_by(source='scraped').count()
+            
+            # Get job counts from MongoDB (manual jobs)
+            manual_jobs = UserJob.count()
         
         # Get the most recent job from MySQL
         most_recent_sql = Job.query.order_by(Job.updated_at.desc()).first()
-        most_recent_sql_time = most_recent_sql.updated_at.strftime('%Y-%m-%d %H:%M:%S') if most_recent_sql else None
+        most_recent_update = most_recent_sql.updated_at if most_recent_sql else None
         
-        # Schedule info from config
-        schedule_times = current_app.config.get('SCRAPER_SCHEDULE', {})
-        test_interval = current_app.config.get('SCRAPER_TEST_INTERVAL', 3)
-        
-        return jsonify({
-            'success': True,
-            'stats': {
-                'total_jobs': total_jobs,
-                'scraped_jobs': scraped_jobs,
-                'manual_jobs': manual_jobs,
-                'most_recent_update': most_recent_sql_time
-            },
-            'schedule': {
-                'regular_times': list(schedule_times.values()),
-                'test_interval_minutes': test_interval
-            },
-            'database_health': {
-                'mysql': 'connected',
-                'mongodb': 'connected'
-            }
-        }), 200
+        return json_response(scraper_status(scraped_jobs, manual_jobs, most_recent_update))
     
     except Exception as e:
         logger.error(f"Error getting scraper status: {str(e)}")
@@ -409,44 +682,33 @@ def get_scraper_status():
 
 @api.route('/health/databases', methods=['GET'])
 def check_database_health():
-    """Check the health of all database connections"""
+    """Check the health of all database connections
+
+    Uses the cached pings of /readyz and job count estimates, so polling it adds no real load.
+    """
     result = {
         'success': True,
         'mysql': {'status': 'unknown', 'message': ''},
         'mongodb': {'status': 'unknown', 'message': ''}
     }
+    checks = health.database_status()
+    counts = health.estimated_job_counts()
     
-    # Check MySQL connection
-    try:
-        # Try a simple query
-        job_count = Job.query.count()
-        result['mysql'] = {
-            'status': 'connected',
-            'message': f'Successfully connected. Found {job_count} jobs in MySQL.'
-        }
-    except Exception as e:
-        logger.error(f"MySQL connection error: {str(e)}")
-        result['mysql'] = {
-            'status': 'error',
-            'message': f'Failed to connect: {str(e)}'
-        }
-        result['success'] = False
-    
-    # Check MongoDB connection
-    try:
-        # Try a ping command
-        mongo.db.command('ping')
-        job_count = mongo.db.user_jobs.count_documents({})
-        result['mongodb'] = {
-            'status': 'connected',
-            'message': f'Successfully connected. Found {job_count} jobs in MongoDB.'
-        }
-    except Exception as e:
-        logger.error(f"MongoDB connection error: {str(e)}")
-        result['mongodb'] = {
-            'status': 'error',
-            'message': f'Failed to connect: {str(e)}'
-        }
-        result['success'] = False
+    for name, label in (('mysql', 'MySQL'), ('mongodb', 'MongoDB')):
+        check = checks[name]
+        if check['ok']:
+            found = f" About {counts[name]} jobs in {label}." if counts[name] is not None else ''
+            result[name] = {
+                'status': 'connected',
+                'message': f'Successfully connected.{found}',
+                'latency_ms': check['latency_ms']
+            }
+        else:
+            logger.error(f"{label} connection error: {check['error']}")
+            result[name] = {
+                'status': 'error',
+                'message': f"Failed to connect: {check['error']}"
+            }
+            result['success'] = False
     
     return jsonify(result)
\ No newline at end of file
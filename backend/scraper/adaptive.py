@@ -0,0 +1,125 @@
+import logging
+import math
+import threading
+from collections import deque
+from datetime import datetime
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Weight of the newest run in the moving averages
+SMOOTHING = 0.5
+# Crawl this much deeper than the expected number of new jobs strictly needs
+DEPTH_MARGIN = 1.5
+
+class AdaptiveSchedule:
+    """Chooses the scrape interval and crawl depth from the new-job yield of past runs
+
+    Runs without new jobs back the interval off exponentially, runs with a high
+    yield (or a deepest page holding only new jobs) tighten it. The depth is the
+    number of pages the jobs expected to have been posted since the last run fill.
+    """
+
+    def __init__(self, min_interval=3, max_interval=240, start_interval=15, backoff_factor=2.0,
+                 high_yield=10, min_pages=1, max_pages=19, history_size=20):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.high_yield = high_yield
+        self.min_pages = min_pages
+        self.max_pages = max_pages
+        self.interval = min(max(start_interval, min_interval), max_interval)
+        self.depth = max_pages
+        self.new_jobs_per_minute = None
+        self.jobs_per_page = None
+        self.last_run_at = None
+        self.decisions = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _average(current, value):
+        return value if current is None else SMOOTHING * value + (1 - SMOOTHING) * current
+
+    def record_run(self, pages, finished_at=None):
+        """Record a run's (job cards, new jobs) per crawled page and decide the next interval and depth"""
+        finished_at = finished_at or datetime.utcnow()
+        new_jobs = sum(new for _, new in pages)
+        cards = [found for found, _ in pages if found]
+        with self._lock:
+            if self.last_run_at is not None:
+                minutes = max((finished_at - self.last_run_at).total_seconds() / 60, self.min_interval)
+                self.new_jobs_per_minute = self._average(self.new_jobs_per_minute, new_jobs / minutes)
+            if cards:
+                self.jobs_per_page = self._average(self.jobs_per_page, sum(cards) / len(cards))
+            self.last_run_at = finished_at
+
+            # A last page holding only new jobs means the run may have stopped short
+            undercrawled = bool(pages) and 0 < pages[-1][0] <= pages[-1][1] and len(pages) < self.max_pages
+            if new_jobs == 0:
+                self.interval = min(self.interval * self.backoff_factor, self.max_interval)
+                reason = 'no new jobs, backing off'
+            elif new_jobs >= self.high_yield or undercrawled:
+                self.interval = max(self.interval / self.backoff_factor, self.min_interval)
+                reason = 'high yield, tightening' if not undercrawled else 'last page was all new, tightening'
+            else:
+                reason = 'steady yield, keeping interval'
+
+            if undercrawled:
+                self.depth = min(max(len(pages) * 2, self.min_pages), self.max_pages)
+            else:
+                self.depth = self._expected_pages()
+
+            decision = {
+                'at': finished_at,
+                'pages_crawled': len(pages),
+                'new_jobs': new_jobs,
+                'interval_minutes': round(self.interval, 2),
+                'next_depth': self.depth,
+                'reason': reason
+            }
+            self.decisions.append(decision)
+        logger.info(f"Adaptive scraper schedule: {reason}, next run in {self.interval:.1f} minutes "
+                    f"crawling {self.depth} pages")
+        return decision
+
+    def _expected_pages(self):
+        """Pages the jobs expected by the next run fill, with a margin"""
+        if self.new_jobs_per_minute is None or not self.jobs_per_page:
+            return self.max_pages
+        expected_jobs = self.new_jobs_per_minute * self.interval * DEPTH_MARGIN
+        pages = math.ceil(expected_jobs / self.jobs_per_page)
+        return min(max(pages, self.min_pages), self.max_pages)
+
+    def status(self):
+        """Current decisions for the scraper status endpoint"""
+        with self._lock:
+            return {
+                'interval_minutes': round(self.interval, 2),
+                'next_depth': self.depth,
+                'min_interval_minutes': self.min_interval,
+                'max_interval_minutes': self.max_interval,
+                'new_jobs_per_minute': round(self.new_jobs_per_minute, 3) if self.new_jobs_per_minute is not None else None,
+                'jobs_per_page': round(self.jobs_per_page, 1) if self.jobs_per_page else None,
+                'last_run_at': self.last_run_at,
+                'recent_decisions': list(self.decisions)
+            }
+
+# Process wide schedule, created from the app config on first use
+_schedule = None
+_schedule_lock = threading.Lock()
+
+def get_schedule(config):
+    """The adaptive schedule for this process"""
+    global _schedule
+    with _schedule_lock:
+        if _schedule is None:
+            _schedule = AdaptiveSchedule(
+                min_interval=config.get('SCRAPER_MIN_INTERVAL', 3),
+                max_interval=config.get('SCRAPER_MAX_INTERVAL', 240),
+                start_interval=config.get('SCRAPER_TEST_INTERVAL', 3),
+                backoff_factor=config.get('SCRAPER_BACKOFF_FACTOR', 2.0),
+                high_yield=config.get('SCRAPER_HIGH_YIELD', 10),
+                min_pages=config.get('SCRAPER_MIN_PAGES', 1),
+                max_pages=config.get('SCRAPER_MAX_JOBS', 20) - 1
+            )
+        return _schedule
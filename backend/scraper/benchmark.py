@@ -0,0 +1,202 @@
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit, urlunsplit
+import click
+
+# End to end scraper benchmark against the local fixture site, run from the backend folder:
+#   python -m scraper.benchmark --pages 5 --jobs-per-page 20 --latency 50
+# Jobs go to a throwaway SQLite database and a separate MongoDB database, so the
+# benchmark never touches real data. Chrome and MongoDB must be available.
+
+class PhaseTimer:
+    """Wall time per phase, measured by wrapping the functions a scrape calls"""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self._patches = []
+
+    def wrap(self, owner, name, phase):
+        original = getattr(owner, name)
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.seconds[phase] += time.perf_counter() - started
+                self.calls[phase] += 1
+
+        setattr(owner, name, timed)
+        self._patches.append((owner, name, original))
+
+    def restore(self):
+        while self._patches:
+            owner, name, original = self._patches.pop()
+            setattr(owner, name, original)
+
+class MemorySampler:
+    """Peak resident memory of the pooled Chrome processes, sampled in a background thread"""
+
+    def __init__(self, pool, interval=0.1):
+        self.pool = pool
+        self.interval = interval
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            size = self.pool.memory_mb()
+            if size is not None:
+                self.peak_mb = max(self.peak_mb or 0, size)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+def _mongo_uri(uri, database):
+    """MONGO_URI pointing at another database on the same server"""
+    parts = urlsplit(uri)
+    return urlunsplit((parts.scheme, parts.netloc, f'/{database}', parts.query, parts.fragment))
+
+def run_benchmark(site, runs=1, workdir=None, concurrency=1):
+    """Scrape the fixture site `runs` times with a warm driver pool and report throughput per run"""
+    from config import Config
+    from app import create_app
+    from migrate import migrate
+    from models import db, Job, JobDescription, JobListingRead
+    import dedup
+    import percolator
+    import suggest
+    from mongo_models import mongo
+    from scraper import bot, driver_pool, snapshots
+    from scraper.sources import Source
+
+    # Point the app at throwaway databases before it is created
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    Config.MONGO_URI = _mongo_uri(Config.MONGO_URI, 'job_listings_benchmark')
+    app = create_app()
+    app.config.update(SCRAPER_URL=site.url, SCRAPER_SNAPSHOT_DIR=os.path.join(workdir, 'snapshots'),
+                      SCRAPER_SOURCES='actuarylist', SCRAPER_SOURCE_OPTIONS=None, SCRAPER_CONCURRENCY=concurrency,
+                      SCRAPER_DRIVER_POOL_SIZE=max(concurrency, app.config.get('SCRAPER_DRIVER_POOL_SIZE', 4)))
+    reports = []
+    with app.app_context():
+        migrate()
+        pool = driver_pool.get_pool()
+        for run in range(1, runs + 1):
+            # Every run stores the whole site again
+            JobDescription.query.delete()
+            JobListingRead.query.delete()
+            Job.query.delete()
+            db.session.commit()
+            dedup.reset()
+            requests_before = dict(site.requests)
+
+            timer = PhaseTimer()
+            timer.wrap(pool, 'factory', 'browser_start')
+            timer.wrap(Source, 'fetch_page', 'listing_pages')
+            timer.wrap(Source, 'fetch_detail', 'descriptions')
+            timer.wrap(snapshots, 'write', 'snapshots')
+            timer.wrap(bot, 'store_jobs', 'db_store')
+            timer.wrap(db.session, 'commit', 'db_commit')
+            timer.wrap(percolator, 'percolate', 'percolate')
+            timer.wrap(suggest, 'rebuild', 'suggest_rebuild')
+            try:
+                with MemorySampler(pool) as sampler:
+                    started = time.perf_counter()
+                    # Stop at the last page, past it the wait for job cards would run into SCRAPER_TIMEOUT
+                    result = bot.scrape_jobs(max_pages=site.pages)
+                    elapsed = time.perf_counter() - started
+            finally:
+                timer.restore()
+
+            # Descriptions are fetched inside fetch_page, report the listing pages on their own.
+            # Snapshot writes happen inside both and are reported separately. With concurrent
+            # workers the fetch phases add up the time of all threads.
+            snapshot_seconds = timer.seconds.pop('snapshots', 0)
+            timer.seconds['listing_pages'] -= timer.seconds['descriptions']
+            phases = {phase: round(seconds, 3) for phase, seconds in timer.seconds.items()}
+            requests = {kind: site.requests[kind] - requests_before.get(kind, 0) for kind in site.requests}
+            pages = requests['listing'] + requests['detail']
+            jobs_saved = result.get('jobs_saved', 0)
+            reports.append({
+                'run': run,
+                'concurrency': concurrency,
+                'success': result.get('success', False),
+                'error': result.get('error'),
+                'jobs_saved': jobs_saved,
+                'jobs_expected': site.job_count,
+                'seconds': round(elapsed, 3),
+                'pages_per_second': round(pages / elapsed, 2) if elapsed else None,
+                'jobs_per_second': round(jobs_saved / elapsed, 2) if elapsed else None,
+                'requests': requests,
+                'phases': phases,
+                'db_write_seconds': round(timer.seconds['db_store'] + timer.seconds['db_commit'], 3),
+                'snapshot_seconds': round(snapshot_seconds, 3),
+                'peak_chrome_rss_mb': round(sampler.peak_mb, 1) if sampler.peak_mb is not None else None,
+                # ru_maxrss is in kilobytes on Linux
+                'peak_python_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+            })
+        driver_pool.close_pool()
+        try:
+            mongo.cx.drop_database(mongo.db.name)
+        except Exception:
+            pass
+    return reports
+
+def _print_report(report):
+    click.echo(f"Run {report['run']} (concurrency {report['concurrency']}): "
+               f"{report['jobs_saved']}/{report['jobs_expected']} jobs in "
+               f"{report['seconds']:.2f}s ({report['pages_per_second']} pages/s, {report['jobs_per_second']} jobs/s)")
+    for phase, seconds in sorted(report['phases'].items(), key=lambda item: -item[1]):
+        click.echo(f"  {phase:<16} {seconds:8.3f}s")
+    click.echo(f"  DB writes {report['db_write_seconds']:.3f}s, snapshots {report['snapshot_seconds']:.3f}s, "
+               f"requests {report['requests']}")
+    click.echo(f"  Peak RSS Python {report['peak_python_rss_mb']} MB, Chrome {report['peak_chrome_rss_mb']} MB")
+    if report['error']:
+        click.echo(f"  Error: {report['error']}")
+
+@click.command()
+@click.option('--pages', type=int, default=5, help='Listing pages on the fixture site')
+@click.option('--jobs-per-page', type=int, default=20, help='Job cards per listing page')
+@click.option('--latency', type=float, default=0, help='Milliseconds the fixture site waits per response')
+@click.option('--runs', type=int, default=2, help='Scrapes in a row, later runs reuse the warm driver')
+@click.option('--concurrency', type=int, default=1, help='Listing pages fetched at once')
+@click.option('--json', 'as_json', is_flag=True, help='Print the report as JSON')
+def main(pages, jobs_per_page, latency, runs, concurrency, as_json):
+    """Benchmark scrape_jobs end to end against a local fixture site"""
+    from scraper.fixture_site import FixtureSite
+
+    workdir = tempfile.mkdtemp(prefix='scraper-benchmark-')
+    site = FixtureSite(pages=pages, jobs_per_page=jobs_per_page, latency=latency / 1000)
+    site.start()
+    try:
+        reports = run_benchmark(site, runs, workdir, concurrency)
+    finally:
+        site.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if as_json:
+        click.echo(json.dumps(reports, indent=2))
+    else:
+        for report in reports:
+            _print_report(report)
+    # A run that did not store every fixture job fails the benchmark, so CI notices broken scraping
+    if any(not report['success'] or report['jobs_saved'] != report['jobs_expected'] for report in reports):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -174,212 +174,412 @@
 
 
 import logging
-import time
-from datetime import datetime, timedelta
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException, NoSuchElementException
+import queue
+import threading
+from collections import Counter, defaultdict, deque
+from datetime import datetime
 from flask import current_app
+from sqlalchemy import and_, or_, tuple_
 from models import db, Job
+import read_model
+import dedup
+import descriptions
+import dimensions
+import suggest
+import percolator
+import live
+from scraper import checkpoints, driver_pool, snapshots, sources
 
 # Set up logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Function to convert relative time to datetime
-def parse_time(time_text):
-    now = datetime.utcnow()
-    if "h ago" in time_text:
-        hours = int(time_text.split("h")[0])
-        return now - timedelta(hours=hours)
-    elif "d ago" in time_text:
-        days = int(time_text.split("d")[0])
-        return now - timedelta(days=days)
-    elif "m ago" in time_text:
-        minutes = int(time_text.split("m")[0])
-        return now - timedelta(minutes=minutes)
-    return now  # Default to now if format is unknown
-
-def setup_driver():
-    """Set up and return a configured Chrome webdriver for Docker environment"""
-    # Configure Selenium WebDriver
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage") 
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1080")
-    
-    try:
-        # For Docker environment, use a direct path to chromedriver
-        if current_app.config.get('DOCKER_ENV', False):
-            service = Service("/usr/local/bin/chromedriver")
-        else:
-            # For local development, use webdriver_manager
-            from webdriver_manager.chrome import ChromeDriverManager
-            service = Service(ChromeDriverManager().install())
-            
-        driver = webdriver.Chrome(service=service, options=options)
-        return driver
-    except Exception as e:
-        logger.error(f"Failed to set up Chrome driver: {str(e)}")
-        raise
+# One run at a time per process, scheduled and manual runs share the checkpoints
+_run_lock = threading.Lock()
 
-def scrape_jobs():
-    """Scrape job listings from the configured source"""
-    logger.info("Job scraping started.")
+UPSERT_BATCH_SIZE = 200
+
+class ScrapeError(Exception):
+    """Raised when a listing page loaded but cannot be used"""
+
+def stored_description(job):
+    """Description text as stored for a scraped job, prefixed with its category"""
+    # Store category information in job_type or description to work with existing schema
+    job_description = job.get("description", "")
+    if job.get("category") and job.get("category") != "N/A":
+        job_description = f"Category: {job['category']}\n\n{job_description}"
+    return job_description
+
+def _job_key(title, company, location):
+    """Identity of a scraped job, case-insensitive like the MySQL collation"""
+    return (title or '').casefold(), (company or '').casefold(), location.casefold() if location is not None else None
+
+def existing_job_keys(jobs):
+    """Keys of the jobs already stored, in one query for the batch (NULL locations need their own)"""
+    located = {(job["title"], job["company"], job["location"]) for job in jobs if job["location"] is not None}
+    unlocated = {(job["title"], job["company"]) for job in jobs if job["location"] is None}
+    conditions = []
+    if located:
+        conditions.append(tuple_(Job.title, Job.company, Job.location).in_(located))
+    if unlocated:
+        conditions.append(and_(tuple_(Job.title, Job.company).in_(unlocated), Job.location.is_(None)))
+    if not conditions:
+        return set()
+    rows = db.session.query(Job.title, Job.company, Job.location).filter(or_(*conditions))
+    return {_job_key(*row) for row in rows}
+
+def forget_jobs(jobs):
+    """Drop rolled back Job rows from the near-duplicate index, the rest of the index stays valid"""
+    for job in jobs:
+        dedup.forget(dedup.job_key('scraped', job.id))
+
+def store_jobs(jobs):
+    """Add the jobs not stored yet to the session, returns the kept Job rows and their percolation batch
+
+    Shared by live runs and snapshot re-parsing. Nothing is committed, the
+    caller commits the jobs together with its own bookkeeping and passes the
+    kept jobs to forget_jobs when it rolls back instead.
+    """
+    new_jobs = []
+    # Jobs already stored, looked up for the whole batch at once. Later copies
+    # of a job within the batch are skipped as well.
+    seen = existing_job_keys(jobs)
     
-    driver = None
-    try:
-        # Set up the driver
-        driver = setup_driver()
-        
-        base_url = current_app.config.get('SCRAPER_URL', 'https://www.actuarylist.com/')
-        jobs_saved = 0
-        max_jobs = current_app.config.get('SCRAPER_MAX_JOBS', 20)
-        
-        for page in range(1, max_jobs):
-            url = base_url if page == 1 else f"{base_url}?page={page}"
-            logger.info(f"Scraping page {page}: {url}")
-            jobs = get_jobs(driver, url)
-            
-            for job in jobs:
-                existing_job = Job.query.filter_by(title=job["title"], company=job["company"], location=job["location"]).first()
-                if not existing_job:
-                    # Store category information in job_type or description to work with existing schema
-                    job_description = job.get("description", "")
-                    if job.get("category") and job.get("category") != "N/A":
-                        job_description = f"Category: {job['category']}\n\n{job_description}"
-                    
-                    new_job = Job(
-                        title=job["title"],
-                        company=job["company"],
-                        location=job["location"],
-                        description=job_description,
-                        job_type=job.get("category", "Not specified"),  # Store category in job_type
-                        posting_date=job.get("created_at", datetime.utcnow()).date(),
-                        source="scraped"
-                    )
-                    db.session.add(new_job)
-                    jobs_saved += 1
-            
-            db.session.commit()
-            logger.info(f"Saved {jobs_saved} jobs from page {page}")
-        
-        logger.info(f"Scraping completed. Saved {jobs_saved} new jobs to database.")
-        return {'success': True, 'jobs_saved': jobs_saved}
+    for job in jobs:
+        key = _job_key(job["title"], job["company"], job["location"])
+        if key not in seen:
+            seen.add(key)
+            # The description is stored compressed in job_descriptions once the job has an id
+            job_description = stored_description(job)
+            job_type = job.get("category", "Not specified")  # Store category in job_type
+            new_job = Job(
+                title=job["title"],
+                company=job["company"],
+                location=job["location"],
+                job_type=job_type,
+                posting_date=job.get("created_at", datetime.utcnow()).date(),
+                url=job.get("url"),
+                source="scraped",
+                **dimensions.ids_for(job["company"], job["location"], job_type)
+            )
+            db.session.add(new_job)
+            new_jobs.append((new_job, job_description))
     
-    except Exception as e:
-        logger.error(f"Error during job scraping: {str(e)}")
-        db.session.rollback()
-        return {'success': False, 'error': str(e)}
+    # Flush to get ids, then check the new jobs for near-duplicates in one batch
+    db.session.flush()
+    try:
+        matches = dedup.mark_batch([
+            (dedup.job_key('scraped', new_job.id), new_job.title, job_description)
+            for new_job, job_description in new_jobs
+        ])
+        merge_duplicates = current_app.config.get('DEDUP_MODE', 'flag') == 'merge'
+        kept_jobs = []
+        percolate_batch = []
+        for new_job, job_description in new_jobs:
+            key = dedup.job_key('scraped', new_job.id)
+            new_job.duplicate_of = matches.get(key)
+            if new_job.duplicate_of and merge_duplicates:
+                # Merge mode keeps only the original posting
+                dedup.forget(key)
+                db.session.delete(new_job)
+            else:
+                descriptions.store_scraped(new_job.id, job_description)
+                kept_jobs.append(new_job)
+                percolate_batch.append({
+                    'id': new_job.id,
+                    'source': 'scraped',
+                    'title': new_job.title,
+                    'company': new_job.company,
+                    'location': new_job.location,
+                    'job_type': new_job.job_type,
+                    'posting_date': new_job.posting_date,
+                    'url': new_job.url,
+                    'description': job_description
+                })
     
-    finally:
-        if driver:
-            driver.quit()
+        # Read model rows are written in the same transaction as the jobs
+        read_model.add_scraped(kept_jobs)
+        # So are the outbox events of the live job stream
+        live.record_scraped_inserts(kept_jobs)
+    except Exception:
+        # The caller rolls the batch back, its jobs must not stay in the near-duplicate index
+        forget_jobs(new_job for new_job, _ in new_jobs)
+        raise
+    return kept_jobs, percolate_batch
 
-# Function to extract job descriptions
-def get_description(driver, url):
-    try:
-        driver.get(url)
-        time.sleep(2) 
+class PageCounter:
+    """Hands out a source's listing pages in crawl order to its workers until the end of the listing"""
+
+    def __init__(self, pages):
+        self._pages = deque(pages)
+        self.end = max(self._pages, default=0)
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            while self._pages:
+                page = self._pages.popleft()
+                if page <= self.end:
+                    return page
+            return None
+
+    def stop_at(self, page):
+        """The listing ends before page, later pages are not handed out anymore"""
+        with self._lock:
+            self.end = min(self.end, page - 1)
+
+class SourceRun:
+    """Writer side state of one source during a run"""
+
+    def __init__(self, source, run, depth):
+        self.source = source
+        self.run = run
+        self.order = checkpoints.page_order(run, depth)
+        self.counter = PageCounter(self.order)
+        self.stop = threading.Event()
+        self.workers = []
+        self.error = None
+        self.jobs_saved = 0
+        # Fetched pages waiting for the pages before them in crawl order, by page number
+        self.completed = {}
+        self._position = 0
+
+    def advance(self):
+        """Checkpoint the pages that are now contiguous with the last committed page"""
+        while self._position < len(self.order) and self.order[self._position] in self.completed:
+            page = self.order[self._position]
+            self._position += 1
+            jobs_found, jobs_added, retries = self.completed.pop(page)
+            if jobs_found:
+                checkpoints.checkpoint(self.run, page, jobs_found, jobs_added, retries)
+
+def _fetch_pages(app, source, counter, stop, results):
+    """Worker thread: fetch a source's pages with a pooled driver and queue them for the writer"""
+    # Imported here so importing the bot (e.g. for store_jobs) does not load Selenium
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+
+    with app.app_context():
+        pool = driver_pool.get_pool()
+        breaker = checkpoints.get_breaker(source.name)
+        driver = None
         try:
-            description_element = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, "//p[text()='Job Description']/following-sibling::ul"))
-            )
-            return description_element.text.strip()
-        except:
-            # Try alternative selectors for descriptions
-            selectors = [
-                "//div[contains(@class, 'job-description')]",
-                "//div[contains(@class, 'description')]",
-                "//section[contains(@class, 'job-description')]"
-            ]
-            for selector in selectors:
+            while not stop.is_set():
+                page = counter.next()
+                if page is None:
+                    break
+                logger.info(f"Scraping {source.name} page {page}: {source.listing_url(page)}")
+
+                # Swap out a driver that reached its page or memory limit between pages
+                if driver is not None and pool.due_for_recycling(driver):
+                    pool.release(driver)
+                    driver = None
+
+                def load_page():
+                    nonlocal driver
+                    if driver is None:
+                        driver = pool.acquire()
+                    try:
+                        result = source.fetch_page(driver, page)
+                    except TimeoutException:
+                        raise
+                    except WebDriverException:
+                        # The browser may have crashed, retry with a fresh one
+                        pool.release(driver, discard=True)
+                        driver = None
+                        raise
+                    # The listing page and one page per description
+                    pool.record_pages(driver, 1 + len(result.jobs))
+                    if not result.jobs and page == 1:
+                        raise ScrapeError(f"No job cards found on the first page {source.listing_url(page)}")
+                    return result
+
                 try:
-                    element = driver.find_element(By.XPATH, selector)
-                    if element.text.strip():
-                        return element.text.strip()
-                except:
-                    pass
-            
-            logger.warning(f"Failed to extract description from {url}")
-            return "No description available"
-    except Exception as e:
-        logger.warning(f"Error accessing job URL {url}: {str(e)}")
-        return "Failed to load job description"
+                    result, retries = checkpoints.with_retries(load_page, f"{source.name} page {page}", breaker)
+                except Exception as e:
+                    results.put((source.name, page, None, 0, e))
+                    break
+                if not result.jobs:
+                    logger.info(f"No job cards on {source.name} page {page}, reached the end of the listing")
+                    counter.stop_at(page)
+                results.put((source.name, page, result, retries, None))
+        finally:
+            if driver is not None:
+                pool.release(driver)
+            # Tells the writer this worker is done
+            results.put((source.name, None, None, 0, None))
+
+def _next_batch(results, batch_size):
+    """Block for the next fetched page, then take whatever else is queued up to batch_size jobs"""
+    batch = [results.get()]
+    jobs = len(batch[0][2].jobs) if batch[0][2] is not None else 0
+    while jobs < batch_size:
+        try:
+            item = results.get_nowait()
+        except queue.Empty:
+            break
+        batch.append(item)
+        if item[2] is not None:
+            jobs += len(item[2].jobs)
+    return batch
+
+def _write_batch(batch, runs, pages):
+    """Store the jobs and snapshots of fetched pages and checkpoint their sources in one commit"""
+    jobs = []
+    records = []
+    page_of = {}
+    for name, page, result, retries, error in batch:
+        if result is None:
+            continue
+        for job in result.jobs:
+            page_of.setdefault((job['title'], job['company'], job['location']), (name, page))
+        jobs.extend(result.jobs)
+        records.extend(result.snapshot_records)
+
+    kept_jobs, percolate_batch = store_jobs(jobs) if jobs else ([], [])
+    try:
+        snapshots.add(records)
+        added = Counter(page_of.get((job.title, job.company, job.location)) for job in kept_jobs)
 
-# Function to extract job listings
-def get_jobs(driver, url):
-    driver.get(url)
-    job_list = []
+        for name, page, result, retries, error in batch:
+            if result is None:
+                continue
+            found = len(result.jobs)
+            runs[name].completed[page] = (found, added[(name, page)], retries)
+            runs[name].jobs_saved += added[(name, page)]
+            if found:
+                pages[page][0] += found
+                pages[page][1] += added[(name, page)]
+        for source_run in runs.values():
+            source_run.advance()
+
+        # Commit the batch's jobs, read model rows, snapshots and the runs' checkpoints together
+        db.session.commit()
+    except Exception:
+        forget_jobs(kept_jobs)
+        raise
+    # Match the batch's new jobs against all saved searches in one pass
+    percolator.percolate(percolate_batch)
+    return len(kept_jobs)
+
+def scrape_jobs(max_pages=None):
+    """Scrape job listings from the configured sources
+
+    max_pages limits the crawl depth of every source, by default the first
+    SCRAPER_MAX_JOBS - 1 pages are crawled. The result lists (job cards, new
+    jobs) per crawled page number, summed over the sources.
+
+    Each source runs up to its `concurrency` pages at once in worker threads,
+    rate limited per source, with Chrome drivers from the process wide pool.
+    The fetched pages go through one writer that stores them in batches of up
+    to SCRAPER_UPSERT_BATCH_SIZE jobs, committing each batch together with the
+    checkpoints of the sources' ScraperRuns. Page loads are retried with
+    exponential backoff; a source that still fails stops on its own, keeps its
+    committed pages and resumes after them next time.
+    """
+    if not _run_lock.acquire(blocking=False):
+        logger.warning("Scraper run skipped, another run is in progress")
+        return {'success': False, 'skipped': True, 'error': 'A scraper run is already in progress', 'pages': []}
     
+    logger.info("Job scraping started.")
+    
+    runs = {}
+    errors = {}
+    pages = defaultdict(lambda: [0, 0])
+    jobs_saved = 0
     try:
-        # Wait for job cards to load
-        WebDriverWait(driver, current_app.config.get('SCRAPER_TIMEOUT', 60)).until(
-            EC.presence_of_element_located((By.TAG_NAME, "article"))
-        )
+        if max_pages is None:
+            max_pages = current_app.config.get('SCRAPER_MAX_JOBS', 20) - 1
+        batch_size = current_app.config.get('SCRAPER_UPSERT_BATCH_SIZE', UPSERT_BATCH_SIZE)
+        app = current_app._get_current_object()
+        results = queue.Queue()
         
-        job_cards = driver.find_elements(By.TAG_NAME, "article")
-        logger.info(f"Found {len(job_cards)} job cards on {url}")
-        
-        for job in job_cards:
+        for source in sources.get_sources():
             try:
-                job_title = job.find_element(By.CLASS_NAME, "Job_job-card__position__ic1rc").text.strip()
-            except:
-                job_title = "Unspecified Position"
-                logger.warning("Could not extract job title")
-            
-            try:
-                job_company = job.find_element(By.CLASS_NAME, "Job_job-card__company__7T9qY").text.strip()
-            except:
-                job_company = "Unspecified Company"
-                logger.warning("Could not extract company name")
-            
-            try:
-                job_country = job.find_element(By.CLASS_NAME, "Job_job-card__country__GRVhK").text.strip()
-            except:
-                job_country = "Location Not Specified"
-                logger.warning("Could not extract location")
-            
-            try:
-                posted_time = job.find_element(By.CLASS_NAME, "Job_job-card__posted-on__NCZaJ").text.strip()
-                created_at = parse_time(posted_time)  # Convert relative time
-            except:
-                created_at = datetime.utcnow()
-                logger.warning("Could not extract posting time, using current time")
-
-            try:
-                parent_div = job.find_element(By.CLASS_NAME, "Job_job-card__tags__zfriA")  
-                job_category = parent_div.find_element(By.CLASS_NAME, "Job_job-card__location__bq7jX").text.strip()
-            except:
-                job_category = "Not Specified"
-                logger.warning("Could not extract job category")
-            
+                # Do not start a source while its circuit breaker has paused it
+                checkpoints.get_breaker(source.name).check()
+                run = checkpoints.start_run(max_pages, source.name)
+            except Exception as e:
+                logger.error(f"Not scraping {source.name}: {str(e)}")
+                db.session.rollback()
+                errors[source.name] = e
+                continue
+            source_run = SourceRun(source, run, max_pages)
+            for _ in range(source.concurrency):
+                worker = threading.Thread(target=_fetch_pages, daemon=True,
+                                          args=(app, source, source_run.counter, source_run.stop, results))
+                source_run.workers.append(worker)
+            runs[source.name] = source_run
+        
+        for source_run in runs.values():
+            for worker in source_run.workers:
+                worker.start()
+        
+        running = sum(len(source_run.workers) for source_run in runs.values())
+        try:
+            while running:
+                batch = _next_batch(results, batch_size)
+                for name, page, result, retries, error in batch:
+                    if page is None:
+                        running -= 1
+                    elif error is not None and runs[name].error is None:
+                        # Only this source stops, the others keep going
+                        logger.error(f"Error scraping {name} page {page}: {str(error)}")
+                        runs[name].error = error
+                        runs[name].stop.set()
+                jobs_saved += _write_batch(batch, runs, pages)
+        except Exception as e:
+            logger.error(f"Error storing scraped jobs: {str(e)}")
+            db.session.rollback()
+            for source_run in runs.values():
+                source_run.error = source_run.error or e
+                source_run.stop.set()
+            for source_run in runs.values():
+                for worker in source_run.workers:
+                    worker.join()
+        
+        summary = {}
+        for name, source_run in runs.items():
+            # Keep the checkpoint, the next run resumes after the last committed page
             try:
-                job_link = job.find_element(By.CLASS_NAME, "Job_job-page-link__a5I5g").get_attribute("href")
-            except:
-                job_link = url  # Use the main URL as fallback
-                logger.warning("Could not extract job link")
-            
-            # Only get description if we have a valid URL
-            job_description = get_description(driver, job_link) if job_link != url else "No description available"
-
-            job_list.append({
-                "title": job_title,
-                "company": job_company,
-                "location": job_country,
-                "description": job_description,
-                "category": job_category,
-                "created_at": created_at,  # Store parsed datetime
-                "url": job_link
-            })
+                checkpoints.finish_run(source_run.run, source_run.error)
+            except Exception as finish_error:
+                db.session.rollback()
+                logger.error(f"Failed to record {name} scraper run: {str(finish_error)}")
+            if source_run.error is not None:
+                errors[name] = source_run.error
+            summary[name] = {
+                'success': source_run.error is None,
+                'error': str(source_run.error) if source_run.error is not None else None,
+                'jobs_saved': source_run.jobs_saved,
+                'run_id': source_run.run.id,
+                'resumed_from': source_run.run.resumed_from,
+                'last_committed_page': source_run.run.last_committed_page
+            }
+        for name, error in errors.items():
+            summary.setdefault(name, {'success': False, 'error': str(error), 'jobs_saved': 0})
+        
+        if jobs_saved:
+            # Refresh the typeahead counts with the new jobs
+            suggest.rebuild()
+        result = {
+            'success': not errors,
+            'jobs_saved': jobs_saved,
+            'pages': [tuple(pages[page]) for page in sorted(pages)],
+            'sources': summary,
+            'run_ids': {name: source_run.run.id for name, source_run in runs.items()}
+        }
+        if errors:
+            result['error'] = '; '.join(f"{name}: {str(error)}" for name, error in errors.items())
+            logger.error(f"Scraping finished with errors. Saved {jobs_saved} new jobs to database.")
+        else:
+            logger.info(f"Scraping completed. Saved {jobs_saved} new jobs to database.")
+        return result
     
     except Exception as e:
-        logger.error(f"Error scraping jobs from {url}: {str(e)}")
+        logger.error(f"Error during job scraping: {str(e)}")
+        db.session.rollback()
+        return {'success': False, 'error': str(e), 'jobs_saved': jobs_saved,
+                'pages': [tuple(pages[page]) for page in sorted(pages)]}
     
-    return job_list
\ No newline at end of file
+    finally:
+        _run_lock.release()
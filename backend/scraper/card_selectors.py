@@ -0,0 +1,63 @@
+import json
+import logging
+import threading
+from flask import current_app
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Selector maps per site layout version. Card fields are CSS selectors relative to
+# the card, descriptions are XPath expressions tried in order on the job page.
+# Add a new version when the site's markup changes instead of editing an old one.
+SELECTOR_MAPS = {
+    1: {
+        'card': 'article',
+        'title': '.Job_job-card__position__ic1rc',
+        'company': '.Job_job-card__company__7T9qY',
+        'location': '.Job_job-card__country__GRVhK',
+        'posted': '.Job_job-card__posted-on__NCZaJ',
+        'category': '.Job_job-card__tags__zfriA .Job_job-card__location__bq7jX',
+        'link': '.Job_job-page-link__a5I5g',
+        'description': [
+            "//p[text()='Job Description']/following-sibling::ul",
+            "//div[contains(@class, 'job-description')]",
+            "//div[contains(@class, 'description')]",
+            "//section[contains(@class, 'job-description')]"
+        ]
+    }
+}
+LATEST_VERSION = max(SELECTOR_MAPS)
+
+CARD_FIELDS = ('title', 'company', 'location', 'posted', 'category', 'link')
+
+_selectors = None
+_lock = threading.Lock()
+
+def reset():
+    """Drop the loaded selector map, it is reloaded from the config on next use"""
+    global _selectors
+    with _lock:
+        _selectors = None
+
+def get_selectors():
+    """Selector map of SCRAPER_SELECTOR_VERSION with the overrides from SCRAPER_SELECTORS_FILE"""
+    global _selectors
+    with _lock:
+        if _selectors is None:
+            version = current_app.config.get('SCRAPER_SELECTOR_VERSION') or LATEST_VERSION
+            if version not in SELECTOR_MAPS:
+                raise ValueError(f"Unknown scraper selector version {version}")
+            selectors = dict(SELECTOR_MAPS[version], version=version)
+
+            path = current_app.config.get('SCRAPER_SELECTORS_FILE')
+            if path:
+                with open(path) as overrides_file:
+                    overrides = json.load(overrides_file)
+                unknown = set(overrides) - set(selectors)
+                if unknown:
+                    raise ValueError(f"Unknown scraper selectors in {path}: {', '.join(sorted(unknown))}")
+                selectors.update(overrides)
+                selectors['version'] = f"{version}+{path}"
+            logger.info(f"Using scraper selectors version {selectors['version']}")
+            _selectors = selectors
+        return _selectors
@@ -0,0 +1,194 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, ScraperRun
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Runs in these states stopped before their last page and can be resumed
+RESUMABLE_STATUSES = ('running', 'partial', 'error')
+
+class CircuitOpenError(Exception):
+    """Raised when the scrape target failed too often and runs are paused"""
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failed page loads and stays open for `cooldown` seconds
+
+    Once the cooldown has passed a single trial is let through (half-open), a
+    success closes the circuit again and a failure reopens it.
+    """
+
+    def __init__(self, threshold=5, cooldown=900):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                return 'half-open'
+            return 'open'
+
+    def check(self):
+        """Raise CircuitOpenError while the circuit is open"""
+        if self.state == 'open':
+            remaining = self.cooldown - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(f"Scrape target keeps failing, paused for another {remaining:.0f} seconds")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            half_open = self.opened_at is not None
+            if half_open or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+                logger.warning(f"Scraper circuit opened after {self.failures} consecutive page failures")
+
+    def status(self):
+        return {'state': self.state, 'consecutive_failures': self.failures}
+
+DEFAULT_SOURCE = 'actuarylist'
+
+# Process wide breakers per source, created from the app config on first use
+_breakers = {}
+_breaker_lock = threading.Lock()
+
+def get_breaker(source=DEFAULT_SOURCE):
+    with _breaker_lock:
+        if source not in _breakers:
+            _breakers[source] = CircuitBreaker(
+                current_app.config.get('SCRAPER_CIRCUIT_THRESHOLD', 5),
+                current_app.config.get('SCRAPER_CIRCUIT_COOLDOWN', 15) * 60
+            )
+        return _breakers[source]
+
+def with_retries(load_page, description, breaker=None):
+    """Call load_page() with exponential backoff, counting each failure against the circuit breaker
+
+    Returns (result, retries). The last error is raised once the retries are
+    used up or the circuit opens.
+    """
+    breaker = breaker or get_breaker()
+    retries = current_app.config.get('SCRAPER_PAGE_RETRIES', 3)
+    backoff = current_app.config.get('SCRAPER_RETRY_BACKOFF', 2)
+    attempt = 0
+    while True:
+        breaker.check()
+        try:
+            result = load_page()
+            breaker.record_success()
+            return result, attempt
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            breaker.record_failure()
+            if attempt >= retries:
+                raise
+            # Exponential backoff with jitter so retries do not hit the site in lockstep
+            delay = backoff * (2 ** attempt) + random.uniform(0, backoff)
+            attempt += 1
+            logger.warning(f"Failed to load {description} ({str(e)}), retry {attempt}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+def start_run(end_page, source=DEFAULT_SOURCE):
+    """Start a source's run, continuing from the checkpoint of its recent run that stopped early
+
+    Returns the new ScraperRun. Its start_page is the page after the previous
+    run's checkpoint when resuming, and 1 otherwise. A resumed run still crawls
+    the first pages before it (see page_order), new postings appear there.
+    """
+    window = timedelta(hours=current_app.config.get('SCRAPER_RESUME_WINDOW', 6))
+    previous = ScraperRun.query.filter_by(source=source).order_by(ScraperRun.id.desc()).first()
+    run = ScraperRun(source=source, status='running', start_page=1, end_page=end_page, run_date=datetime.utcnow())
+
+    if (previous is not None
+            and previous.status in RESUMABLE_STATUSES
+            and previous.run_date >= datetime.utcnow() - window):
+        next_page = (previous.last_committed_page or previous.start_page - 1) + 1
+        if next_page <= (previous.end_page or 0):
+            run.start_page = next_page
+            run.end_page = max(end_page, previous.end_page)
+            run.resumed_from = previous.id
+            logger.info(f"Resuming {source} scraper run {previous.id} from page {next_page}")
+        # The previous run is superseded either way
+        if previous.status == 'running':
+            previous.status = 'error'
+            previous.error_message = previous.error_message or 'Run was interrupted'
+
+    db.session.add(run)
+    db.session.commit()
+    return run
+
+def page_order(run, depth):
+    """Pages of a run in crawl order
+
+    A resumed run first crawls the front of the listing (up to depth pages, but
+    not past its checkpoint), where new postings appear, then continues after
+    the checkpoint. Otherwise that run would find no new jobs and the adaptive
+    schedule would back off just when the listing has new work.
+    """
+    head = range(1, min(depth, run.start_page - 1) + 1)
+    return list(head) + list(range(run.start_page, run.end_page + 1))
+
+def checkpoint(run, page, jobs_found, jobs_added, retries):
+    """Record a completed page on the run, committed together with the page's jobs by the caller
+
+    page is the last page up to which every page is committed, pages fetched
+    concurrently may complete out of order. Front pages crawled before a
+    resumed run's start_page are counted but do not move the checkpoint.
+    """
+    if page >= run.start_page:
+        run.last_committed_page = page
+    run.pages_completed = (run.pages_completed or 0) + 1
+    run.jobs_found = (run.jobs_found or 0) + jobs_found
+    run.jobs_added = (run.jobs_added or 0) + jobs_added
+    run.page_retries = (run.page_retries or 0) + retries
+
+def finish_run(run, error=None):
+    """Mark a run as finished, a run that failed after committing pages is partial"""
+    run.finished_at = datetime.utcnow()
+    run.duration_seconds = int((run.finished_at - run.run_date).total_seconds())
+    if error is None:
+        run.status = 'success'
+    else:
+        run.status = 'partial' if run.pages_completed else 'error'
+        run.error_message = str(error)[:65535]
+    db.session.add(run)
+    db.session.commit()
+
+def _run_summary(source):
+    run = ScraperRun.query.filter_by(source=source).order_by(ScraperRun.id.desc()).first()
+    summary = None
+    if run is not None:
+        summary = {
+            'id': run.id,
+            'source': run.source,
+            'status': run.status,
+            'started_at': run.run_date,
+            'finished_at': run.finished_at,
+            'start_page': run.start_page,
+            'end_page': run.end_page,
+            'last_committed_page': run.last_committed_page,
+            'jobs_added': run.jobs_added,
+            'page_retries': run.page_retries,
+            'resumed_from': run.resumed_from,
+            'error': run.error_message
+        }
+    return summary
+
+def last_run_status(sources=(DEFAULT_SOURCE,)):
+    """Summary of the most recent run and the circuit breaker per source for the status endpoint"""
+    return {source: {'last_run': _run_summary(source), 'circuit': get_breaker(source).status()} for source in sources}
@@ -0,0 +1,273 @@
+import logging
+import os
+import threading
+import time
+from flask import current_app
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# URL patterns blocked per resource type, the scraper only reads the DOM
+BLOCKED_URL_PATTERNS = {
+    'images': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico'],
+    'fonts': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+    'stylesheets': ['*.css']
+}
+
+# Resolved once per process, ChromeDriverManager().install() checks for driver updates on every call
+_driver_path = None
+
+def _service():
+    global _driver_path
+    from selenium.webdriver.chrome.service import Service
+    if current_app.config.get('DOCKER_ENV', False):
+        # For Docker environment, use a direct path to chromedriver
+        return Service("/usr/local/bin/chromedriver")
+    if _driver_path is None:
+        # For local development, use webdriver_manager
+        from webdriver_manager.chrome import ChromeDriverManager
+        _driver_path = ChromeDriverManager().install()
+    return Service(_driver_path)
+
+def _blocked_resources():
+    value = current_app.config.get('SCRAPER_BLOCK_RESOURCES', 'images,fonts,stylesheets')
+    return [resource.strip() for resource in value.split(',') if resource.strip() in BLOCKED_URL_PATTERNS]
+
+def create_driver():
+    """Set up and return a configured headless Chrome webdriver"""
+    # Selenium is imported here so web processes that never start a browser do not load it
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    # Configure Selenium WebDriver
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    # "eager" returns once the DOM is parsed instead of waiting for every subresource
+    options.page_load_strategy = current_app.config.get('SCRAPER_PAGE_LOAD_STRATEGY', 'eager')
+
+    blocked = _blocked_resources()
+    if 'images' in blocked:
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+
+    try:
+        driver = webdriver.Chrome(service=_service(), options=options)
+        # Fail page loads that hang instead of blocking the run, they are retried
+        driver.set_page_load_timeout(current_app.config.get('SCRAPER_TIMEOUT', 60))
+        if blocked:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {
+                'urls': [pattern for resource in blocked for pattern in BLOCKED_URL_PATTERNS[resource]]
+            })
+        return driver
+    except Exception as e:
+        logger.error(f"Failed to set up Chrome driver: {str(e)}")
+        raise
+
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"Failed to quit Chrome driver: {str(e)}")
+
+def process_tree_rss(pid):
+    """Resident memory in MB of a process and its descendants, None where /proc is not available"""
+    try:
+        children = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as stat_file:
+                    stat = stat_file.read()
+            except OSError:
+                continue
+            # The command name may contain spaces, the parent pid is the second field after it
+            parent = int(stat.rsplit(')', 1)[1].split()[1])
+            children.setdefault(parent, []).append(int(entry))
+
+        pages = 0
+        pending = [pid]
+        while pending:
+            current = pending.pop()
+            try:
+                with open(f'/proc/{current}/statm') as statm_file:
+                    pages += int(statm_file.read().split()[1])
+            except OSError:
+                pass
+            pending.extend(children.get(current, ()))
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+class DriverPool:
+    """Long-lived Chrome drivers shared across scraper runs
+
+    Drivers are health checked when acquired and recycled once they loaded
+    max_pages pages, their browser grew beyond max_rss_mb or they sat idle for
+    max_idle seconds. At most `size` drivers exist at once, acquire() waits for
+    a free one.
+    """
+
+    def __init__(self, factory=create_driver, size=1, max_pages=200, max_rss_mb=1024, max_idle=3600):
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.max_idle = max_idle
+        self._idle = []
+        self._info = {}
+        self._created = 0
+        self._recycled = 0
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def _healthy(driver):
+        try:
+            driver.execute_script('return 1')
+            return True
+        except Exception:
+            return False
+
+    def _rss(self, driver):
+        try:
+            return process_tree_rss(driver.service.process.pid)
+        except AttributeError:
+            return None
+
+    def due_for_recycling(self, driver):
+        """Why a driver should be replaced, None while it can be reused"""
+        info = self._info.get(id(driver))
+        if info is None:
+            return 'unknown driver'
+        if info['pages'] >= self.max_pages:
+            return f"loaded {info['pages']} pages"
+        if time.monotonic() - info['last_used'] > self.max_idle:
+            return 'idle too long'
+        rss = self._rss(driver)
+        if rss is not None and rss > self.max_rss_mb:
+            return f"browser uses {rss:.0f} MB"
+        return None
+
+    def _discard(self, driver, reason):
+        with self._condition:
+            self._info.pop(id(driver), None)
+            self._recycled += 1
+            self._condition.notify()
+        logger.info(f"Recycling Chrome driver: {reason}")
+        quit_driver(driver)
+
+    def acquire(self, timeout=None):
+        """A healthy driver, reused when one is idle and started otherwise"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                while not self._idle and len(self._info) >= self.size:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError('No Chrome driver became available')
+                    self._condition.wait(remaining)
+                driver = self._idle.pop() if self._idle else None
+                if driver is None:
+                    # Reserve the slot while the browser starts
+                    placeholder = object()
+                    self._info[id(placeholder)] = None
+
+            if driver is None:
+                try:
+                    driver = self.factory()
+                finally:
+                    with self._condition:
+                        self._info.pop(id(placeholder), None)
+                        self._condition.notify()
+                with self._condition:
+                    self._info[id(driver)] = {'driver': driver, 'pages': 0, 'created_at': time.monotonic(),
+                                              'last_used': time.monotonic()}
+                    self._created += 1
+                logger.info("Started a new Chrome driver")
+                return driver
+
+            reason = self.due_for_recycling(driver)
+            if reason is None and not self._healthy(driver):
+                reason = 'failed health check'
+            if reason is None:
+                return driver
+            self._discard(driver, reason)
+
+    def record_pages(self, driver, count=1):
+        """Count page loads towards the driver's recycling limit"""
+        info = self._info.get(id(driver))
+        if info is not None:
+            info['pages'] += count
+            info['last_used'] = time.monotonic()
+
+    def release(self, driver, discard=False):
+        """Return a driver to the pool, discard drivers that crashed"""
+        reason = 'discarded after an error' if discard else self.due_for_recycling(driver)
+        if reason is not None:
+            self._discard(driver, reason)
+            return
+        try:
+            # Drop the last page so an idle browser holds no page memory
+            driver.get('about:blank')
+        except Exception as e:
+            self._discard(driver, f"failed to reset ({str(e)})")
+            return
+        with self._condition:
+            self._info[id(driver)]['last_used'] = time.monotonic()
+            self._idle.append(driver)
+            self._condition.notify()
+
+    def close(self):
+        """Quit the idle drivers (on shutdown)"""
+        with self._condition:
+            drivers, self._idle = self._idle, []
+            for driver in drivers:
+                self._info.pop(id(driver), None)
+        for driver in drivers:
+            quit_driver(driver)
+
+    def memory_mb(self):
+        """Resident memory of all pooled browsers (idle and in use), None where it cannot be measured"""
+        with self._condition:
+            drivers = [info['driver'] for info in self._info.values() if info is not None]
+        sizes = [self._rss(driver) for driver in drivers]
+        if any(size is None for size in sizes):
+            return None
+        return sum(sizes)
+
+    def status(self):
+        with self._condition:
+            return {
+                'size': self.size,
+                'open': len(self._info),
+                'idle': len(self._idle),
+                'started': self._created,
+                'recycled': self._recycled
+            }
+
+# Process wide pool, created from the app config on first use
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool(
+                size=current_app.config.get('SCRAPER_DRIVER_POOL_SIZE', 4),
+                max_pages=current_app.config.get('SCRAPER_DRIVER_MAX_PAGES', 200),
+                max_rss_mb=current_app.config.get('SCRAPER_DRIVER_MAX_RSS_MB', 1024),
+                max_idle=current_app.config.get('SCRAPER_DRIVER_MAX_IDLE', 60) * 60
+            )
+        return _pool
+
+def close_pool():
+    """Quit the pooled drivers, registered to run at exit"""
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        pool.close()
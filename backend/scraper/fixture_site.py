@@ -0,0 +1,143 @@
+import html
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Local stand-in for the job board, serving listing and job pages with the markup
+# of the latest selector map so benchmarks and checks run without network access
+
+TITLES = ['Actuarial Analyst', 'Pricing Actuary', 'Reserving Actuary', 'Senior Actuary',
+          'Actuarial Intern', 'Capital Modelling Actuary', 'Life Actuary', 'Pension Consultant']
+COMPANIES = ['Munich Re', 'Swiss Re Ltd', 'Allianz SE', 'AXA', 'Zurich Insurance', 'Aviva plc',
+             'Milliman', 'WTW']
+LOCATIONS = ['London, UK', 'Munich, Germany', 'Zurich, Switzerland', 'Paris, France',
+             'New York, USA', 'Remote']
+CATEGORIES = ['Life', 'Non-Life', 'Health', 'Pensions', 'Reinsurance']
+DUTIES = ['Develop and maintain pricing models', 'Analyse claims and reserving data',
+          'Prepare regulatory reporting', 'Support capital modelling', 'Present results to stakeholders',
+          'Automate actuarial processes in Python', 'Review assumptions and experience studies']
+
+LISTING_TEMPLATE = """<!DOCTYPE html>
+<html><head><title>Actuary List</title>
+<link rel="stylesheet" href="/static/site.css"><link rel="preload" href="/static/font.woff2" as="font">
+</head><body><main>{cards}</main></body></html>"""
+
+CARD_TEMPLATE = """<article class="Job_job-card__Jr2bm">
+<a class="Job_job-page-link__a5I5g" href="/jobs/{id}"></a>
+<p class="Job_job-card__position__ic1rc">{title}</p>
+<p class="Job_job-card__company__7T9qY">{company}</p>
+<div class="Job_job-card__tags__zfriA"><a class="Job_job-card__country__GRVhK">{location}</a>
+<a class="Job_job-card__location__bq7jX">{category}</a></div>
+<p class="Job_job-card__posted-on__NCZaJ">{posted}</p>
+<img src="/static/logo-{id}.png" alt="">
+</article>"""
+
+DETAIL_TEMPLATE = """<!DOCTYPE html>
+<html><head><title>{title}</title><link rel="stylesheet" href="/static/site.css"></head>
+<body><main><h1>{title}</h1><p>{company}</p>
+<p>Job Description</p><ul>{duties}</ul></main></body></html>"""
+
+class FixtureSite:
+    """Deterministic job board with `pages` listing pages of `jobs_per_page` jobs each
+
+    Every response waits `latency` seconds first. Pages past the last one have
+    no job cards, like the real site.
+    """
+
+    def __init__(self, pages=5, jobs_per_page=20, latency=0.0, seed=1):
+        self.pages = pages
+        self.jobs_per_page = jobs_per_page
+        self.latency = latency
+        self.seed = seed
+        self.requests = {'listing': 0, 'detail': 0, 'static': 0}
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def job_count(self):
+        return self.pages * self.jobs_per_page
+
+    def job(self, job_id):
+        rng = random.Random(self.seed * 100003 + job_id)
+        return {
+            'id': job_id,
+            'title': f"{rng.choice(TITLES)} {job_id}",
+            'company': rng.choice(COMPANIES),
+            'location': rng.choice(LOCATIONS),
+            'category': rng.choice(CATEGORIES),
+            'posted': f"{rng.randint(1, 23)}h ago",
+            'duties': rng.sample(DUTIES, 4)
+        }
+
+    def listing_page(self, page):
+        first = (page - 1) * self.jobs_per_page + 1
+        ids = range(first, first + self.jobs_per_page) if 1 <= page <= self.pages else ()
+        cards = []
+        for job_id in ids:
+            job = self.job(job_id)
+            cards.append(CARD_TEMPLATE.format(**{key: html.escape(str(value)) for key, value in job.items()}))
+        return LISTING_TEMPLATE.format(cards='\n'.join(cards))
+
+    def detail_page(self, job_id):
+        if not 1 <= job_id <= self.job_count:
+            return None
+        job = self.job(job_id)
+        duties = ''.join(f"<li>{html.escape(duty)}</li>" for duty in job['duties'])
+        return DETAIL_TEMPLATE.format(title=html.escape(job['title']), company=html.escape(job['company']),
+                                      duties=duties)
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if site.latency:
+                    time.sleep(site.latency)
+                parsed = urlparse(self.path)
+                body, content_type, kind = None, 'text/html; charset=utf-8', None
+                if parsed.path == '/':
+                    page = int(parse_qs(parsed.query).get('page', ['1'])[0])
+                    body, kind = site.listing_page(page), 'listing'
+                elif parsed.path.startswith('/jobs/') and parsed.path[len('/jobs/'):].isdigit():
+                    body, kind = site.detail_page(int(parsed.path[len('/jobs/'):])), 'detail'
+                elif parsed.path.startswith('/static/'):
+                    # Subresources the scraper should block, counted so it shows when it does not
+                    body, content_type, kind = '', 'application/octet-stream', 'static'
+                if kind is not None:
+                    with site._lock:
+                        site.requests[kind] += 1
+                if body is None:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self, host='127.0.0.1', port=0):
+        """Serve in a background thread, returns the base URL"""
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
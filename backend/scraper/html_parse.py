@@ -0,0 +1,200 @@
+import gzip
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+# Offline counterpart of the extraction scripts in scraper.bot, reads snapshots with
+# the standard library so it runs in worker processes without a browser
+
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'
+}
+# Elements whose text starts on a new line, like innerText renders them
+BLOCK_ELEMENTS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'footer', 'form',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'tr', 'ul'
+}
+HIDDEN_ELEMENTS = {'script', 'style', 'template', 'noscript', 'head'}
+
+class Node:
+    """Element of a parsed document, children are Nodes and text strings"""
+    __slots__ = ('tag', 'attrs', 'children', 'parent')
+
+    def __init__(self, tag, attrs=None, parent=None):
+        self.tag = tag
+        self.attrs = dict(attrs or ())
+        self.children = []
+        self.parent = parent
+
+    @property
+    def classes(self):
+        return set((self.attrs.get('class') or '').split())
+
+    def elements(self):
+        """Descendant elements in document order"""
+        pending = [child for child in reversed(self.children) if isinstance(child, Node)]
+        while pending:
+            node = pending.pop()
+            yield node
+            pending.extend(child for child in reversed(node.children) if isinstance(child, Node))
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node('#document')
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, attrs, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_ELEMENTS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(Node(tag, attrs, self.current))
+
+    def handle_endtag(self, tag):
+        # Close up to the matching open element, stray end tags are ignored
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        children = self.current.children
+        if children and isinstance(children[-1], str):
+            children[-1] += data
+        else:
+            children.append(data)
+
+def parse(html):
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+def text(node):
+    """Visible text of an element, approximating innerText"""
+    parts = []
+
+    def walk(current):
+        for child in current.children:
+            if isinstance(child, str):
+                parts.append(child)
+            elif child.tag not in HIDDEN_ELEMENTS:
+                block = child.tag in BLOCK_ELEMENTS
+                if block:
+                    parts.append('\n')
+                walk(child)
+                if block:
+                    parts.append('\n')
+
+    walk(node)
+    lines = (' '.join(line.split()) for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line).strip()
+
+_COMPOUND_RE = re.compile(r'^([a-zA-Z][\w-]*)?((?:\.[\w-]+)*)$')
+
+def _compile_css(selector):
+    """Compounds of a descendant selector, each a (tag, classes) pair"""
+    compounds = []
+    for part in selector.split():
+        match = _COMPOUND_RE.match(part)
+        if not match:
+            raise ValueError(f"Unsupported CSS selector for offline parsing: {selector}")
+        tag, classes = match.groups()
+        compounds.append((tag and tag.lower(), set(classes.split('.')[1:])))
+    return compounds
+
+def _matches(node, compound):
+    tag, classes = compound
+    return (tag is None or node.tag == tag) and classes <= node.classes
+
+def select(root, selector):
+    """Descendants of root matching a CSS selector (tags, classes and descendant combinators)"""
+    compounds = _compile_css(selector)
+    results = []
+    for node in root.elements():
+        if not _matches(node, compounds[-1]):
+            continue
+        # Match the remaining compounds against the ancestors, right to left (like
+        # querySelector, ancestors outside root count too)
+        remaining = len(compounds) - 2
+        ancestor = node.parent
+        while remaining >= 0 and ancestor is not None:
+            if _matches(ancestor, compounds[remaining]):
+                remaining -= 1
+            ancestor = ancestor.parent
+        if remaining < 0:
+            results.append(node)
+    return results
+
+def select_one(root, selector):
+    results = select(root, selector)
+    return results[0] if results else None
+
+# The XPath forms the selector maps use
+_XPATH_FOLLOWING_SIBLING_RE = re.compile(r"^//(\w+)\[text\(\)='([^']*)'\]/following-sibling::(\w+)$")
+_XPATH_CLASS_CONTAINS_RE = re.compile(r"^//(\w+)\[contains\(@class,\s*'([^']*)'\)\]$")
+
+def xpath_first(root, xpath):
+    """First element matching one of the supported XPath forms"""
+    match = _XPATH_FOLLOWING_SIBLING_RE.match(xpath)
+    if match:
+        tag, label, sibling_tag = match.groups()
+        for node in root.elements():
+            if node.tag == tag and any(isinstance(child, str) and child == label for child in node.children):
+                siblings = node.parent.children
+                for sibling in siblings[siblings.index(node) + 1:]:
+                    if isinstance(sibling, Node) and sibling.tag == sibling_tag:
+                        return sibling
+        return None
+    match = _XPATH_CLASS_CONTAINS_RE.match(xpath)
+    if match:
+        tag, class_part = match.groups()
+        for node in root.elements():
+            if node.tag == tag and class_part in (node.attrs.get('class') or ''):
+                return node
+        return None
+    raise ValueError(f"Unsupported XPath for offline parsing: {xpath}")
+
+def parse_listing(html, selectors, url):
+    """Card fields of a listing page, the same dicts the live extraction script returns"""
+    root = parse(html)
+    cards = []
+    for card in select(root, selectors['card']):
+        fields = {}
+        for field in ('title', 'company', 'location', 'posted', 'category'):
+            element = select_one(card, selectors[field])
+            fields[field] = text(element) if element is not None else None
+        link = select_one(card, selectors['link'])
+        href = link.attrs.get('href') if link is not None else None
+        fields['link'] = urljoin(url, href) if href else None
+        cards.append(fields)
+    return cards
+
+def parse_description(html, xpaths):
+    """Text of the first description XPath with content, or None"""
+    root = parse(html)
+    for xpath in xpaths:
+        element = xpath_first(root, xpath)
+        if element is not None:
+            content = text(element)
+            if content:
+                return content
+    return None
+
+def parse_snapshot_file(task):
+    """Parse one snapshot file (runs in a worker process)
+
+    task is (snapshot_id, kind, path, url, selectors), returns (snapshot_id, result)
+    where result is the card list of a listing or the description of a detail page.
+    """
+    snapshot_id, kind, path, url, selectors = task
+    with gzip.open(path, 'rt', encoding='utf-8') as snapshot_file:
+        html = snapshot_file.read()
+    if kind == 'listing':
+        return snapshot_id, parse_listing(html, selectors, url)
+    return snapshot_id, parse_description(html, selectors['description'])
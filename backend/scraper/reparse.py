@@ -0,0 +1,175 @@
+import logging
+import os
+import time
+import click
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from flask.cli import AppGroup
+from models import db, Job, PageSnapshot
+import dedup
+import descriptions
+import dimensions
+import percolator
+import read_model
+import suggest
+from scraper import html_parse, snapshots, sources
+from scraper.bot import forget_jobs, store_jobs, stored_description
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+UPSERT_BATCH_SIZE = 500
+
+def _parse_all(rows, selectors, workers):
+    """Parse snapshot files across worker processes with their source's selectors, returns {snapshot id: result}"""
+    if not rows:
+        return {}
+    directory = snapshots.snapshot_dir()
+    tasks = [
+        (row.id, row.kind, snapshots.object_path(row.content_hash, directory), row.url, selectors[row.source])
+        for row in rows
+    ]
+    workers = workers or os.cpu_count() or 1
+    # A few chunks per worker balances uneven page sizes without pickling every task separately
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return dict(executor.map(html_parse.parse_snapshot_file, tasks, chunksize=chunksize))
+
+def _harvest(since, workers):
+    """Jobs parsed from the listing snapshots, with descriptions from the latest detail snapshots"""
+    adapters = {name: sources.get_source(name) for name in sources.SOURCES}
+    selectors = {name: adapter.offline_selectors() for name, adapter in adapters.items()}
+    query = PageSnapshot.query.filter(PageSnapshot.source.in_(
+        [name for name, source_selectors in selectors.items() if source_selectors is not None]
+    ))
+    if since is not None:
+        query = query.filter(PageSnapshot.fetched_at >= since)
+    rows = query.order_by(PageSnapshot.fetched_at, PageSnapshot.id).all()
+    results = _parse_all(rows, selectors, workers)
+
+    details = {}
+    for row in rows:
+        if row.kind == 'detail' and results.get(row.id):
+            # Rows are in fetch order, later snapshots of a job page win
+            details[row.url] = results[row.id]
+
+    jobs = {}
+    for row in rows:
+        if row.kind != 'listing':
+            continue
+        for card in results.get(row.id) or ():
+            job = adapters[row.source].normalize(card, row.url, row.fetched_at)
+            linked = job['url'] != row.url
+            job['description'] = details.get(job['url']) if linked else None
+            key = job['url'] if linked else (job['title'], job['company'], job['location'])
+            previous = jobs.get(key)
+            if previous is not None:
+                # Keep the earliest posting time seen, and a description from any snapshot
+                job['created_at'] = min(job['created_at'], previous['created_at'])
+                job['description'] = job['description'] or previous['description']
+            job['linked'] = linked
+            jobs[key] = job
+    return list(jobs.values()), len(rows)
+
+def _existing_rows(batch):
+    """Stored scraped jobs of a batch, by job page URL"""
+    urls = [job['url'] for job in batch if job['linked']]
+    rows = {row.url: row for row in Job.query.filter(Job.source == 'scraped', Job.url.in_(urls))} if urls else {}
+    for job in batch:
+        if job['linked'] and job['url'] not in rows:
+            # Jobs scraped before URLs were stored are matched like live runs match them
+            row = Job.query.filter_by(source='scraped', url=None, title=job['title'],
+                                      company=job['company'], location=job['location']).first()
+            if row is not None:
+                row.url = job['url']
+                rows[job['url']] = row
+    return rows
+
+def _upsert_batch(batch):
+    """Update the stored jobs of a batch and insert the rest, returns (updated, inserted)"""
+    existing = _existing_rows(batch)
+    new_jobs = []
+    updated = []
+    for job in batch:
+        row = existing.get(job['url']) if job['linked'] else None
+        if row is None:
+            if job['description'] is None:
+                job['description'] = "No description available"
+            new_jobs.append(job)
+            continue
+
+        values = {'title': job['title'], 'company': job['company'], 'location': job['location'],
+                  'job_type': job['category']}
+        changed = any(getattr(row, field) != value for field, value in values.items())
+        if changed:
+            values.update(dimensions.ids_for(job['company'], job['location'], job['category']))
+            for field, value in values.items():
+                setattr(row, field, value)
+        if job['description'] is not None:
+            descriptions.delete_scraped([row.id])
+            descriptions.store_scraped(row.id, stored_description(job))
+            changed = True
+        if changed:
+            updated.append(row)
+
+    db.session.flush()
+    read_model.update_scraped(updated)
+    kept_jobs, percolate_batch = store_jobs(new_jobs)
+    try:
+        db.session.commit()
+    except Exception:
+        forget_jobs(kept_jobs)
+        raise
+    percolator.percolate(percolate_batch)
+    return len(updated), len(kept_jobs)
+
+def reparse(since=None, workers=None, batch_size=UPSERT_BATCH_SIZE):
+    """Re-parse stored snapshots with the current selectors and upsert the jobs found
+
+    Runs offline, parsing is spread over `workers` processes (all cores by
+    default) and the results are written in batches of batch_size jobs.
+    """
+    started = time.perf_counter()
+    jobs, snapshot_count = _harvest(since, workers)
+    parsed = time.perf_counter()
+    logger.info(f"Parsed {len(jobs)} jobs from {snapshot_count} snapshots in {parsed - started:.1f}s")
+
+    updated = inserted = 0
+    try:
+        for offset in range(0, len(jobs), batch_size):
+            batch_updated, batch_inserted = _upsert_batch(jobs[offset:offset + batch_size])
+            updated += batch_updated
+            inserted += batch_inserted
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if updated or inserted:
+            # Signatures and suggestion counts may describe the old field values
+            dedup.reset()
+            suggest.rebuild()
+
+    logger.info(f"Re-parse updated {updated} and inserted {inserted} jobs in {time.perf_counter() - parsed:.1f}s")
+    return {'snapshots': snapshot_count, 'jobs': len(jobs), 'updated': updated, 'inserted': inserted}
+
+# Flask CLI commands, e.g. `flask --app app snapshots reparse --days 30`
+snapshots_cli = AppGroup('snapshots', help='Raw HTML snapshots of scraped pages')
+
+@snapshots_cli.command('reparse')
+@click.option('--days', type=int, default=None, help='Only re-parse snapshots fetched in the last days')
+@click.option('--workers', type=int, default=None, help='Parser processes (default: all cores)')
+def reparse_command(days, workers):
+    """Re-parse stored snapshots with the current selectors, without network access"""
+    since = datetime.utcnow() - timedelta(days=days) if days is not None else None
+    result = reparse(since, workers)
+    click.echo(f"Re-parsed {result['snapshots']} snapshots into {result['jobs']} jobs: "
+               f"{result['updated']} updated, {result['inserted']} inserted")
+
+@snapshots_cli.command('prune')
+@click.option('--days', type=int, default=None, help='Drop snapshots fetched more than this many days ago')
+def prune_command(days):
+    """Delete old snapshots and their unreferenced files"""
+    days = days if days is not None else current_app.config.get('SCRAPER_SNAPSHOT_RETENTION_DAYS', 90)
+    removed, files = snapshots.prune(days)
+    click.echo(f"Removed {removed} snapshots and {files} files")
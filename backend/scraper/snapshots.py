@@ -0,0 +1,80 @@
+import gzip
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, PageSnapshot
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+def snapshot_dir():
+    """Directory of the content-addressed snapshot files"""
+    path = current_app.config.get('SCRAPER_SNAPSHOT_DIR', 'snapshots')
+    if not os.path.isabs(path):
+        path = os.path.join(current_app.root_path, path)
+    return path
+
+def object_path(content_hash, directory=None):
+    """Path of a snapshot file, fanned out by the first two hash characters"""
+    return os.path.join(directory or snapshot_dir(), content_hash[:2], f'{content_hash}.html.gz')
+
+def _write_object(content_hash, data):
+    path = object_path(content_hash)
+    if os.path.exists(path):
+        # Same content already stored
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with gzip.open(temp_path, 'wb') as snapshot_file:
+        snapshot_file.write(data)
+    os.replace(temp_path, path)
+    return path
+
+def write(url, kind, html, source='actuarylist'):
+    """Store the raw HTML of a fetched page, returns the record for add() or None
+
+    Only writes the file, so it is safe in scraper worker threads. Failures are
+    logged rather than raised, snapshots must not fail a scrape.
+    """
+    if not current_app.config.get('SCRAPER_SNAPSHOTS_ENABLED', True) or not html:
+        return None
+    try:
+        data = html.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        _write_object(content_hash, data)
+        return {'url': url[:500], 'kind': kind, 'source': source, 'content_hash': content_hash,
+                'size': len(data), 'fetched_at': datetime.utcnow()}
+    except Exception as e:
+        logger.warning(f"Failed to store snapshot of {url}: {str(e)}")
+        return None
+
+def add(records):
+    """Index written snapshots in the session, committed with the page's jobs by the caller"""
+    for record in records:
+        snapshot = PageSnapshot.query.filter_by(url=record['url'], content_hash=record['content_hash']).first()
+        if snapshot is None:
+            db.session.add(PageSnapshot(**record))
+        else:
+            snapshot.fetched_at = record['fetched_at']
+
+def prune(days):
+    """Drop snapshots fetched more than `days` ago and the files no snapshot references anymore"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    try:
+        removed = PageSnapshot.query.filter(PageSnapshot.fetched_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    referenced = {content_hash for (content_hash,) in db.session.query(PageSnapshot.content_hash).distinct()}
+    files = 0
+    for root, _, names in os.walk(snapshot_dir()):
+        for name in names:
+            if name.endswith('.html.gz') and name[:-len('.html.gz')] not in referenced:
+                os.remove(os.path.join(root, name))
+                files += 1
+    logger.info(f"Pruned {removed} snapshots and {files} snapshot files")
+    return removed, files
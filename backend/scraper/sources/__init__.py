@@ -0,0 +1,33 @@
+import json
+from flask import current_app
+from scraper.sources.base import Source, PageResult, RateLimiter
+from scraper.sources.actuarylist import ActuaryListSource
+
+__all__ = ['Source', 'PageResult', 'RateLimiter', 'ActuaryListSource', 'SOURCES',
+           'get_source', 'source_names', 'get_sources']
+
+# Source adapters by name, SCRAPER_SOURCES picks the ones that run
+SOURCES = {source.name: source for source in (ActuaryListSource,)}
+
+def get_source(name):
+    """Adapter instance for a source with its SCRAPER_SOURCE_OPTIONS applied"""
+    if name not in SOURCES:
+        raise ValueError(f"Unknown scraper source {name}")
+    options = json.loads(current_app.config.get('SCRAPER_SOURCE_OPTIONS') or '{}').get(name, {})
+    url = options.get('url')
+    if url is None and name == ActuaryListSource.name:
+        url = current_app.config.get('SCRAPER_URL')
+    return SOURCES[name](
+        base_url=url,
+        rate_limit=options.get('rate_limit', current_app.config.get('SCRAPER_RATE_LIMIT')),
+        concurrency=options.get('concurrency', current_app.config.get('SCRAPER_CONCURRENCY', 1))
+    )
+
+def source_names():
+    """Names of the configured sources"""
+    names = current_app.config.get('SCRAPER_SOURCES', ActuaryListSource.name)
+    return [name.strip() for name in names.split(',') if name.strip()]
+
+def get_sources():
+    """Adapters of the configured sources"""
+    return [get_source(name) for name in source_names()]
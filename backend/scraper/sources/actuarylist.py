@@ -0,0 +1,128 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from scraper import card_selectors
+from scraper.sources.base import Source
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Card fields of a listing page in one round trip, arguments[0] is the selector map
+EXTRACT_CARDS_SCRIPT = """
+const selectors = arguments[0];
+const text = (card, selector) => {
+    const element = card.querySelector(selector);
+    return element ? element.innerText.trim() : null;
+};
+return Array.from(document.querySelectorAll(selectors.card)).map(card => {
+    const link = card.querySelector(selectors.link);
+    return {
+        title: text(card, selectors.title),
+        company: text(card, selectors.company),
+        location: text(card, selectors.location),
+        posted: text(card, selectors.posted),
+        category: text(card, selectors.category),
+        link: link ? link.href : null
+    };
+});
+"""
+
+# Text of the first description XPath with content, or null
+EXTRACT_DESCRIPTION_SCRIPT = """
+for (const xpath of arguments[0]) {
+    const element = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (element && element.innerText.trim()) {
+        return element.innerText.trim();
+    }
+}
+return null;
+"""
+
+# Values used when a card field is missing
+CARD_DEFAULTS = {
+    'title': 'Unspecified Position',
+    'company': 'Unspecified Company',
+    'location': 'Location Not Specified',
+    'category': 'Not Specified'
+}
+
+# Function to convert relative time to datetime
+def parse_time(time_text, now=None):
+    now = now or datetime.utcnow()
+    if "h ago" in time_text:
+        hours = int(time_text.split("h")[0])
+        return now - timedelta(hours=hours)
+    elif "d ago" in time_text:
+        days = int(time_text.split("d")[0])
+        return now - timedelta(days=days)
+    elif "m ago" in time_text:
+        minutes = int(time_text.split("m")[0])
+        return now - timedelta(minutes=minutes)
+    return now  # Default to now if format is unknown
+
+class ActuaryListSource(Source):
+    """actuarylist.com, selectors come from scraper.card_selectors"""
+    name = 'actuarylist'
+    default_url = 'https://www.actuarylist.com/'
+
+    def listing_url(self, page):
+        return self.base_url if page == 1 else f"{self.base_url}?page={page}"
+
+    def extract_cards(self, driver, url):
+        # Selenium is imported on first use, the web app imports the source registry without it
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+
+        selectors = card_selectors.get_selectors()
+        try:
+            # Wait for job cards to load
+            WebDriverWait(driver, current_app.config.get('SCRAPER_TIMEOUT', 60)).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, selectors['card']))
+            )
+        except TimeoutException:
+            # A page that is still loading is a failed load for the retries and the
+            # circuit breaker, a loaded page without cards is past the end of the listing
+            if driver.execute_script("return document.readyState") != 'complete':
+                raise
+            logger.warning(f"No job cards found on {url}")
+            return []
+
+        started = time.perf_counter()
+        cards = driver.execute_script(EXTRACT_CARDS_SCRIPT, selectors)
+        logger.info(f"Extracted {len(cards)} job cards from {url} in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        # One warning per field and page instead of one per card
+        for field in card_selectors.CARD_FIELDS:
+            missing = sum(1 for card in cards if not card.get(field))
+            if missing:
+                logger.warning(f"Could not extract {field} from {missing} of {len(cards)} job cards on {url}")
+        return cards
+
+    def extract_detail(self, driver, url):
+        """Description text, waiting until one of the description selectors has content"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException
+
+        xpaths = card_selectors.get_selectors()['description']
+        try:
+            return WebDriverWait(driver, 10).until(
+                lambda d: d.execute_script(EXTRACT_DESCRIPTION_SCRIPT, xpaths)
+            )
+        except TimeoutException:
+            return None
+
+    def normalize(self, card, url, fetched_at=None):
+        """Missing fields get their defaults, relative posting times count from fetched_at"""
+        job = {field: card.get(field) or default for field, default in CARD_DEFAULTS.items()}
+        try:
+            job['created_at'] = parse_time(card['posted'], fetched_at)  # Convert relative time
+        except (TypeError, ValueError):
+            job['created_at'] = fetched_at or datetime.utcnow()
+        job['url'] = card.get('link') or url  # Use the main URL as fallback
+        return job
+
+    def offline_selectors(self):
+        return card_selectors.get_selectors()
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from scraper import snapshots
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """Spaces requests at least 1 / rate seconds apart across all threads of a source"""
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+class PageResult:
+    """Jobs of one listing page and the snapshot records of the pages fetched for it"""
+
+    def __init__(self, jobs=None, snapshot_records=None):
+        self.jobs = jobs or []
+        self.snapshot_records = snapshot_records or []
+
+class Source:
+    """Adapter for one job board: listing pagination, card and detail extraction and normalization
+
+    Subclasses set `name` and implement listing_url, extract_cards, extract_detail
+    and normalize. fetch_page runs them for one listing page; detail pages are
+    fetched only after all cards of the page were extracted. Every page load
+    goes through the source's rate limiter, and the coordinator runs at most
+    `concurrency` pages of a source at once.
+    """
+    name = None
+    default_url = None
+
+    def __init__(self, base_url=None, rate_limit=None, concurrency=1):
+        self.base_url = base_url or self.default_url
+        self.rate_limit = rate_limit
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(rate_limit)
+
+    def listing_url(self, page):
+        raise NotImplementedError
+
+    def extract_cards(self, driver, url):
+        """Raw card dicts of the loaded listing page, an empty list past the last page"""
+        raise NotImplementedError
+
+    def extract_detail(self, driver, url):
+        """Description text of the loaded job page, None if it has none"""
+        raise NotImplementedError
+
+    def normalize(self, card, url, fetched_at=None):
+        """Job dict (title, company, location, category, created_at, url) of a raw card"""
+        raise NotImplementedError
+
+    def offline_selectors(self):
+        """Selector map for re-parsing snapshots with scraper.html_parse, None if not supported"""
+        return None
+
+    def load(self, driver, url):
+        self.limiter.wait()
+        driver.get(url)
+
+    def _snapshot(self, driver, url, kind, records):
+        if current_app.config.get('SCRAPER_SNAPSHOTS_ENABLED', True):
+            record = snapshots.write(url, kind, driver.page_source, self.name)
+            if record:
+                records.append(record)
+
+    def fetch_detail(self, driver, url, records):
+        """Load a job page and return its description, failures give a placeholder text"""
+        try:
+            self.load(driver, url)
+            description = self.extract_detail(driver, url)
+            if description is None:
+                logger.warning(f"Failed to extract description from {url}")
+                description = "No description available"
+            self._snapshot(driver, url, 'detail', records)
+            return description
+        except Exception as e:
+            logger.warning(f"Error accessing job URL {url}: {str(e)}")
+            return "Failed to load job description"
+
+    def fetch_page(self, driver, page):
+        """Jobs of one listing page with their descriptions
+
+        Errors loading the listing page are raised so the caller can retry it.
+        """
+        url = self.listing_url(page)
+        self.load(driver, url)
+        fetched_at = datetime.utcnow()
+        cards = self.extract_cards(driver, url)
+        records = []
+        if cards:
+            # Keep the raw page so later selector fixes can re-parse it offline
+            self._snapshot(driver, url, 'listing', records)
+        jobs = [self.normalize(card, url, fetched_at) for card in cards]
+
+        # Navigate away only after every card was read
+        for job in jobs:
+            # Only get description if we have a valid URL
+            if job['url'] != url:
+                job['description'] = self.fetch_detail(driver, job['url'], records)
+            else:
+                job['description'] = "No description available"
+        return PageResult(jobs, records)
@@ -0,0 +1,106 @@
+import json
+from datetime import datetime, date
+from functools import lru_cache
+from flask import current_app
+from models import Job, SORT_FIELDS
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the standard library encoder
+    orjson = None
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+DATE_FORMAT = '%Y-%m-%d'
+
+# Columns selected for scraped job rows, in the order they appear in API responses
+JOB_FIELDS = (
+    'id', 'title', 'company', 'location', 'description', 'posting_date', 'url',
+    'salary', 'job_type', 'experience_level', 'source', 'created_at', 'updated_at',
+    'duplicate_of'
+)
+
+# Default projection for list views, heavy columns are served by the detail endpoint
+SUMMARY_FIELDS = tuple(field for field in JOB_FIELDS if field != 'description')
+
+# Named projections accepted by the fields= parameter
+FIELD_SETS = {
+    'summary': SUMMARY_FIELDS,
+    'full': JOB_FIELDS
+}
+
+@lru_cache(maxsize=8192)
+def format_datetime(value):
+    """Format a datetime the same way Job.to_dict does (cached, timestamps repeat per scrape batch)"""
+    return value.strftime(DATETIME_FORMAT)
+
+@lru_cache(maxsize=4096)
+def format_date(value):
+    """Format a date the same way Job.to_dict does (cached, posting dates repeat heavily)"""
+    return value.strftime(DATE_FORMAT)
+
+def parse_fields(value, required=()):
+    """Parse a fields= parameter into a tuple of job fields
+
+    Accepts a named projection (summary, full) or a comma separated list of fields.
+    The id and any required fields (e.g. the sort key) are always included.
+    Raises ValueError for unknown fields.
+    """
+    if not value:
+        fields = SUMMARY_FIELDS
+    elif value in FIELD_SETS:
+        fields = FIELD_SETS[value]
+    else:
+        requested = [field.strip() for field in value.split(',') if field.strip()]
+        unknown = [field for field in requested if field not in JOB_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        fields = tuple(field for field in JOB_FIELDS if field == 'id' or field in requested)
+    
+    missing = [field for field in required if field in JOB_FIELDS and field not in fields]
+    return fields + tuple(missing)
+
+SORT_ORDERS = ('asc', 'desc')
+
+def parse_sort(sort_by, sort_order):
+    """Validate the sort_by and sort_order parameters, returns (field, order)
+
+    Only the indexed SORT_FIELDS are accepted, sorting on anything else would
+    need a full sort of the matching rows. Raises ValueError otherwise.
+    """
+    sort_by = sort_by or 'created_at'
+    sort_order = (sort_order or 'desc').lower()
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f"Unsupported sort_by: {sort_by} (sortable fields: {', '.join(SORT_FIELDS)})")
+    if sort_order not in SORT_ORDERS:
+        raise ValueError(f"Unsupported sort_order: {sort_order} (use asc or desc)")
+    return sort_by, sort_order
+
+def _default(value):
+    """Encode values the JSON encoder does not handle natively"""
+    # datetime is a subclass of date, so check it first
+    if isinstance(value, datetime):
+        return format_datetime(value)
+    if isinstance(value, date):
+        return format_date(value)
+    # ObjectId and anything else string-like
+    return str(value)
+
+def select_job_rows(query, fields=JOB_FIELDS):
+    """Run a Job query as plain column tuples and return them as dictionaries
+
+    Selecting columns instead of entities skips ORM hydration and the identity map,
+    dates are left as-is and formatted once at encode time.
+    """
+    columns = [getattr(Job, field) for field in fields]
+    rows = query.with_entities(*columns).all()
+    return [dict(zip(fields, row)) for row in rows]
+
+def dumps(payload):
+    """Encode a payload straight to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode('utf-8')
+
+def json_response(payload, status=200):
+    """Build a JSON response from pre-encoded bytes, bypassing jsonify"""
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Modules only the scraper and the scheduler need, a web process should start without them
+HEAVY_MODULES = ('selenium', 'webdriver_manager', 'apscheduler')
+
+# Runs in the child interpreter: import the app, create it and report the timings on stdout
+MEASURE_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(imported - started, created - imported, ','.join(m for m in {modules!r} if m in sys.modules))
+"""
+
+def _parse_import_times(output):
+    """Self time per top level package in microseconds from `python -X importtime` output"""
+    totals = defaultdict(int)
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            # The header line
+            continue
+        totals[name.strip().split('.')[0]] += int(self_us)
+    return totals
+
+def startup_report():
+    """Import and create_app time of a fresh interpreter, the slowest packages and which heavy modules got loaded"""
+    env = dict(os.environ, STARTUP_CONNECTION_CHECK='false')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', MEASURE_SCRIPT.format(modules=HEAVY_MODULES)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Measuring startup failed: {completed.stderr.strip().splitlines()[-1]}")
+    values = completed.stdout.strip().splitlines()[-1].split(' ', 2)
+    import_seconds, create_seconds = values[:2]
+    loaded = values[2] if len(values) > 2 else ''
+    packages = _parse_import_times(completed.stderr)
+    return {
+        'import_seconds': float(import_seconds),
+        'create_app_seconds': float(create_seconds),
+        'packages': sorted(packages.items(), key=lambda item: -item[1]),
+        'heavy_modules_loaded': [module for module in loaded.split(',') if module]
+    }
+
+def print_startup_report(limit=15):
+    report = startup_report()
+    total = report['import_seconds'] + report['create_app_seconds']
+    print(f"Startup took {total:.3f}s: imports {report['import_seconds']:.3f}s, "
+          f"create_app {report['create_app_seconds']:.3f}s")
+    print(f"Slowest imports (self time per package, {limit} of {len(report['packages'])}):")
+    for package, microseconds in report['packages'][:limit]:
+        print(f"  {package:<24} {microseconds / 1000:8.1f} ms")
+    loaded = report['heavy_modules_loaded']
+    print(f"Heavy modules loaded at startup: {', '.join(loaded) if loaded else 'none'}")
@@ -0,0 +1,152 @@
+import bisect
+import heapq
+import logging
+import re
+import threading
+from models import db, Job
+import dimensions
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+SUGGEST_FIELDS = ('company', 'location', 'job_type', 'title')
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Results for prefixes this short cover large ranges of the index, so they are memoized
+CACHED_PREFIX_LENGTH = 2
+
+_WORD_START_RE = re.compile(r'\s(\w)')
+
+def _normalize(text):
+    return ' '.join(text.casefold().split())
+
+class PrefixIndex:
+    """Sorted array of (term, value) pairs searched with bisect, values weighted by job count
+
+    Each value is indexed under its full name and every later word, so "york"
+    finds "New York" as well.
+    """
+
+    def __init__(self, counts=None):
+        self._counts = {}
+        self._terms = []
+        self._cache = {}
+        if counts:
+            for value, count in counts.items():
+                if value and count > 0:
+                    self._counts[value] = count
+                    self._terms.extend((term, value) for term in self._value_terms(value))
+            self._terms.sort()
+
+    def __len__(self):
+        return len(self._counts)
+
+    @staticmethod
+    def _value_terms(value):
+        text = _normalize(value)
+        terms = {text}
+        terms.update(text[match.start(1):] for match in _WORD_START_RE.finditer(text))
+        return terms
+
+    def add(self, value, count=1):
+        """Change the weight of a value, adding it or dropping it as needed"""
+        if not value:
+            return
+        current = self._counts.get(value, 0)
+        total = current + count
+        if total > 0 and current <= 0:
+            for term in self._value_terms(value):
+                bisect.insort(self._terms, (term, value))
+        elif total <= 0 and current > 0:
+            for term in self._value_terms(value):
+                position = bisect.bisect_left(self._terms, (term, value))
+                if position < len(self._terms) and self._terms[position] == (term, value):
+                    del self._terms[position]
+        if total > 0:
+            self._counts[value] = total
+        else:
+            self._counts.pop(value, None)
+        self._cache.clear()
+
+    def search(self, prefix, limit=DEFAULT_LIMIT):
+        """Values with a term starting with prefix, highest job count first"""
+        prefix = _normalize(prefix)
+        cacheable = len(prefix) <= CACHED_PREFIX_LENGTH
+        if cacheable and (prefix, limit) in self._cache:
+            return self._cache[(prefix, limit)]
+
+        start = bisect.bisect_left(self._terms, (prefix,))
+        end = bisect.bisect_left(self._terms, (prefix + '\uffff',), start)
+        values = {value for _, value in self._terms[start:end]}
+        results = [
+            {'value': value, 'count': self._counts[value]}
+            for value in heapq.nsmallest(limit, values, key=lambda value: (-self._counts[value], value))
+        ]
+        if cacheable:
+            self._cache[(prefix, limit)] = results
+        return results
+
+# Process wide indexes per field, built lazily on first use
+_indexes = {}
+_lock = threading.Lock()
+
+def reset():
+    """Drop the built indexes, they are rebuilt from the stores on next use"""
+    with _lock:
+        _indexes.clear()
+
+def _source_counts(field):
+    """Job counts per name for a field across both stores"""
+    # Imported here, mongo_models updates the suggestions when manual jobs change
+    from mongo_models import mongo, UserJob
+
+    if field == 'title':
+        counts = dict(db.session.query(Job.title, db.func.count(Job.id)).filter_by(source='scraped').group_by(Job.title))
+        for group in mongo.db.user_jobs.aggregate([{'$group': {'_id': '$title', 'count': {'$sum': 1}}}]):
+            counts[group['_id']] = counts.get(group['_id'], 0) + group['count']
+        return counts
+
+    # Dimension fields are counted per canonical id, so spellings are merged
+    id_column = getattr(Job, f'{field}_id')
+    sql_counts = db.session.query(id_column, db.func.count(Job.id)).filter_by(source='scraped').group_by(id_column).all()
+    entries = dimensions.facet(field, sql_counts + UserJob.get_facet_counts(f'{field}_id'))
+    return {entry[field]: entry['count'] for entry in entries if entry[field]}
+
+def _index(field):
+    with _lock:
+        index = _indexes.get(field)
+    if index is None:
+        index = PrefixIndex(_source_counts(field))
+        with _lock:
+            _indexes[field] = index
+        logger.info(f"Suggestion index for {field} built with {len(index)} values")
+    return index
+
+def suggest(field, prefix, limit=DEFAULT_LIMIT):
+    """Suggestions for a field and prefix, no database access once the index is built"""
+    index = _index(field)
+    with _lock:
+        return index.search(prefix, limit)
+
+def _display_values(job):
+    """Indexed value per field of a job dict, dimension fields use their canonical name"""
+    values = {'title': job.get('title')}
+    for field in ('company', 'location', 'job_type'):
+        dimension_id = job.get(f'{field}_id')
+        values[field] = (dimensions.name(field, dimension_id) if dimension_id else None) or job.get(field)
+    return values
+
+def record(job, count=1):
+    """Update the built indexes for a job that was added (count=1) or deleted (count=-1)"""
+    values = _display_values(job)
+    with _lock:
+        for field, index in _indexes.items():
+            index.add(values.get(field), count)
+
+def rebuild():
+    """Rebuild every index from the stores and swap them in (run after each scrape)"""
+    indexes = {field: PrefixIndex(_source_counts(field)) for field in SUGGEST_FIELDS}
+    with _lock:
+        _indexes.clear()
+        _indexes.update(indexes)
+    logger.info("Suggestion indexes rebuilt")
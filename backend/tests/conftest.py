@@ -0,0 +1,40 @@
+import os
+import sys
+import mongomock
+import pytest
+
+# Unit tests run against in-memory SQLite and mongomock, set before config.py reads the environment
+os.environ['DATABASE_URI'] = 'sqlite://'
+os.environ['MONGO_URI'] = 'mongodb://localhost:1/job_listings_test?serverSelectionTimeoutMS=100'
+os.environ['STARTUP_CONNECTION_CHECK'] = 'false'
+os.environ['LIVE_EVENTS_ENABLED'] = 'false'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from models import db  # noqa: E402
+from mongo_models import mongo  # noqa: E402
+import dedup  # noqa: E402
+import dimensions  # noqa: E402
+import percolator  # noqa: E402
+import suggest  # noqa: E402
+
+@pytest.fixture
+def app(tmp_path):
+    """App with empty databases, inside an app context"""
+    app = create_app()
+    app.config.update(TESTING=True, ARCHIVE_DIR=str(tmp_path / 'archive'))
+    mongo.db = mongomock.MongoClient().job_listings_test
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+    # Process-wide indexes built from the databases of this test
+    dedup.reset()
+    dimensions.reset()
+    percolator.reset()
+    suggest.reset()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
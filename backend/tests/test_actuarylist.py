@@ -0,0 +1,24 @@
+import pytest
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from scraper.sources.actuarylist import ActuaryListSource
+
+class _NoCardsDriver:
+    """Driver whose page never shows a job card"""
+
+    def __init__(self, ready_state):
+        self.ready_state = ready_state
+
+    def find_element(self, by, value):
+        raise NoSuchElementException(value)
+
+    def execute_script(self, script, *args):
+        return self.ready_state
+
+def test_a_page_still_loading_is_a_failed_load(app):
+    app.config['SCRAPER_TIMEOUT'] = 0
+    with pytest.raises(TimeoutException):
+        ActuaryListSource().extract_cards(_NoCardsDriver('interactive'), 'https://example.com/?page=4')
+
+def test_a_loaded_page_without_cards_ends_the_listing(app):
+    app.config['SCRAPER_TIMEOUT'] = 0
+    assert ActuaryListSource().extract_cards(_NoCardsDriver('complete'), 'https://example.com/?page=4') == []
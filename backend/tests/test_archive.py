@@ -0,0 +1,37 @@
+import json
+from datetime import date
+from models import db, Job, JobEvent
+import archive
+import dimensions
+
+def _job(title, company, location):
+    return Job(title=title, company=company, location=location, source='scraped', posting_date=date(2020, 1, 6),
+               **dimensions.ids_for(company, location, None))
+
+def test_archived_jobs_are_filtered_on_dimension_ids_like_live_ones(app):
+    db.session.add_all([_job('Pricing Actuary', 'Swiss Re Ltd', 'Zurich, Switzerland'),
+                        _job('Analyst', 'AXA', 'Paris, France')])
+    db.session.commit()
+    assert archive.archive_old_jobs(days=30) == 2
+
+    def titles(**filters):
+        return [job['title'] for job in archive.iter_archived_jobs(filters, since=date(2019, 1, 1))]
+
+    # "Swiss Re AG" is the same company by its canonical key, though not a substring of the name
+    assert titles(company='Swiss Re AG') == ['Pricing Actuary']
+    assert titles(location='Switzerland') == ['Pricing Actuary']
+    assert titles(company='Allianz') == []
+    assert sorted(titles()) == ['Analyst', 'Pricing Actuary']
+
+def test_archiving_publishes_a_delete_event_per_job(app):
+    app.config['LIVE_EVENTS_ENABLED'] = True
+    job = _job('Pricing Actuary', 'Swiss Re', 'Zurich')
+    db.session.add(job)
+    db.session.commit()
+    job_id = job.id
+
+    archive.archive_old_jobs(days=30)
+
+    event = JobEvent.query.one()
+    assert (event.event_type, event.job_id) == ('delete', job_id)
+    assert json.loads(event.payload)['company_id'] == dimensions.lookup('company', 'Swiss Re')
@@ -0,0 +1,46 @@
+from check_query_plans import ShapeResult, _filters_documents, _mongo_verdict, check_query_plans, check_sql, seed
+from models import Job
+from mongo_models import UserJob
+from routes import _scraped_jobs_query
+
+COLLSCAN = {'queryPlanner': {'winningPlan': {'stage': 'COLLSCAN'}},
+            'executionStats': {'totalDocsExamined': 5000, 'totalKeysExamined': 0}}
+
+def test_facets_and_count_may_scan_all_of_user_jobs():
+    for pipeline in (UserJob.facet_pipeline('company_id'), [{'$match': {}}, {'$group': {'_id': 1, 'n': {'$sum': 1}}}]):
+        result = ShapeResult('mongo', 'user_jobs facet', aggregate=True)
+        _mongo_verdict(result, COLLSCAN, 5000, 1000, whole_collection=not _filters_documents(pipeline))
+        assert result.ok
+
+def test_filtered_aggregates_and_listings_may_not():
+    pipeline = [{'$match': {'company_id': 1}}, {'$group': {'_id': '$location_id', 'count': {'$sum': 1}}}]
+    aggregate = ShapeResult('mongo', 'filtered facet', aggregate=True)
+    _mongo_verdict(aggregate, COLLSCAN, 5000, 1000, whole_collection=not _filters_documents(pipeline))
+    assert aggregate.problems == ['COLLSCAN of user_jobs']
+
+    listing = ShapeResult('mongo', 'user_jobs[company]')
+    listing.returned = 20
+    _mongo_verdict(listing, COLLSCAN, 5000, 1000)
+    assert listing.problems == ['COLLSCAN of user_jobs']
+
+def test_small_collections_are_not_judged():
+    result = ShapeResult('mongo', 'user_jobs[company]')
+    result.returned = 20
+    _mongo_verdict(result, COLLSCAN, 500, 1000)
+    assert result.ok and result.examined == 5000
+
+def test_listing_and_stats_shapes_pass_on_seeded_sqlite(app):
+    seed(1500)
+
+    results = check_query_plans(mongo_checks=False)
+
+    assert len(results) == 648
+    assert [result.to_dict() for result in results if not result.ok] == []
+
+def test_sorting_outside_an_index_fails_on_seeded_sqlite(app):
+    seed(1500)
+    statement = _scraped_jobs_query().order_by(None).order_by(Job.salary).statement
+
+    result = check_sql('jobs sort=salary', statement, 1000)
+
+    assert result.problems == ['filesort on jobs'] and result.returned == 1500
@@ -0,0 +1,37 @@
+from datetime import datetime
+from models import db, ScraperRun
+from scraper import checkpoints
+from scraper.bot import SourceRun
+
+def _failed_run(last_committed_page, end_page=20):
+    db.session.add(ScraperRun(source='actuarylist', status='partial', start_page=1, end_page=end_page,
+                              last_committed_page=last_committed_page, run_date=datetime.utcnow()))
+    db.session.commit()
+
+def test_a_resumed_run_crawls_the_front_pages_first(app):
+    _failed_run(7)
+    run = checkpoints.start_run(3)
+
+    assert (run.start_page, run.end_page) == (8, 20)
+    assert checkpoints.page_order(run, 3) == [1, 2, 3] + list(range(8, 21))
+    # A depth reaching the checkpoint crawls the listing in one piece
+    assert checkpoints.page_order(run, 10) == list(range(1, 21))
+
+def test_front_pages_are_counted_without_moving_the_checkpoint(app):
+    _failed_run(7)
+    source_run = SourceRun(None, checkpoints.start_run(2), 2)
+
+    source_run.completed.update({1: (10, 4, 0), 8: (10, 0, 0)})
+    source_run.advance()
+    assert source_run.run.last_committed_page is None and source_run.run.jobs_added == 4
+    # Page 8 waits for page 2, crawled before it
+    source_run.completed[2] = (10, 1, 0)
+    source_run.advance()
+    assert source_run.run.last_committed_page == 8 and source_run.run.jobs_added == 5
+
+def test_a_finished_run_starts_on_page_one(app):
+    db.session.add(ScraperRun(source='actuarylist', status='success', start_page=1, end_page=20,
+                              last_committed_page=20, run_date=datetime.utcnow()))
+    db.session.commit()
+    run = checkpoints.start_run(5)
+    assert checkpoints.page_order(run, 5) == [1, 2, 3, 4, 5]
@@ -0,0 +1,23 @@
+import asyncio
+import pytest
+
+def test_cors_allows_credentials_for_the_configured_frontend_only(client):
+    response = client.get('/api/jobs', headers={'Origin': 'http://localhost:3000'})
+    assert response.headers['Access-Control-Allow-Origin'] == 'http://localhost:3000'
+    assert response.headers['Access-Control-Allow-Credentials'] == 'true'
+
+    response = client.get('/api/jobs', headers={'Origin': 'https://evil.example'})
+    assert 'Access-Control-Allow-Origin' not in response.headers
+
+def test_async_app_sends_the_same_cors_headers(app):
+    pytest.importorskip('quart')
+    from async_api import create_async_app
+
+    async def get(origin):
+        # The stores are not opened outside of serving, the error response carries the headers all the same
+        return await create_async_app(app).test_client().get('/api/scraper/status', headers={'Origin': origin})
+
+    response = asyncio.run(get('http://localhost:3000'))
+    assert response.headers['Access-Control-Allow-Origin'] == 'http://localhost:3000'
+    assert response.headers['Access-Control-Allow-Credentials'] == 'true'
+    assert 'Access-Control-Allow-Origin' not in asyncio.run(get('https://evil.example')).headers
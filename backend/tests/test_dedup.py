@@ -0,0 +1,80 @@
+import pytest
+from models import db, Job
+from mongo_models import mongo
+from scraper import bot
+import dedup
+
+DESCRIPTION = ('Join our pricing team to build and maintain motor and home insurance pricing models, '
+               'analyse claims experience and present recommendations to underwriting leadership.')
+
+def test_signatures_estimate_similarity():
+    hasher = dedup.MinHasher()
+    original = hasher.signature(dedup.job_text('Pricing Actuary', DESCRIPTION))
+    repost = hasher.signature(dedup.job_text('Pricing Actuary', DESCRIPTION + ' Hybrid working.'))
+    other = hasher.signature(dedup.job_text('Reserving Analyst', 'Quarterly reserving for a life insurer in Zurich.'))
+
+    assert original == hasher.signature(dedup.job_text('Pricing Actuary', DESCRIPTION))
+    assert dedup.similarity(original, repost) > 0.8
+    assert dedup.similarity(original, other) < 0.2
+
+def test_index_points_duplicates_at_the_original_and_promotes_them_on_removal():
+    signature = dedup.MinHasher().signature(DESCRIPTION)
+    index = dedup.LSHIndex()
+    index.add('scraped:1', signature)
+    index.add('scraped:2', signature, canonical='scraped:1')
+    index.add('scraped:3', signature, canonical='scraped:1')
+
+    assert index.best_match(signature, 0.8) == 'scraped:1'
+    assert index.remove('scraped:2') == []
+    assert index.remove('scraped:1') == ['scraped:3']
+    assert index.best_match(signature, 0.8) == 'scraped:3'
+
+def test_mark_batch_matches_within_the_batch_and_forget_drops_the_job(app):
+    marks = dedup.mark_batch([('scraped:1', 'Pricing Actuary', DESCRIPTION),
+                              ('manual:a', 'Pricing Actuary', DESCRIPTION),
+                              ('scraped:2', 'Reserving Analyst', 'Quarterly reserving for a life insurer.')])
+    assert marks == {'scraped:1': None, 'manual:a': 'scraped:1', 'scraped:2': None}
+
+    assert dedup.forget('scraped:1') == ['manual:a']
+    assert dedup.mark_batch([('scraped:3', 'Pricing Actuary', DESCRIPTION)]) == {'scraped:3': 'manual:a'}
+
+def test_release_clears_the_flags_in_both_stores(app):
+    original = Job(title='Pricing Actuary', company='A', source='scraped')
+    db.session.add(original)
+    db.session.flush()
+    key = dedup.job_key('scraped', original.id)
+    db.session.add(Job(title='Pricing Actuary', company='B', source='scraped', duplicate_of=key))
+    mongo.db.user_jobs.insert_one({'title': 'Pricing Actuary', 'source': 'manual', 'duplicate_of': key})
+    db.session.delete(original)
+    db.session.commit()
+
+    dedup.release(key)
+
+    assert [job.duplicate_of for job in Job.query.all()] == [None]
+    assert mongo.db.user_jobs.find_one()['duplicate_of'] is None
+
+def test_a_rolled_back_batch_leaves_only_its_own_jobs_out_of_the_index(app, monkeypatch):
+    stored = {'title': 'Pricing Actuary', 'company': 'A', 'location': 'Zurich', 'description': DESCRIPTION}
+    kept, _ = bot.store_jobs([stored])
+    db.session.commit()
+    stored_key = dedup.job_key('scraped', kept[0].id)
+    built = []
+    monkeypatch.setattr(dedup, '_build_index', lambda: built.append(1))
+
+    monkeypatch.setattr(bot.read_model, 'add_scraped', lambda jobs: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        bot.store_jobs([dict(stored, company='B', location='Basel')])
+    db.session.rollback()
+
+    # The stored job is still indexed, the rolled back one is gone, nothing was rebuilt
+    marks = dedup.mark_batch([('manual:a', 'Pricing Actuary', DESCRIPTION)])
+    assert marks == {'manual:a': stored_key}
+    assert len(dedup._index) == 2 and not built
+
+def test_warm_up_builds_the_index_before_first_use(app):
+    db.session.add(Job(title='Pricing Actuary', company='A', source='scraped'))
+    db.session.commit()
+
+    dedup.warm_up(app).join()
+
+    assert len(dedup._index) == 1
@@ -0,0 +1,85 @@
+from models import db, Job, Location
+from mongo_models import mongo
+import dimensions
+
+def test_canonical_key_keeps_cities_of_different_countries_apart():
+    assert dimensions.canonical_key('location', 'London, UK') != dimensions.canonical_key('location', 'London, Ontario')
+    assert dimensions.canonical_key('location', 'London,UK') == dimensions.canonical_key('location', 'london, uk')
+
+def test_canonical_key_folds_company_suffixes_and_job_type_spelling():
+    assert dimensions.canonical_key('company', 'Swiss Re Ltd') == dimensions.canonical_key('company', 'Swiss Re')
+    assert dimensions.canonical_key('company', 'Zürich AG') == dimensions.canonical_key('company', 'Zurich')
+    assert dimensions.canonical_key('job_type', 'Full-time') == dimensions.canonical_key('job_type', 'Full Time')
+    assert dimensions.canonical_key('location', '') is None
+
+def test_same_city_name_in_two_countries_gets_two_rows(app):
+    uk = dimensions.intern('location', 'London, UK')
+    ontario = dimensions.intern('location', 'London, Ontario')
+    db.session.commit()
+
+    assert uk != ontario
+    assert dimensions.name('location', uk) == 'London, UK'
+    assert dimensions.name('location', ontario) == 'London, Ontario'
+    assert dimensions.intern('location', 'london, uk') == uk
+
+def test_country_filter_matches_only_that_country(app):
+    munich = dimensions.intern('location', 'Munich, Germany')
+    berlin = dimensions.intern('location', 'Berlin, Germany')
+    london = dimensions.intern('location', 'London, UK')
+    ontario = dimensions.intern('location', 'London, Ontario')
+    db.session.commit()
+
+    assert set(dimensions.matching_ids('location', 'Germany')) == {munich, berlin}
+    assert dimensions.matching_ids('location', 'UK') == [london]
+    assert set(dimensions.matching_ids('location', 'London')) == {london, ontario}
+
+def test_backfill_splits_locations_merged_under_their_first_part(app):
+    # Keyed by the first comma segment before locations were keyed on the whole name
+    merged = Location(name='London, UK', name_key='london')
+    db.session.add(merged)
+    db.session.flush()
+    db.session.add_all([
+        Job(title='Pricing Actuary', company='A', location='London, UK', source='scraped', location_id=merged.id),
+        Job(title='Pricing Actuary', company='B', location='London, Ontario', source='scraped', location_id=merged.id),
+    ])
+    mongo.db.user_jobs.insert_one({'title': 'Analyst', 'company': 'C', 'location': 'London, Ontario',
+                                   'source': 'manual', 'location_id': merged.id})
+    db.session.commit()
+    dimensions.reset()
+
+    dimensions.backfill()
+
+    ids = {job.location: job.location_id for job in Job.query.all()}
+    assert ids['London, UK'] == merged.id
+    assert ids['London, Ontario'] != merged.id
+    assert dimensions.name('location', ids['London, Ontario']) == 'London, Ontario'
+    assert mongo.db.user_jobs.find_one()['location_id'] == ids['London, Ontario']
+
+def test_manual_job_dimensions_survive_a_failed_read_model_commit(app, monkeypatch):
+    import read_model
+    from models import Company
+    from mongo_models import UserJob
+
+    # The read model's best-effort commit fails and rolls back
+    monkeypatch.setattr(read_model, 'upsert_manual', lambda doc: db.session.rollback())
+    job = UserJob.create({'title': 'Actuary', 'company': 'New Company Ltd', 'location': 'Zurich'})
+
+    document = mongo.db.user_jobs.find_one()
+    assert db.session.get(Company, document['company_id']).name == 'New Company Ltd'
+    assert db.session.get(Location, document['location_id']).name == 'Zurich'
+    assert job['company_id'] == document['company_id']
+
+def test_values_interned_by_another_process_are_filterable_at_once(app):
+    from models import Company
+    zurich = dimensions.intern('company', 'Zurich Insurance')
+    db.session.commit()
+    assert dimensions.matching_ids('company', 'Swiss Re') == []
+
+    # Written by the scraper process, this process' cache was loaded before
+    db.session.add(Company(name='Swiss Re Ltd', name_key='swiss re'))
+    db.session.commit()
+
+    swiss_re = dimensions.lookup('company', 'Swiss Re')
+    assert swiss_re is not None and swiss_re != zurich
+    assert dimensions.matching_ids('company', 'Swiss Re') == [swiss_re]
+    assert dimensions.name('company', swiss_re) == 'Swiss Re Ltd'
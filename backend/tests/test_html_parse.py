@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+from scraper import card_selectors, html_parse
+from scraper.fixture_site import FixtureSite
+from scraper.sources.actuarylist import ActuaryListSource
+
+SELECTORS = card_selectors.SELECTOR_MAPS[card_selectors.LATEST_VERSION]
+URL = 'http://fixture.test/'
+
+def test_parse_listing_extracts_every_card_of_the_fixture_site():
+    site = FixtureSite(pages=2, jobs_per_page=5)
+
+    cards = html_parse.parse_listing(site.listing_page(2), SELECTORS, URL)
+
+    assert cards == [{
+        'title': job['title'], 'company': job['company'], 'location': job['location'],
+        'posted': job['posted'], 'category': job['category'], 'link': f"{URL}jobs/{job['id']}"
+    } for job in map(site.job, range(6, 11))]
+    # Pages past the last one have no cards, like the real site
+    assert html_parse.parse_listing(site.listing_page(3), SELECTORS, URL) == []
+
+def test_parsed_cards_normalize_to_jobs():
+    site = FixtureSite(pages=1, jobs_per_page=3)
+    fetched_at = datetime(2025, 5, 1, 12)
+
+    card = html_parse.parse_listing(site.listing_page(1), SELECTORS, URL)[0]
+    job = ActuaryListSource().normalize(card, URL, fetched_at)
+
+    expected = site.job(1)
+    assert job == {
+        'title': expected['title'], 'company': expected['company'], 'location': expected['location'],
+        'category': expected['category'], 'url': f'{URL}jobs/1',
+        'created_at': fetched_at - timedelta(hours=int(expected['posted'].split('h')[0]))
+    }
+
+def test_parse_description_reads_the_duties_of_a_job_page():
+    site = FixtureSite(pages=1, jobs_per_page=3)
+
+    description = html_parse.parse_description(site.detail_page(2), SELECTORS['description'])
+
+    assert description.split('\n') == site.job(2)['duties']
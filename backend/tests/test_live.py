@@ -0,0 +1,28 @@
+from models import db, JobEvent
+from live import OutboxCursor
+
+def add_events(*ids):
+    db.session.add_all([JobEvent(id=event_id, event_type='insert', job_id=event_id, payload='{}') for event_id in ids])
+    db.session.commit()
+
+def test_outbox_cursor_reads_ids_committed_after_a_later_one(app):
+    cursor = OutboxCursor(gap_timeout=60)
+    assert cursor.read(10) == []
+
+    add_events(1, 3)
+    assert [row.id for row in cursor.read(10)] == [1, 3]
+    # Id 2 was handed out first but its transaction committed last
+    add_events(2, 4)
+    assert [row.id for row in cursor.read(10)] == [2, 4]
+    assert cursor.read(10) == []
+
+def test_outbox_cursor_starts_at_the_end_and_gives_up_on_old_gaps(app):
+    add_events(1)
+    cursor = OutboxCursor(gap_timeout=0)
+    assert cursor.read(10) == []
+
+    add_events(3)
+    assert [row.id for row in cursor.read(10)] == [3]
+    # Id 2 counts as rolled back once the gap timeout passed
+    add_events(2)
+    assert cursor.read(10) == []
@@ -0,0 +1,47 @@
+from percolator import Percolator
+
+JOB = {'id': 1, 'source': 'scraped', 'title': 'Senior Pricing Actuary', 'company': 'Swiss Re Ltd',
+       'location': 'Zurich, Switzerland', 'job_type': 'Full-time', 'description': 'Motor pricing models'}
+
+def test_keywords_must_all_occur_in_title_or_description():
+    percolator = Percolator([
+        {'id': 'both', 'keywords': 'pricing motor'},
+        {'id': 'title', 'keywords': 'Actuary'},
+        {'id': 'missing', 'keywords': 'pricing reserving'},
+    ])
+    assert sorted(percolator.match(JOB)) == ['both', 'title']
+
+def test_filters_match_like_the_listing_filters():
+    percolator = Percolator([
+        {'id': 'company', 'company': 'swiss re'},
+        {'id': 'country', 'location': 'Switzerland', 'job_type': 'Full Time'},
+        {'id': 'source', 'keywords': 'actuary', 'source': 'manual'},
+        {'id': 'other company', 'keywords': 'actuary', 'company': 'AXA'},
+    ])
+    assert sorted(percolator.match(JOB)) == ['company', 'country']
+
+def test_inbox_pages_through_every_match_once(client):
+    from datetime import datetime
+    from mongo_models import SavedSearch
+    search = SavedSearch.create({'name': 'Actuaries', 'keywords': 'actuary'})
+    # More matches between two polls than fit in one page, several in the same second
+    matched_at = datetime(2025, 5, 1, 12, 0, 0)
+    SavedSearch.add_matches([{'search_id': search['id'], 'job_key': f'scraped:{number}', 'job_id': number,
+                              'matched_at': matched_at} for number in range(250)])
+
+    keys, cursor, pages = [], None, 0
+    while True:
+        params = {'limit': 100, 'after': cursor} if cursor else {'limit': 100}
+        body = client.get(f"/api/searches/{search['id']}/inbox", query_string=params).get_json()
+        keys.extend(job['job_key'] for job in body['jobs'])
+        cursor, pages = body['cursor'], pages + 1
+        if not body['has_more']:
+            break
+    assert pages == 3 and len(keys) == len(set(keys)) == 250
+
+    # Polling with the last cursor returns only what was matched since
+    SavedSearch.add_matches([{'search_id': search['id'], 'job_key': 'scraped:250', 'job_id': 250,
+                              'matched_at': matched_at}])
+    body = client.get(f"/api/searches/{search['id']}/inbox", query_string={'after': cursor}).get_json()
+    assert [job['job_key'] for job in body['jobs']] == ['scraped:250']
+    assert client.get(f"/api/searches/{search['id']}/inbox", query_string={'after': 'x'}).status_code == 400
@@ -0,0 +1,23 @@
+from datetime import datetime
+from models import db, Job, JobListingRead
+from mongo_models import mongo
+import read_model
+
+def test_check_finds_and_repairs_drift_that_kept_updated_at(app):
+    updated_at = datetime(2025, 5, 1, 12, 0, 0)
+    db.session.add(Job(title='Pricing Actuary', company='A', source='scraped', created_at=updated_at, updated_at=updated_at))
+    db.session.commit()
+    manual_id = mongo.db.user_jobs.insert_one({'title': 'Analyst', 'company': 'B', 'source': 'manual', 'company_id': 1,
+                                               'created_at': updated_at, 'updated_at': updated_at}).inserted_id
+    read_model.rebuild()
+    assert read_model.check_consistency()['consistent']
+
+    # Flag and dimension changes that did not touch updated_at
+    Job.query.update({'duplicate_of': f'manual:{manual_id}', 'updated_at': updated_at}, synchronize_session=False)
+    db.session.commit()
+    mongo.db.user_jobs.update_one({'_id': manual_id}, {'$set': {'company_id': 2}})
+
+    result = read_model.check_consistency(repair=True)
+    assert sorted(source for source, _ in result['stale']) == ['manual', 'scraped']
+    assert read_model.check_consistency()['consistent']
+    assert JobListingRead.query.filter_by(source='scraped').one().duplicate_of == f'manual:{manual_id}'
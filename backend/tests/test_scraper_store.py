@@ -0,0 +1,37 @@
+from datetime import datetime
+from models import db, Job
+from scraper import bot
+
+def _scraped(title, company, location):
+    return {'title': title, 'company': company, 'location': location, 'description': 'Pricing models',
+            'category': 'Actuarial', 'created_at': datetime(2025, 5, 1), 'url': f'https://example.com/{title}'}
+
+def _store(jobs):
+    kept, _ = bot.store_jobs(jobs)
+    db.session.commit()
+    return kept
+
+def test_store_jobs_skips_stored_and_repeated_jobs(app):
+    _store([_scraped('Actuary', 'Swiss Re', 'Zurich'), _scraped('Analyst', 'AXA', None)])
+
+    kept = _store([
+        _scraped('Actuary', 'Swiss Re', 'Zurich'),      # stored already
+        _scraped('ACTUARY', 'swiss re', 'zurich'),      # same job, other case
+        _scraped('Analyst', 'AXA', None),               # stored already, no location
+        _scraped('Actuary', 'Swiss Re', 'Basel'),       # new
+        _scraped('Actuary', 'Swiss Re', 'Basel'),       # repeated within the batch
+        _scraped('Analyst', 'Zurich Insurance', None),  # new, no location
+    ])
+
+    assert sorted((job.company, job.location) for job in kept) == [('Swiss Re', 'Basel'), ('Zurich Insurance', None)]
+    assert Job.query.count() == 4
+
+def test_existing_job_keys_uses_one_query(app):
+    _store([_scraped(f'Actuary {number}', 'Swiss Re', 'Zurich') for number in range(20)])
+    statements = []
+    db.event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    keys = bot.existing_job_keys([_scraped(f'Actuary {number}', 'Swiss Re', 'Zurich') for number in range(30)])
+
+    assert len(keys) == 20
+    assert len(statements) == 1
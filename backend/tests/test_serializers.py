@@ -0,0 +1,22 @@
+import pytest
+from serializers import SUMMARY_FIELDS, JOB_FIELDS, parse_fields, parse_sort
+
+def test_parse_fields_accepts_named_projections_and_lists():
+    assert parse_fields(None) == SUMMARY_FIELDS
+    assert parse_fields('full') == JOB_FIELDS
+    # Always with the id, in response order
+    assert parse_fields('company, title') == ('id', 'title', 'company')
+
+def test_parse_fields_adds_required_fields_and_rejects_unknown_ones():
+    assert parse_fields('title', required=('created_at',)) == ('id', 'title', 'created_at')
+    assert parse_fields('summary', required=('title',)) == SUMMARY_FIELDS
+    with pytest.raises(ValueError, match='Unknown fields: salaryx'):
+        parse_fields('title,salaryx')
+
+def test_parse_sort_accepts_only_indexed_fields():
+    assert parse_sort(None, None) == ('created_at', 'desc')
+    assert parse_sort('title', 'ASC') == ('title', 'asc')
+    with pytest.raises(ValueError, match='Unsupported sort_by: salary'):
+        parse_sort('salary', 'asc')
+    with pytest.raises(ValueError, match='Unsupported sort_order: up'):
+        parse_sort('title', 'up')
@@ -0,0 +1,19 @@
+from suggest import PrefixIndex
+
+def test_search_matches_any_word_start_by_job_count():
+    index = PrefixIndex({'New York': 3, 'Newcastle': 5, 'York': 1, 'Zurich': 2})
+
+    assert index.search('new') == [{'value': 'Newcastle', 'count': 5}, {'value': 'New York', 'count': 3}]
+    assert [result['value'] for result in index.search('YORK')] == ['New York', 'York']
+    assert index.search('new', limit=1) == [{'value': 'Newcastle', 'count': 5}]
+    assert index.search('basel') == []
+
+def test_add_updates_weights_and_cached_results():
+    index = PrefixIndex({'Zurich': 2})
+    assert index.search('z') == [{'value': 'Zurich', 'count': 2}]
+
+    index.add('Zug', 3)
+    assert [result['value'] for result in index.search('z')] == ['Zug', 'Zurich']
+    index.add('Zurich', -2)
+    assert index.search('z') == [{'value': 'Zug', 'count': 3}]
+    assert len(index) == 1
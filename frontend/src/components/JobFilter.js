@@ -1,20 +1,20 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import JobService from '@/services/api';
 
+// Wait this long after the last keystroke before asking for suggestions
+const SUGGEST_DELAY_MS = 150;
+
 export default function JobFilter({ filters, onFilterChange }) {
-  // Predefined location options
-  const locationOptions = ["Karachi", "Lahore", "Islamabad", "Multan", "Munich", "Berlin", "Remote"];
-  
   // Predefined job type options
   const jobTypeOptions = [
     "Full-time", "Part-time", "Contract", "Remote", "Internship", 
     "Health", "Life", "Pension", "Reinsurance", "Consulting", "Risk"
   ];
   
-  const [companyOptions, setCompanyOptions] = useState([]);
-  const [loading, setLoading] = useState(false);
+  const [suggestions, setSuggestions] = useState({ company: [], location: [] });
+  const suggestTimers = useRef({});
   const [expanded, setExpanded] = useState(false);
   const [localFilters, setLocalFilters] = useState({
     company: '',
@@ -38,29 +38,32 @@ export default function JobFilter({ filters, onFilterChange }) {
     setActiveFilterCount(count);
   }, [localFilters]);
 
-  // Fetch company options from API
-  useEffect(() => {
-    const fetchCompanyOptions = async () => {
+  // Load suggestions for a field from the typeahead endpoint (no job query per keystroke)
+  const loadSuggestions = (field, prefix) => {
+    clearTimeout(suggestTimers.current[field]);
+    suggestTimers.current[field] = setTimeout(async () => {
       try {
-        setLoading(true);
-        const stats = await JobService.getJobStats();
-        if (stats?.success && stats?.companies) {
-          // Extract company names and sort alphabetically
-          const newCompanies = stats.companies
-            .map(item => item.company)
-            .filter(company => company && company !== 'N/A' && company !== 'null')
-            .sort((a, b) => a.localeCompare(b));
-  
-          setCompanyOptions(newCompanies);
+        const response = await JobService.getSuggestions(field, prefix);
+        if (response?.success) {
+          setSuggestions(prev => ({
+            ...prev,
+            [field]: response.suggestions
+              .map(item => item.value)
+              .filter(value => value && value !== 'N/A' && value !== 'null')
+          }));
         }
       } catch (error) {
-        console.error('Error loading company options:', error);
-      } finally {
-        setLoading(false);
+        console.error(`Error loading ${field} suggestions:`, error);
       }
-    };
-  
-    fetchCompanyOptions();
+    }, SUGGEST_DELAY_MS);
+  };
+
+  // Show the most common companies and locations before anything is typed
+  useEffect(() => {
+    loadSuggestions('company', '');
+    loadSuggestions('location', '');
+    const timers = suggestTimers.current;
+    return () => Object.values(timers).forEach(clearTimeout);
   }, []);
   
   // Handle input changes
@@ -70,6 +73,9 @@ export default function JobFilter({ filters, onFilterChange }) {
       ...prev,
       [name]: value
     }));
+    if (name in suggestions) {
+      loadSuggestions(name, value);
+    }
   };
 
   // Apply filters
@@ -141,23 +147,22 @@ export default function JobFilter({ filters, onFilterChange }) {
                 Company
               </label>
               <div className="relative">
-                <select
+                <input
+                  type="text"
                   id="company"
                   name="company"
+                  list="company-suggestions"
+                  autoComplete="off"
+                  placeholder="All Companies"
                   value={localFilters.company}
                   onChange={handleInputChange}
-                  className="block w-full rounded-md border-gray-300 pl-3 pr-10 py-2.5 text-base focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-blue-500 shadow-sm"
-                >
-                  <option value="">All Companies</option>
-                  {companyOptions.map((company, index) => (
-                    <option key={`company-${index}`} value={company}>{company}</option>
+                  className="block w-full rounded-md border-gray-300 pl-3 pr-3 py-2.5 text-base focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-blue-500 shadow-sm"
+                />
+                <datalist id="company-suggestions">
+                  {suggestions.company.map((company, index) => (
+                    <option key={`company-${index}`} value={company} />
                   ))}
-                </select>
-                <div className="pointer-events-none absolute inset-y-0 right-0 flex items-center px-2 text-gray-500">
-                  <svg className="h-5 w-5" fill="currentColor" viewBox="0 0 20 20">
-                    <path fillRule="evenodd" d="M5.293 7.293a1 1 0 011.414 0L10 10.586l3.293-3.293a1 1 0 111.414 1.414l-4 4a1 1 0 01-1.414 0l-4-4a1 1 0 010-1.414z" clipRule="evenodd" />
-                  </svg>
-                </div>
+                </datalist>
               </div>
               {localFilters.company && (
                 <div className="flex items-center mt-1 text-sm text-blue-600">
@@ -175,23 +180,22 @@ export default function JobFilter({ filters, onFilterChange }) {
                 Location
               </label>
               <div className="relative">
-                <select
+                <input
+                  type="text"
                   id="location"
                   name="location"
+                  list="location-suggestions"
+                  autoComplete="off"
+                  placeholder="All Locations"
                   value={localFilters.location}
                   onChange={handleInputChange}
-                  className="block w-full rounded-md border-gray-300 pl-3 pr-10 py-2.5 text-base focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-blue-500 shadow-sm"
-                >
-                  <option value="">All Locations</option>
-                  {locationOptions.map((location, index) => (
-                    <option key={`location-${index}`} value={location}>{location}</option>
+                  className="block w-full rounded-md border-gray-300 pl-3 pr-3 py-2.5 text-base focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-blue-500 shadow-sm"
+                />
+                <datalist id="location-suggestions">
+                  {suggestions.location.map((location, index) => (
+                    <option key={`location-${index}`} value={location} />
                   ))}
-                </select>
-                <div className="pointer-events-none absolute inset-y-0 right-0 flex items-center px-2 text-gray-500">
-                  <svg className="h-5 w-5" fill="currentColor" viewBox="0 0 20 20">
-                    <path fillRule="evenodd" d="M5.293 7.293a1 1 0 011.414 0L10 10.586l3.293-3.293a1 1 0 111.414 1.414l-4 4a1 1 0 01-1.414 0l-4-4a1 1 0 010-1.414z" clipRule="evenodd" />
-                  </svg>
-                </div>
+                </datalist>
               </div>
               {localFilters.location && (
                 <div className="flex items-center mt-1 text-sm text-blue-600">
@@ -1,9 +1,13 @@
 'use client';
 
 import { useState } from 'react';
+import JobService from '@/services/api';
 
 export default function JobItem({ job, onDelete }) {
   const [expanded, setExpanded] = useState(false);
+  // List views only carry summary fields, the description is loaded on first expand
+  const [details, setDetails] = useState(null);
+  const [loadingDetails, setLoadingDetails] = useState(false);
   const [confirmDelete, setConfirmDelete] = useState(false);
   const [deleteError, setDeleteError] = useState(null);
   
@@ -17,6 +21,28 @@ export default function JobItem({ job, onDelete }) {
       : dateString;
   };
 
+  // Toggle the expanded view, fetching the full job the first time
+  const handleToggle = async () => {
+    const nextExpanded = !expanded;
+    setExpanded(nextExpanded);
+    
+    if (nextExpanded && !details && job.description === undefined) {
+      try {
+        setLoadingDetails(true);
+        const response = await JobService.getJob(job.id);
+        if (response && response.success) {
+          setDetails(response.job);
+        }
+      } catch (error) {
+        console.error("Error loading job details:", error);
+      } finally {
+        setLoadingDetails(false);
+      }
+    }
+  };
+
+  const description = details ? details.description : job.description;
+
   // Handle delete button click
   const handleDeleteClick = (e) => {
     e.stopPropagation();
@@ -53,7 +79,7 @@ export default function JobItem({ job, onDelete }) {
     <div className="border rounded-lg shadow-sm hover:shadow-md transition-shadow duration-200 bg-white overflow-hidden">
       <div 
         className="p-4 cursor-pointer"
-        onClick={() => setExpanded(!expanded)}
+        onClick={handleToggle}
       >
         <div className="flex justify-between items-start">
           <div>
@@ -123,9 +149,11 @@ export default function JobItem({ job, onDelete }) {
         {/* Expanded content */}
         {expanded && (
           <div className="mt-4 border-t pt-4">
-            {job.description ? (
+            {loadingDetails ? (
+              <p className="text-gray-500 italic">Loading description...</p>
+            ) : description ? (
               <div className="text-gray-700 whitespace-pre-line">
-                {job.description}
+                {description}
               </div>
             ) : (
               <p className="text-gray-500 italic">No description available</p>
@@ -7,6 +7,9 @@ const apiClient = axios.create({
   headers: {
     'Content-Type': 'application/json',
   },
+  // Sends the backend's read-your-writes cookie, so reads right after adding or deleting a job
+  // are served by the primary databases rather than a lagging replica
+  withCredentials: true,
 });
 
 export const JobService = {
@@ -21,6 +24,52 @@ export const JobService = {
     }
   },
 
+  // Get a single job with its full details (description etc.)
+  getJob: async (jobId) => {
+    try {
+      const response = await apiClient.get(`/jobs/${encodeURIComponent(jobId)}`);
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching job details:', error);
+      throw error;
+    }
+  },
+
+  // Get typeahead suggestions for a filter field (company, location, job_type or title)
+  getSuggestions: async (field, prefix = '', limit = 10) => {
+    try {
+      const response = await apiClient.get('/suggest', { params: { field, prefix, limit } });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching suggestions:', error);
+      throw error;
+    }
+  },
+
+  // Save a search, new matching jobs are delivered to its inbox
+  saveSearch: async (search) => {
+    try {
+      const response = await apiClient.post('/searches', search);
+      return response.data;
+    } catch (error) {
+      console.error('Error saving search:', error);
+      throw error;
+    }
+  },
+
+  // Get a page of the jobs matched by a saved search. Pass the previous response's cursor as after,
+  // call again right away while has_more is true, and later with the last cursor to poll for new matches
+  getSearchInbox: async (searchId, after = null) => {
+    try {
+      const params = after ? { after } : {};
+      const response = await apiClient.get(`/searches/${encodeURIComponent(searchId)}/inbox`, { params });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching saved search inbox:', error);
+      throw error;
+    }
+  },
+
   // Get job statistics
   getJobStats: async () => {
     try {
@@ -32,6 +81,17 @@ export const JobService = {
     }
   },
 
+  // Follow job inserts and deletes as they happen; onEvent gets {type, job, stats} where stats is the
+  // change to the getJobStats counts, onReset is called when missed events were lost and data should be
+  // reloaded. The browser reconnects on its own. Returns a function that closes the stream.
+  subscribeToJobEvents: (onEvent, onReset = () => {}) => {
+    const source = new EventSource(`${API_URL}/jobs/events`);
+    source.onmessage = (message) => onEvent(JSON.parse(message.data));
+    source.addEventListener('reset', () => onReset());
+    source.onerror = () => console.warn('Job event stream interrupted, reconnecting');
+    return () => source.close();
+  },
+
   // Add a new job (always adds to MongoDB)
   addJob: async (jobData) => {
     try {
@@ -1,40 +1,172 @@
+-- Dimension tables, one row per canonical company, location and job type
+CREATE TABLE IF NOT EXISTS `companies` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `name` varchar(255) NOT NULL COMMENT 'Display name (first spelling seen)',
+  `name_key` varchar(255) NOT NULL COMMENT 'Canonicalized name',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `name_key` (`name_key`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `locations` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `name` varchar(255) NOT NULL,
+  `name_key` varchar(255) NOT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `name_key` (`name_key`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `job_types` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `name` varchar(50) NOT NULL,
+  `name_key` varchar(50) NOT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `name_key` (`name_key`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
 -- Create the jobs table if it doesn't exist
 CREATE TABLE IF NOT EXISTS `jobs` (
   `id` int NOT NULL AUTO_INCREMENT,
   `title` varchar(255) NOT NULL COMMENT 'Job title/position',
   `company` varchar(255) NOT NULL COMMENT 'Company name',
   `location` varchar(255) DEFAULT NULL COMMENT 'Job location (city, country)',
-  `description` text COMMENT 'Full job description',
+  `description` text COMMENT 'Legacy inline description, new descriptions live in job_descriptions',
   `posting_date` date DEFAULT NULL COMMENT 'Date when job was posted',
   `url` varchar(500) DEFAULT NULL COMMENT 'Link to original job posting',
   `salary` varchar(100) DEFAULT NULL COMMENT 'Salary information',
   `job_type` varchar(50) DEFAULT NULL COMMENT 'Full-time, Part-time, Contract, etc',
   `experience_level` varchar(50) DEFAULT NULL COMMENT 'Entry Level, Mid Level, Senior, etc',
+  `company_id` int DEFAULT NULL COMMENT 'Canonical company (companies.id)',
+  `location_id` int DEFAULT NULL COMMENT 'Canonical location (locations.id)',
+  `job_type_id` int DEFAULT NULL COMMENT 'Canonical job type (job_types.id)',
   `source` varchar(50) DEFAULT 'manual' COMMENT 'manual or scraped',
+  `duplicate_of` varchar(40) DEFAULT NULL COMMENT 'Key of the posting this job near-duplicates (e.g. scraped:42)',
   `created_at` datetime DEFAULT CURRENT_TIMESTAMP COMMENT 'Record creation timestamp',
   `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT 'Record update timestamp',
   PRIMARY KEY (`id`),
   KEY `idx_source` (`source`),
-  KEY `idx_company` (`company`),
-  KEY `idx_location` (`location`),
   KEY `idx_job_type` (`job_type`),
-  KEY `idx_posting_date` (`posting_date`),
-  KEY `idx_created_at` (`created_at`)
+  KEY `idx_jobs_source_created_at` (`source`, `created_at`, `id`),
+  KEY `idx_jobs_source_posting_date` (`source`, `posting_date`, `id`),
+  KEY `idx_jobs_source_title` (`source`, `title`, `id`),
+  KEY `idx_jobs_source_company` (`source`, `company`, `id`),
+  KEY `idx_jobs_source_location` (`source`, `location`, `id`),
+  KEY `idx_jobs_identity` (`title`, `company`, `location`),
+  KEY `ix_jobs_duplicate_of` (`duplicate_of`),
+  KEY `ix_jobs_company_id` (`company_id`),
+  KEY `ix_jobs_location_id` (`location_id`),
+  KEY `ix_jobs_job_type_id` (`job_type_id`),
+  KEY `ix_jobs_url` (`url`),
+  CONSTRAINT `fk_jobs_company` FOREIGN KEY (`company_id`) REFERENCES `companies` (`id`),
+  CONSTRAINT `fk_jobs_location` FOREIGN KEY (`location_id`) REFERENCES `locations` (`id`),
+  CONSTRAINT `fk_jobs_job_type` FOREIGN KEY (`job_type_id`) REFERENCES `job_types` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Preset zlib dictionaries trained on the description corpus
+CREATE TABLE IF NOT EXISTS `description_dictionaries` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `data` blob NOT NULL COMMENT 'zlib preset dictionary (max 32KB)',
+  `sample_count` int DEFAULT '0' COMMENT 'Number of descriptions the dictionary was trained on',
+  `created_at` datetime DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Compressed job descriptions, kept out of the jobs table so scans stay narrow
+CREATE TABLE IF NOT EXISTS `job_descriptions` (
+  `job_id` int NOT NULL,
+  `dictionary_id` int DEFAULT NULL COMMENT 'Dictionary used for compression, NULL for plain zlib',
+  `body` mediumblob NOT NULL COMMENT 'zlib compressed UTF-8 description',
+  `size` int DEFAULT NULL COMMENT 'Uncompressed size in bytes',
+  PRIMARY KEY (`job_id`),
+  CONSTRAINT `fk_job_descriptions_job` FOREIGN KEY (`job_id`) REFERENCES `jobs` (`id`) ON DELETE CASCADE,
+  CONSTRAINT `fk_job_descriptions_dictionary` FOREIGN KEY (`dictionary_id`) REFERENCES `description_dictionaries` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Create the unified read model holding scraped (MySQL) and manual (MongoDB) jobs
+-- Maintained on every write path, rebuild with `flask --app app read-model rebuild`
+CREATE TABLE IF NOT EXISTS `job_listings_read` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `job_id` varchar(24) NOT NULL COMMENT 'MySQL id or MongoDB ObjectId of the source job',
+  `source` varchar(50) NOT NULL COMMENT 'manual or scraped',
+  `title` varchar(255) NOT NULL,
+  `company` varchar(255) NOT NULL,
+  `location` varchar(255) DEFAULT NULL,
+  `posting_date` date DEFAULT NULL,
+  `url` varchar(500) DEFAULT NULL,
+  `salary` varchar(100) DEFAULT NULL,
+  `job_type` varchar(50) DEFAULT NULL,
+  `experience_level` varchar(50) DEFAULT NULL,
+  `company_id` int DEFAULT NULL,
+  `location_id` int DEFAULT NULL,
+  `job_type_id` int DEFAULT NULL,
+  `duplicate_of` varchar(40) DEFAULT NULL,
+  `created_at` datetime DEFAULT NULL,
+  `updated_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_read_source_job` (`source`, `job_id`),
+  KEY `idx_read_company_id` (`company_id`),
+  KEY `idx_read_location_id` (`location_id`),
+  KEY `idx_read_job_type_id` (`job_type_id`),
+  KEY `idx_read_sort_created_at` (`created_at`, `id`),
+  KEY `idx_read_source_sort_created_at` (`source`, `created_at`, `id`),
+  KEY `idx_read_sort_posting_date` (`posting_date`, `id`),
+  KEY `idx_read_source_sort_posting_date` (`source`, `posting_date`, `id`),
+  KEY `idx_read_sort_title` (`title`, `id`),
+  KEY `idx_read_source_sort_title` (`source`, `title`, `id`),
+  KEY `idx_read_sort_company` (`company`, `id`),
+  KEY `idx_read_source_sort_company` (`source`, `company`, `id`),
+  KEY `idx_read_sort_location` (`location`, `id`),
+  KEY `idx_read_source_sort_location` (`source`, `location`, `id`),
+  KEY `ix_job_listings_read_duplicate_of` (`duplicate_of`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 -- Create logs table for tracking scraper activity
 CREATE TABLE IF NOT EXISTS `scraper_logs` (
   `id` int NOT NULL AUTO_INCREMENT,
   `run_date` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
-  `status` varchar(50) NOT NULL COMMENT 'success, error, partial',
+  `source` varchar(50) NOT NULL DEFAULT 'actuarylist' COMMENT 'Source adapter in scraper/sources',
+  `status` varchar(50) NOT NULL COMMENT 'running, success, error, partial',
   `jobs_found` int DEFAULT '0' COMMENT 'Number of jobs found during scraping',
   `jobs_added` int DEFAULT '0' COMMENT 'Number of new jobs added to database',
   `jobs_updated` int DEFAULT '0' COMMENT 'Number of existing jobs updated',
   `error_message` text COMMENT 'Error message if scraping failed',
   `duration_seconds` int DEFAULT '0' COMMENT 'Time taken for scraping in seconds',
+  `start_page` int DEFAULT '1',
+  `end_page` int DEFAULT NULL COMMENT 'Last page the run was meant to crawl',
+  `last_committed_page` int DEFAULT NULL COMMENT 'Checkpoint, the last page whose jobs were committed',
+  `pages_completed` int DEFAULT '0',
+  `page_retries` int DEFAULT '0',
+  `resumed_from` int DEFAULT NULL COMMENT 'Run whose checkpoint this run continued from',
+  `finished_at` datetime DEFAULT NULL,
   PRIMARY KEY (`id`),
   KEY `idx_run_date` (`run_date`),
-  KEY `idx_status` (`status`)
+  KEY `idx_status` (`status`),
+  KEY `idx_source` (`source`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Raw HTML of fetched pages, the gzipped files live in the snapshot directory under their hash
+CREATE TABLE IF NOT EXISTS `page_snapshots` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `url` varchar(500) NOT NULL,
+  `kind` varchar(20) NOT NULL COMMENT 'listing or detail',
+  `source` varchar(50) NOT NULL DEFAULT 'actuarylist' COMMENT 'Source adapter that fetched the page',
+  `content_hash` varchar(64) NOT NULL COMMENT 'sha256 of the HTML',
+  `size` int DEFAULT NULL COMMENT 'Uncompressed size in bytes',
+  `fetched_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_snapshot_url_hash` (`url`, `content_hash`),
+  KEY `idx_snapshot_kind_fetched_at` (`kind`, `fetched_at`),
+  KEY `ix_page_snapshots_content_hash` (`content_hash`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Outbox of scraped job inserts and deletes, tailed by the live event stream
+CREATE TABLE IF NOT EXISTS `job_events` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `event_type` varchar(10) NOT NULL COMMENT 'insert or delete',
+  `job_id` int NOT NULL,
+  `payload` text NOT NULL COMMENT 'JSON job summary with its dimension ids',
+  `created_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `ix_job_events_created_at` (`created_at`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 -- Create view for job statistics
@@ -69,6 +201,30 @@ VALUES
   
   ('Health Insurance Actuary', 'Cigna', 'Philadelphia, USA', 'Specialize in health insurance pricing and risk management. Key responsibilities:\n\n- Developing premium rates for group and individual health plans\n- Analyzing healthcare utilization and cost trends\n- Assessing impact of regulatory changes\n- Collaborating with underwriting and claims departments\n\nRequires knowledge of healthcare systems and regulations.', '2025-05-11', 'https://example.com/job8', '$90,000 - $120,000', 'Health', 'Mid Level', 'scraped');
 
+-- Populate the dimensions from the sample jobs (the sample names need no further
+-- canonicalization, `flask --app app dimensions backfill` handles arbitrary data)
+INSERT INTO `companies` (`name`, `name_key`)
+SELECT MIN(`company`), LOWER(`company`) FROM `jobs` GROUP BY LOWER(`company`);
+INSERT INTO `locations` (`name`, `name_key`)
+SELECT MIN(`location`), LOWER(SUBSTRING_INDEX(`location`, ',', 1)) FROM `jobs`
+WHERE `location` IS NOT NULL GROUP BY LOWER(SUBSTRING_INDEX(`location`, ',', 1));
+INSERT INTO `job_types` (`name`, `name_key`)
+SELECT MIN(`job_type`), LOWER(`job_type`) FROM `jobs` WHERE `job_type` IS NOT NULL GROUP BY LOWER(`job_type`);
+
+UPDATE `jobs` j
+  JOIN `companies` c ON c.`name_key` = LOWER(j.`company`)
+  LEFT JOIN `locations` l ON l.`name_key` = LOWER(SUBSTRING_INDEX(j.`location`, ',', 1))
+  LEFT JOIN `job_types` t ON t.`name_key` = LOWER(j.`job_type`)
+SET j.`company_id` = c.`id`, j.`location_id` = l.`id`, j.`job_type_id` = t.`id`;
+
+-- Seed the read model with the sample scraped jobs
+INSERT INTO `job_listings_read`
+  (`job_id`, `source`, `title`, `company`, `location`, `posting_date`, `url`, `salary`, `job_type`, `experience_level`,
+   `company_id`, `location_id`, `job_type_id`, `created_at`, `updated_at`)
+SELECT `id`, `source`, `title`, `company`, `location`, `posting_date`, `url`, `salary`, `job_type`, `experience_level`,
+  `company_id`, `location_id`, `job_type_id`, `created_at`, `updated_at`
+FROM `jobs` WHERE `source` = 'scraped';
+
 -- Insert initial scraper log
 INSERT INTO `scraper_logs` 
   (`run_date`, `status`, `jobs_found`, `jobs_added`, `jobs_updated`, `duration_seconds`)
@@ -0,0 +1,11 @@
+-- Replicate from the docker-compose MySQL service (local development only, uses its root account)
+CHANGE REPLICATION SOURCE TO
+  SOURCE_HOST = 'mysql',
+  SOURCE_PORT = 3306,
+  SOURCE_USER = 'root',
+  SOURCE_PASSWORD = 'root',
+  SOURCE_AUTO_POSITION = 1,
+  GET_SOURCE_PUBLIC_KEY = 1,
+  SOURCE_CONNECT_RETRY = 10;
+
+START REPLICA;